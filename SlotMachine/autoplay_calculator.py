@@ -0,0 +1,258 @@
+"""
+Auto-play outcome calculator for the slot machine
+Auto-play in slot_machine() keeps spinning a fixed bet until the balance reaches
+the take-profit target or falls to the stop-loss limit. This module computes the
+chance of ending at each boundary, the expected number of spins and the expected
+final balance, exactly by a Markov chain over balance states or, for very wide
+ranges, by vectorized simulation with first-passage detection
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from batch_engine import JACKPOT_SYMBOL, SeedLike
+from config_manager import ConfigManager
+from payout_distribution import PayoutDistributionEngine, lattice_unit
+
+DEFAULT_TAKE_PROFIT = 0.2  # Stop once the balance is 20% up
+DEFAULT_STOP_LOSS = 0.4    # Stop once the balance is 40% down
+MAX_MARKOV_STATES = 3000   # Larger balance ranges fall back to simulation
+DEFAULT_SESSIONS = 100_000
+DEFAULT_MAX_SPINS = 1_000_000  # Per simulated session, a guard against non-terminating runs
+METHODS = ("auto", "markov", "simulation")
+
+
+@dataclass
+class AutoPlayOutcome:
+    """How an auto-play run ends for one config, bet and starting balance"""
+    bet: float
+    starting_balance: float
+    take_profit_balance: float
+    stop_loss_balance: float
+    probability_take_profit: float
+    probability_stop_loss: float
+    probability_insufficient_balance: float  # Stopped above the limit, unable to cover the bet
+    expected_spins: float
+    expected_final_balance: float
+    method: str
+    sessions: int = 0  # Simulated sessions, 0 for the exact Markov chain
+
+    @property
+    def expected_profit(self) -> float:
+        return self.expected_final_balance - self.starting_balance
+
+
+class AutoPlayCalculator:
+    """First-passage analysis of auto-play between its stop-loss and take-profit limits
+
+    One spin moves the balance by (win - bet), where the win follows the exact
+    single-spin payout distribution, bonus rounds included. With the balance on
+    the grid shared by the bet and every payout, the states strictly between the
+    two limits form an absorbing Markov chain; solving (I - Q) x = r once gives
+    the boundary probabilities, expected spins and expected final balance.
+    """
+
+    def __init__(self, config_data: Dict[str, Any], jackpot_symbol: str = JACKPOT_SYMBOL,
+                 distribution_engine: Optional[PayoutDistributionEngine] = None):
+        self.config = config_data
+        self.distribution_engine = distribution_engine or PayoutDistributionEngine(config_data, jackpot_symbol)
+        self._simulator = None  # Built on the first simulated run
+
+    def boundaries(self, starting_balance: float, take_profit: float = DEFAULT_TAKE_PROFIT,
+                   stop_loss: float = DEFAULT_STOP_LOSS):
+        """Balances at which auto-play stops, as computed by slot_machine()"""
+        return starting_balance * (1 + take_profit), starting_balance * (1 - stop_loss)
+
+    def state_count(self, bet: float, starting_balance: float, take_profit: float = DEFAULT_TAKE_PROFIT,
+                    stop_loss: float = DEFAULT_STOP_LOSS, jackpot_pool: Optional[float] = None) -> int:
+        """Number of balance states the Markov chain needs"""
+        unit = lattice_unit([self.distribution_engine.single_spin(jackpot_pool).unit, bet])
+        high, low = self.boundaries(starting_balance, take_profit, stop_loss)
+        return max(0, int(np.ceil((high - low) / unit)))
+
+    def calculate(self, bet: float, starting_balance: float, take_profit: float = DEFAULT_TAKE_PROFIT,
+                  stop_loss: float = DEFAULT_STOP_LOSS, jackpot_pool: Optional[float] = None,
+                  method: str = "auto", sessions: int = DEFAULT_SESSIONS, seed: SeedLike = None) -> AutoPlayOutcome:
+        """Outcome of auto-play from starting_balance at a fixed bet"""
+        if bet <= 0:
+            raise ValueError(f"Bet must be positive, got {bet}")
+        if starting_balance <= 0:
+            raise ValueError(f"Starting balance must be positive, got {starting_balance}")
+        if take_profit <= 0 or not 0 < stop_loss <= 1:
+            raise ValueError(f"Invalid limits: take profit {take_profit}, stop loss {stop_loss}")
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+
+        if method == "auto":
+            states = self.state_count(bet, starting_balance, take_profit, stop_loss, jackpot_pool)
+            method = "markov" if states <= MAX_MARKOV_STATES else "simulation"
+        if method == "markov":
+            return self._solve_markov(bet, starting_balance, take_profit, stop_loss, jackpot_pool)
+        return self._simulate(bet, starting_balance, take_profit, stop_loss, jackpot_pool, sessions, seed)
+
+    def _solve_markov(self, bet: float, starting_balance: float, take_profit: float, stop_loss: float,
+                      jackpot_pool: Optional[float]) -> AutoPlayOutcome:
+        single = self.distribution_engine.single_spin(jackpot_pool)
+        high, low = self.boundaries(starting_balance, take_profit, stop_loss)
+
+        # Re-grid the win distribution on a step shared with the bet
+        unit = lattice_unit([single.unit, bet])
+        stride = int(round(single.unit / unit))
+        win = np.zeros((len(single.probabilities) - 1) * stride + 1)
+        win[::stride] = single.probabilities
+        bet_steps = int(round(bet / unit))
+
+        # Balance states starting_balance + k * unit strictly inside (low, high)
+        tolerance = unit * 1e-9
+        k_min = int(np.floor((low - starting_balance) / unit + 1e-9)) + 1
+        k_max = int(np.ceil((high - starting_balance) / unit - 1e-9)) - 1
+        k = np.arange(k_min, k_max + 1)
+        balances = starting_balance + k * unit
+
+        # slot_machine() also stops when the balance cannot cover the next bet
+        transient = balances >= bet - tolerance
+        if not transient[-k_min]:
+            return self._outcome(bet, starting_balance, high, low, 0.0, 0.0, 1.0, 0.0, starting_balance, "markov")
+
+        # Transition probabilities between states: next k = k + w - bet_steps
+        jump = k[np.newaxis, :] - k[:, np.newaxis] + bet_steps
+        inside = (jump >= 0) & (jump < len(win))
+        transitions = np.where(inside, win[np.clip(jump, 0, len(win) - 1)], 0.0)
+        Q = transitions[np.ix_(transient, transient)]
+        stopped = transitions[np.ix_(transient, ~transient)]
+
+        # Mass leaving the range in one spin: w <= below[i] hits the stop loss, w >= above[i] the target
+        steps = np.arange(len(win))
+        cumulative = np.concatenate([[0.0], np.cumsum(win)])
+        cumulative_value = np.concatenate([[0.0], np.cumsum(win * steps)])
+        k_transient = k[transient]
+        below = np.clip(k_min - 1 - k_transient + bet_steps, -1, len(win) - 1)
+        above = np.clip(k_max + 1 - k_transient + bet_steps, 0, len(win))
+        p_low = cumulative[below + 1]
+        p_high = cumulative[-1] - cumulative[above]
+
+        # Expected balance on exit = starting_balance + (k - bet_steps + w) * unit, summed over exits
+        offset = starting_balance + (k_transient - bet_steps) * unit
+        value_low = p_low * offset + cumulative_value[below + 1] * unit
+        value_high = p_high * offset + (cumulative_value[-1] - cumulative_value[above]) * unit
+        value_stopped = stopped @ balances[~transient]
+
+        rhs = np.column_stack([p_high, p_low, stopped.sum(axis=1), np.ones(len(Q)),
+                               value_low + value_high + value_stopped])
+        solution = np.linalg.solve(np.eye(len(Q)) - Q, rhs)
+        start = np.flatnonzero(k_transient == 0)[0]
+        p_take_profit, p_stop_loss, p_stopped, spins, final_balance = solution[start]
+
+        return self._outcome(bet, starting_balance, high, low, p_take_profit, p_stop_loss, p_stopped,
+                             spins, final_balance, "markov")
+
+    def _simulate(self, bet: float, starting_balance: float, take_profit: float, stop_loss: float,
+                  jackpot_pool: Optional[float], sessions: int, seed: SeedLike,
+                  max_spins: int = DEFAULT_MAX_SPINS) -> AutoPlayOutcome:
+        from simulator import MonteCarloSimulator
+
+        if jackpot_pool is None:
+            jackpot_pool = self.distribution_engine.exact_engine.default_jackpot_pool
+        if self._simulator is None or self._simulator.jackpot_pool != jackpot_pool:
+            self._simulator = MonteCarloSimulator(self.config, bet, "table", jackpot_pool)
+        rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        high, low = self.boundaries(starting_balance, take_profit, stop_loss)
+
+        balances = np.full(sessions, float(starting_balance))
+        spins = np.zeros(sessions, dtype=np.int64)
+        active = np.flatnonzero(balances >= bet)
+        for _ in range(max_spins):
+            if not len(active):
+                break
+            wins, _ = self._simulator.play_batch(len(active), rng)
+            balances[active] += wins - bet
+            spins[active] += 1
+            current = balances[active]
+            active = active[(current > low) & (current < high) & (current >= bet)]
+
+        return self._outcome(bet, starting_balance, high, low,
+                             float(np.mean(balances >= high)), float(np.mean(balances <= low)),
+                             float(np.mean((balances > low) & (balances < high))),
+                             float(spins.mean()), float(balances.mean()), "simulation", sessions)
+
+    @staticmethod
+    def _outcome(bet, starting_balance, high, low, p_take_profit, p_stop_loss, p_stopped,
+                 spins, final_balance, method, sessions=0) -> AutoPlayOutcome:
+        return AutoPlayOutcome(
+            bet=bet,
+            starting_balance=starting_balance,
+            take_profit_balance=high,
+            stop_loss_balance=low,
+            probability_take_profit=float(p_take_profit),
+            probability_stop_loss=float(p_stop_loss),
+            probability_insufficient_balance=float(p_stopped),
+            expected_spins=float(spins),
+            expected_final_balance=float(final_balance),
+            method=method,
+            sessions=sessions
+        )
+
+
+def create_autoplay_calculator(config_file: str = "config.json") -> AutoPlayCalculator:
+    """Create an auto-play calculator for a configuration file"""
+    config_manager = ConfigManager(config_file)
+    config_manager.load_config()
+
+    return AutoPlayCalculator(config_manager.config_data)
+
+
+def format_autoplay_report(outcome: AutoPlayOutcome) -> str:
+    """Format an auto-play outcome for the console"""
+    method = "exact" if outcome.method == "markov" else f"{outcome.sessions:,} simulated sessions"
+    report = f"""
+🤖 AUTO-PLAY OUTLOOK: ${outcome.bet:g} bets from ${outcome.starting_balance:,.2f} ({method})
+• 🎯 Target ${outcome.take_profit_balance:,.2f}: {outcome.probability_take_profit * 100:.2f}%
+• 🛑 Limit ${outcome.stop_loss_balance:,.2f}: {outcome.probability_stop_loss * 100:.2f}%
+"""
+    if outcome.probability_insufficient_balance > 0:
+        report += f"• 💸 Insufficient balance for the bet: {outcome.probability_insufficient_balance * 100:.2f}%\n"
+    report += f"""• Expected Spins: {outcome.expected_spins:,.1f}
+• Expected Final Balance: ${outcome.expected_final_balance:,.2f} ({outcome.expected_profit:+,.2f})
+"""
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Auto-play stop-loss / take-profit outcomes of slot configurations")
+    parser.add_argument("configs", nargs="*", default=["config.json"], help="Configuration files to analyze")
+    parser.add_argument("--bet", type=float, nargs="+", default=None,
+                        help="Bets per spin (default: the config's minimum bet)")
+    parser.add_argument("--balance", type=float, default=None,
+                        help="Starting balance (default: the config's starting balance)")
+    parser.add_argument("--take-profit", type=float, default=None, help="Stop this fraction up, e.g. 0.2")
+    parser.add_argument("--stop-loss", type=float, default=None, help="Stop this fraction down, e.g. 0.4")
+    parser.add_argument("--jackpot-pool", type=float, default=None, help="Jackpot pool paid on a jackpot")
+    parser.add_argument("--method", choices=METHODS, default="auto", help="Markov chain, simulation or auto")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS, help="Sessions per simulated run")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for simulated runs")
+    args = parser.parse_args(argv)
+
+    for config_file in args.configs:
+        config_manager = ConfigManager(config_file)
+        config_manager.load_config()
+        game_config = config_manager.game_config
+        calculator = AutoPlayCalculator(config_manager.config_data)
+
+        take_profit = game_config.auto_take_profit if args.take_profit is None else args.take_profit
+        stop_loss = game_config.auto_stop_loss if args.stop_loss is None else args.stop_loss
+        balance = game_config.starting_balance if args.balance is None else args.balance
+        print(f"\n🎰 {config_file}")
+        for bet in args.bet or [game_config.min_bet]:
+            outcome = calculator.calculate(bet, balance, take_profit, stop_loss, args.jackpot_pool,
+                                           args.method, args.sessions, args.seed)
+            print(format_autoplay_report(outcome))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Vectorized batch spin engine for the slot machine
+Interns every configured symbol to a small integer so that millions of spins
+can be produced as NumPy arrays instead of lists of emoji strings
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from config_manager import get_special_symbols
+
+REEL_COUNT = 5
+LINE_LENGTH = 3  # check_win pays on the first three reels
+JACKPOT_SYMBOL = "💰💰💰💰"  # Same trigger string as slot.jackpot_symbol
+NO_MULTIPLIER = -1  # Tail table marker for "no multiplier on these reels"
+CHUNK_SIZE = 1 << 20  # Spins generated per chunk to bound temporary memory
+MAX_LOOKUP_SIZE = 1 << 16  # Largest total weight served by the lookup table
+
+SeedLike = Union[None, int, np.random.SeedSequence, np.random.Generator]
+
+
+class SymbolTable:
+    """Interns configured symbols to uint8 codes, in config order"""
+
+    def __init__(self, symbol_weights: Dict[str, float]):
+        if not symbol_weights:
+            raise ValueError("Symbol weights must be non-negative and sum > 0")
+        if len(symbol_weights) > 256:
+            raise ValueError(f"Too many symbols for uint8 codes: {len(symbol_weights)}")
+
+        self.symbols = list(symbol_weights.keys())
+        self.codes = {symbol: code for code, symbol in enumerate(self.symbols)}
+        self.weights = np.array(list(symbol_weights.values()), dtype=np.float64)
+
+        total_weight = self.weights.sum()
+        if total_weight <= 0 or (self.weights < 0).any():
+            raise ValueError("Symbol weights must be non-negative and sum > 0")
+        self.probabilities = self.weights / total_weight
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def encode(self, reels: Sequence[Sequence[str]]) -> np.ndarray:
+        """Convert spins of symbol strings into an (n, 5) uint8 code array"""
+        codes = self.codes
+        return np.array([[codes[symbol] for symbol in spin] for spin in reels], dtype=np.uint8)
+
+    def decode(self, codes: np.ndarray) -> List[List[str]]:
+        """Convert an (n, 5) code array back into lists of symbol strings"""
+        symbols = np.array(self.symbols, dtype=object)
+        return symbols[np.atleast_2d(codes)].tolist()
+
+
+class BatchSpinEngine:
+    """Draws whole batches of independent 5-reel spins in one vectorized call"""
+
+    def __init__(self, symbol_weights: Dict[str, float], seed: SeedLike = None):
+        self.symbol_table = SymbolTable(symbol_weights)
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+        # Integer weights (the usual case) get an exact code-per-unit-weight lookup table
+        weights = self.symbol_table.weights
+        if np.all(weights == np.round(weights)) and weights.sum() <= MAX_LOOKUP_SIZE:
+            self._lookup = np.repeat(np.arange(len(weights), dtype=np.uint8), weights.astype(np.int64))
+        else:
+            self._lookup = None
+
+        cumulative = np.cumsum(self.symbol_table.probabilities)
+        cumulative[-1] = 1.0  # Guard against rounding leaving a gap below 1
+        self._cumulative = cumulative
+
+    @property
+    def symbols(self) -> List[str]:
+        return self.symbol_table.symbols
+
+    def spin_batch(self, n: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Return an (n, 5) uint8 array of symbol codes for n spins"""
+        if n < 0:
+            raise ValueError(f"Spin count must be non-negative, got {n}")
+
+        rng = rng or self.rng
+        reels = np.empty((n, REEL_COUNT), dtype=np.uint8)
+
+        for start in range(0, n, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, n)
+            shape = (stop - start, REEL_COUNT)
+            if self._lookup is not None:
+                reels[start:stop] = self._lookup[rng.integers(0, len(self._lookup), shape)]
+            else:
+                reels[start:stop] = np.searchsorted(self._cumulative, rng.random(shape), side='right')
+
+        return reels
+
+
+@dataclass
+class BatchWinResult:
+    """Per-spin results of BatchWinEvaluator.evaluate"""
+    payout: np.ndarray      # Immediate win, 0 for losses and bonus triggers
+    multiplier: np.ndarray  # Multiplier check_win settled on (last one wins)
+    bonus: np.ndarray       # True where check_win returns "bonus"
+    jackpot: np.ndarray     # True where the jackpot trigger matched
+    line_hit: np.ndarray    # True where the first three reels are in the paytable
+
+
+class BatchWinEvaluator:
+    """Vectorized equivalent of check_win over integer-coded spin batches
+
+    Every rule is precomputed into lookup tables indexed by the first three reels
+    (the paying line) and by the remaining two, so a batch costs a handful of
+    array gathers instead of one Python call per spin.
+    """
+
+    def __init__(self, symbol_table: SymbolTable, paytable: Dict[str, float],
+                 special_symbols: Dict[str, Any], jackpot_symbol: str = JACKPOT_SYMBOL):
+        self.symbol_table = symbol_table
+        self.paytable = paytable
+        self.jackpot_symbol = jackpot_symbol
+        symbols = symbol_table.symbols
+        k = len(symbols)
+
+        # Paytable keyed by the joined first three symbols, exactly like check_win
+        self.line_payout = np.zeros((k,) * LINE_LENGTH, dtype=np.float64)
+        self.line_hit = np.zeros((k,) * LINE_LENGTH, dtype=bool)
+        for a, first in enumerate(symbols):
+            for b, second in enumerate(symbols):
+                for c, third in enumerate(symbols):
+                    combination = first + second + third
+                    if combination in paytable:
+                        self.line_payout[a, b, c] = paytable[combination]
+                        self.line_hit[a, b, c] = True
+
+        # check_win takes int(reel[1]) of the last multiplier symbol on any reel
+        multipliers = special_symbols.get('multipliers', [])
+        is_multiplier = np.array([symbol in multipliers for symbol in symbols], dtype=bool)
+        multiplier_value = np.array(
+            [int(symbol[1]) if symbol in multipliers else 1 for symbol in symbols], dtype=np.int64)
+        tail_length = REEL_COUNT - LINE_LENGTH
+        self.head_multiplier = self._last_value_table(multiplier_value, is_multiplier, LINE_LENGTH, 1)
+        self.tail_multiplier = self._last_value_table(multiplier_value, is_multiplier, tail_length, NO_MULTIPLIER)
+
+        is_bonus = np.array([symbol == special_symbols.get('bonus') for symbol in symbols], dtype=bool)
+        self.head_bonus = self._last_value_table(is_bonus, is_bonus, LINE_LENGTH, False)
+        self.tail_bonus = self._last_value_table(is_bonus, is_bonus, tail_length, False)
+
+        self.jackpot_keys = np.array(
+            sorted(self._spin_key(spin) for spin in self._jackpot_spins()), dtype=np.int64)
+
+    @classmethod
+    def from_config(cls, config_data: Dict[str, Any], jackpot_symbol: str = JACKPOT_SYMBOL) -> 'BatchWinEvaluator':
+        """Build an evaluator for a loaded configuration dictionary"""
+        return cls(SymbolTable(config_data['symbols']['weights']), config_data['paytable'],
+                   get_special_symbols(config_data), jackpot_symbol)
+
+    @staticmethod
+    def _last_value_table(values: np.ndarray, mask: np.ndarray, reels: int, default) -> np.ndarray:
+        """Table over `reels` positions holding the value of the last masked symbol"""
+        k = len(values)
+        table = np.full((k,) * reels, default, dtype=values.dtype)
+        for position in range(reels):
+            shape = [1] * reels
+            shape[position] = k
+            table = np.where(mask.reshape(shape), values.reshape(shape), table)
+        return table
+
+    def _jackpot_spins(self) -> Set[Tuple[int, ...]]:
+        """All code tuples whose joined symbols equal the jackpot trigger"""
+        symbols = self.symbol_table.symbols
+        found = set()
+
+        def split(remaining: str, prefix: Tuple[int, ...]):
+            if len(prefix) == REEL_COUNT:
+                if not remaining:
+                    found.add(prefix)
+                return
+            for code, symbol in enumerate(symbols):
+                if remaining.startswith(symbol):
+                    split(remaining[len(symbol):], prefix + (code,))
+
+        split(self.jackpot_symbol, ())
+        return found
+
+    def _spin_key(self, spin: Sequence[int]) -> int:
+        key = 0
+        for code in spin:
+            key = key * len(self.symbol_table) + int(code)
+        return key
+
+    def _flat_index(self, reels: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Row-major index of reels[start:stop] into a (k, ..., k) table"""
+        k = len(self.symbol_table)
+        index = reels[:, start].astype(np.intp)
+        for reel in range(start + 1, stop):
+            index *= k
+            index += reels[:, reel]
+        return index
+
+    def evaluate(self, reels: np.ndarray, jackpot_pool: float = 0.0) -> BatchWinResult:
+        """Evaluate an (n, 5) code array with check_win's rules and priorities"""
+        reels = np.asarray(reels)
+        if reels.ndim != 2 or reels.shape[1] != REEL_COUNT:
+            raise ValueError(f"Expected an (n, {REEL_COUNT}) array of symbol codes, got {reels.shape}")
+
+        head = self._flat_index(reels, 0, LINE_LENGTH)
+        tail = self._flat_index(reels, LINE_LENGTH, REEL_COUNT)
+
+        tail_multiplier = self.tail_multiplier.ravel()[tail]
+        multiplier = np.where(tail_multiplier != NO_MULTIPLIER, tail_multiplier,
+                              self.head_multiplier.ravel()[head])
+
+        line_hit = self.line_hit.ravel()[head]
+        payout = self.line_payout.ravel()[head] * multiplier
+
+        if len(self.jackpot_keys):
+            keys = head.astype(np.int64) * self.tail_bonus.size + tail
+            jackpot = ~line_hit & np.isin(keys, self.jackpot_keys)
+            payout[jackpot] = jackpot_pool
+        else:
+            jackpot = np.zeros(len(reels), dtype=bool)
+
+        any_bonus = self.head_bonus.ravel()[head] | self.tail_bonus.ravel()[tail]
+        bonus = any_bonus & ~line_hit & ~jackpot
+
+        return BatchWinResult(payout=payout, multiplier=multiplier, bonus=bonus,
+                              jackpot=jackpot, line_hit=line_hit)
@@ -0,0 +1,272 @@
+"""
+Compact binary spin log for the slot machine
+Fixed-width 48-byte records behind a small header that holds the symbol table.
+The reader memory-maps the file as a NumPy structured array, so analytics over
+hundreds of millions of spins need no text parsing or emoji decoding
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from batch_engine import REEL_COUNT
+from spin_analytics import SpinAggregates
+from spin_logger import SPIN_LOG_FILE, SpinLogWriter, flush_spin_log, get_spin_log_writer
+
+BINARY_SPIN_LOG_FILE = 'slot_analytics.spins'
+MAGIC = b'SLOTSPIN'
+FORMAT_VERSION = 1
+HEADER_SIZE = 4096  # Magic plus a space-padded JSON header, rewritten in place as symbols are added
+CODE_BITS = 6       # Bits per reel code in the packed reels field
+MAX_SYMBOLS = 1 << CODE_BITS
+AGGREGATE_CHUNK = 1 << 22  # Records aggregated per step, to bound temporary memory
+
+WIN_TYPES = ['loss', 'win', 'bonus_round', 'jackpot']
+WIN_TYPE_CODES = {name: code for code, name in enumerate(WIN_TYPES)}
+
+SPIN_RECORD_DTYPE = np.dtype([
+    ('unix_time', '<f8'),
+    ('bet_amount', '<f8'),
+    ('win_amount', '<f8'),
+    ('balance_after', '<f8'),
+    ('jackpot_pool', '<f8'),
+    ('reels', '<u4'),       # Five 6-bit symbol codes, reel 1 in the lowest bits
+    ('win_type', 'u1'),     # Index into WIN_TYPES
+    ('sample_weight', '<u2'),  # Inverse sampling probability; 0 (older records) means 1
+    ('reserved', 'u1')
+])
+
+
+def pack_reels(codes: np.ndarray) -> np.ndarray:
+    """Pack an (n, 5) array of symbol codes into uint32 values"""
+    codes = np.asarray(codes, dtype=np.uint32)
+    packed = np.zeros(len(codes), dtype=np.uint32)
+    for reel in range(REEL_COUNT):
+        packed |= codes[:, reel] << (CODE_BITS * reel)
+    return packed
+
+
+def unpack_reels(packed: np.ndarray) -> np.ndarray:
+    """Unpack uint32 reel values into an (n, 5) uint8 array of symbol codes"""
+    packed = np.asarray(packed, dtype=np.uint32)
+    shifts = np.arange(REEL_COUNT, dtype=np.uint32) * CODE_BITS
+    return ((packed[:, np.newaxis] >> shifts) & (MAX_SYMBOLS - 1)).astype(np.uint8)
+
+
+def _encode_header(symbols: List[str]) -> bytes:
+    payload = json.dumps({'version': FORMAT_VERSION, 'record_size': SPIN_RECORD_DTYPE.itemsize,
+                          'symbols': symbols}, ensure_ascii=False).encode('utf-8')
+    if len(MAGIC) + len(payload) > HEADER_SIZE:
+        raise ValueError(f"Symbol table does not fit in the {HEADER_SIZE}-byte header")
+    return MAGIC + payload.ljust(HEADER_SIZE - len(MAGIC), b' ')
+
+
+def read_header(filename: str) -> Dict[str, Any]:
+    """Parse the header of a binary spin log"""
+    with open(filename, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+        raise ValueError(f"{filename} is not a binary spin log")
+    info = json.loads(header[len(MAGIC):].decode('utf-8'))
+    if info.get('version') != FORMAT_VERSION or info.get('record_size') != SPIN_RECORD_DTYPE.itemsize:
+        raise ValueError(f"Unsupported binary spin log format in {filename}: {info}")
+    return info
+
+
+class BinarySpinLogWriter(SpinLogWriter):
+    """SpinLogWriter that appends fixed-width binary records
+
+    Takes the same row dictionaries as the CSV writer. Symbols get codes in the
+    order they were first written; a symbol the header does not know yet is
+    appended to the header's table before any record using it is written.
+    """
+
+    def __init__(self, filename: str = BINARY_SPIN_LOG_FILE, symbols: Sequence[str] = (), **kwargs):
+        self.symbols = list(symbols)
+        super().__init__(filename, **kwargs)
+
+    def _open(self):
+        if os.path.isfile(self.filename) and os.path.getsize(self.filename) > 0:
+            stored = read_header(self.filename)['symbols']
+            self.symbols = stored + [symbol for symbol in self.symbols if symbol not in stored]
+            self._file = open(self.filename, 'r+b')
+            # Drop a partial record left by an interrupted write
+            records = (os.path.getsize(self.filename) - HEADER_SIZE) // SPIN_RECORD_DTYPE.itemsize
+            self._file.truncate(HEADER_SIZE + records * SPIN_RECORD_DTYPE.itemsize)
+        else:
+            self._file = open(self.filename, 'w+b')
+        self._codes = {symbol: code for code, symbol in enumerate(self.symbols)}
+        self._write_header()
+
+    def _write_header(self):
+        if len(self.symbols) > MAX_SYMBOLS:
+            raise ValueError(f"Too many symbols for {CODE_BITS}-bit reel codes: {len(self.symbols)}")
+        self._file.seek(0)
+        self._file.write(_encode_header(self.symbols))
+        self._file.seek(0, os.SEEK_END)
+
+    def _code(self, symbol: str) -> int:
+        code = self._codes.get(symbol)
+        if code is None:
+            code = self._codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self._write_header()
+        return code
+
+    def encode(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Convert row dictionaries into structured records"""
+        records = np.zeros(len(rows), dtype=SPIN_RECORD_DTYPE)
+        codes = np.array([[self._code(row[f'reel{i}']) for i in range(1, REEL_COUNT + 1)] for row in rows],
+                         dtype=np.uint32).reshape(-1, REEL_COUNT)
+        records['reels'] = pack_reels(codes)
+        for name in ('unix_time', 'bet_amount', 'win_amount', 'balance_after', 'jackpot_pool'):
+            records[name] = [row[name] for row in rows]
+        records['win_type'] = [WIN_TYPE_CODES.get(row['win_type'], 0) for row in rows]
+        records['sample_weight'] = [row.get('sample_weight') or 1 for row in rows]
+        return records
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        self._file.write(self.encode(rows).tobytes())
+        self._file.flush()
+
+
+def get_binary_spin_log_writer(filename: str = BINARY_SPIN_LOG_FILE,
+                               symbols: Sequence[str] = ()) -> BinarySpinLogWriter:
+    """Shared binary writer for a log file, created on first use"""
+    return get_spin_log_writer(filename, BinarySpinLogWriter, symbols=symbols)
+
+
+class BinarySpinLog:
+    """Zero-copy, read-only view of a binary spin log
+
+    `records` is a NumPy memmap over the file; slicing or masking it reads only
+    the pages involved. Records appended after opening need a new instance.
+    """
+
+    def __init__(self, filename: str = BINARY_SPIN_LOG_FILE):
+        flush_spin_log(filename)
+        self.filename = filename
+        self.symbols: List[str] = read_header(filename)['symbols']
+
+        count = (os.path.getsize(filename) - HEADER_SIZE) // SPIN_RECORD_DTYPE.itemsize
+        if count:
+            self.records = np.memmap(filename, dtype=SPIN_RECORD_DTYPE, mode='r', offset=HEADER_SIZE,
+                                     shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=SPIN_RECORD_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def reel_codes(self, records: Optional[np.ndarray] = None) -> np.ndarray:
+        """(n, 5) symbol codes of `records` (default: the whole log)"""
+        return unpack_reels((self.records if records is None else records)['reels'])
+
+    def reel_symbols(self, records: Optional[np.ndarray] = None) -> List[List[str]]:
+        """Reels as symbol strings; meant for small selections"""
+        symbols = np.array(self.symbols, dtype=object)
+        return symbols[self.reel_codes(records)].tolist()
+
+    def time_range(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """Records with start <= unix_time < end, assuming the log is in time order"""
+        times = self.records['unix_time']
+        first = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        last = len(times) if end is None else int(np.searchsorted(times, end, side='left'))
+        return self.records[first:last]
+
+    def weights(self, records: Optional[np.ndarray] = None) -> np.ndarray:
+        """Sample weight of each record, with the unset weight of older records as 1"""
+        weights = (self.records if records is None else records)['sample_weight'].astype(np.int64)
+        weights[weights == 0] = 1
+        return weights
+
+    def aggregate(self, records: Optional[np.ndarray] = None) -> SpinAggregates:
+        """The calculate_analytics() totals (sample-weighted), computed column-wise"""
+        records = self.records if records is None else records
+        aggregates = SpinAggregates()
+        for start in range(0, len(records), AGGREGATE_CHUNK):
+            chunk = records[start:start + AGGREGATE_CHUNK]
+            weights = self.weights(chunk)
+            wins = chunk['win_amount']
+            win_types = chunk['win_type']
+            aggregates.total_spins += int(weights.sum())
+            aggregates.total_bets += float(np.dot(chunk['bet_amount'], weights))
+            aggregates.total_wins += float(np.dot(wins, weights))
+            aggregates.win_count += int(weights[wins > 0].sum())
+            aggregates.bonus_count += int(weights[win_types == WIN_TYPE_CODES['bonus_round']].sum())
+            aggregates.jackpot_count += int(weights[win_types == WIN_TYPE_CODES['jackpot']].sum())
+        return aggregates
+
+    def close(self):
+        """Release the memory map"""
+        mapping = getattr(self.records, '_mmap', None)
+        self.records = np.zeros(0, dtype=SPIN_RECORD_DTYPE)
+        if mapping is not None:
+            mapping.close()
+
+
+def calculate_binary_analytics(filename: str = BINARY_SPIN_LOG_FILE) -> Optional[Dict[str, Any]]:
+    """calculate_analytics() over a binary spin log"""
+    if not os.path.isfile(filename):
+        return None
+    log = BinarySpinLog(filename)
+    try:
+        return log.aggregate().to_analytics()
+    finally:
+        log.close()
+
+
+def convert_csv_log(csv_filename: str = SPIN_LOG_FILE, binary_filename: str = BINARY_SPIN_LOG_FILE,
+                    symbols: Sequence[str] = ()) -> int:
+    """Append the full-format rows of a CSV spin log to a binary log; returns rows converted"""
+    writer = BinarySpinLogWriter(binary_filename, symbols)
+    converted = 0
+    try:
+        with open(csv_filename, 'r', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                try:
+                    record = dict(row)
+                    record['unix_time'] = datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+                    for name in ('bet_amount', 'win_amount', 'balance_after', 'jackpot_pool'):
+                        record[name] = float(row[name])
+                    record['sample_weight'] = int(float(row.get('sample_weight') or 1))
+                except (KeyError, TypeError, ValueError):
+                    continue  # Old short-format rows carry no reels or win type
+                writer.write(record)
+                converted += 1
+    finally:
+        writer.close()
+    return converted
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analytics over binary spin logs")
+    parser.add_argument("logs", nargs="*", default=[BINARY_SPIN_LOG_FILE], help="Binary spin log files")
+    parser.add_argument("--convert", metavar="CSV", default=None,
+                        help="First append the rows of this CSV spin log to the (single) binary log")
+    args = parser.parse_args(argv)
+
+    if args.convert:
+        converted = convert_csv_log(args.convert, args.logs[0])
+        print(f"✅ Converted {converted:,} rows from {args.convert} into {args.logs[0]}")
+
+    for filename in args.logs:
+        analytics = calculate_binary_analytics(filename)
+        if analytics is None:
+            print(f"❌ {filename} not found")
+            continue
+        print(f"\n📊 {filename}")
+        for key, value in analytics.items():
+            print(f"  {key}: {value}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
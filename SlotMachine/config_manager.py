@@ -8,6 +8,14 @@ import os
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 
+# Special symbols assumed when a config file does not list its own
+DEFAULT_SPECIAL_SYMBOLS = {
+    "wild": "🃏",
+    "bonus": "🎁",
+    "jackpot": "💰",
+    "multipliers": ["x2", "x3", "x5"]
+}
+
 @dataclass
 class GameConfig:
     """Game configuration data class"""
@@ -23,6 +31,10 @@ class GameConfig:
     house_edge: float
     bonus_spins: int
     enable_animations: bool
+    auto_take_profit: float = 0.2
+    auto_stop_loss: float = 0.4
+    log_sample_every: int = 1
+    log_big_win_multiplier: float = 10.0
     
 class ConfigManager:
     """Manages game configuration loading and validation"""
@@ -90,8 +102,10 @@ class ConfigManager:
         game_settings = self.config_data['game_settings']
         symbols = self.config_data['symbols']
         rtp_settings = self.config_data['rtp_settings']
-        bonus_settings = self.config_data['bonus_settings']
-        animation_settings = self.config_data['animation_settings']
+        bonus_settings = self.config_data.get('bonus_settings', {})
+        animation_settings = self.config_data.get('animation_settings', {})
+        auto_play_settings = self.config_data.get('auto_play_settings', {})
+        logging_settings = self.config_data.get('logging_settings', {})
         
         return GameConfig(
             starting_balance=game_settings['starting_balance'],
@@ -104,8 +118,12 @@ class ConfigManager:
             paytable=self.config_data['paytable'],
             target_rtp=rtp_settings['target_rtp'],
             house_edge=rtp_settings['house_edge'],
-            bonus_spins=bonus_settings['bonus_spins'],
-            enable_animations=animation_settings['enable_animations']
+            bonus_spins=bonus_settings.get('bonus_spins', 3),
+            enable_animations=animation_settings.get('enable_animations', True),
+            auto_take_profit=auto_play_settings.get('take_profit', 0.2),
+            auto_stop_loss=auto_play_settings.get('stop_loss', 0.4),
+            log_sample_every=logging_settings.get('sample_every', 1),
+            log_big_win_multiplier=logging_settings.get('big_win_multiplier', 10.0)
         )
     
     def _create_default_config(self):
@@ -139,6 +157,14 @@ class ConfigManager:
             },
             "animation_settings": {
                 "enable_animations": True
+            },
+            "auto_play_settings": {
+                "take_profit": 0.2,
+                "stop_loss": 0.4
+            },
+            "logging_settings": {
+                "sample_every": 1,
+                "big_win_multiplier": 10
             }
         }
         
@@ -241,6 +267,10 @@ def load_game_config(config_file: str = "config.json") -> GameConfig:
     config_manager.load_config()
     return config_manager.game_config
 
+def get_special_symbols(config_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Get special symbols of a config, falling back to the defaults"""
+    return config_data['symbols'].get('special_symbols', DEFAULT_SPECIAL_SYMBOLS)
+
 def get_config_manager() -> ConfigManager:
     """Get the global config manager instance"""
     return config_manager
\ No newline at end of file
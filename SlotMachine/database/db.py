@@ -1,14 +1,195 @@
 import sqlite3 as sql
+import atexit
 import os
+import random
+import threading
+import time
+import urllib.parse
 
-def get_db_connection():
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    db_path = os.path.join(script_dir, 'case.db')
-    conn = sql.connect(db_path)
+# Database file next to this script
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'case.db')
+
+# Applied once when a pooled connection is opened
+CONNECTION_PRAGMAS = {
+    'temp_store': 'MEMORY',
+    'cache_size': -8192  # KiB
+}
+STATEMENT_CACHE_SIZE = 256
+
+# Storage mode, shared by every process using the database; see configure_storage()
+JOURNAL_MODE = 'WAL'  # Readers never block the writer and the writer never blocks readers
+BUSY_TIMEOUT = 5.0  # Seconds SQLite itself waits for a lock before reporting "database is locked"
+LOCK_RETRIES = 5  # Further attempts after that, each after an exponential backoff
+LOCK_RETRY_BACKOFF = 0.05  # Seconds before the first retry; doubled for each one after
+
+SPIN_EVENT_COLUMNS = ['user_id', 'session_id', 'timestamp', 'reel1', 'reel2', 'reel3', 'reel4', 'reel5',
+                      'bet_amount', 'win_amount', 'balance_after', 'jackpot_pool', 'win_type']
+
+# Rollup tables: grain -> (table, key columns); totals are kept per key
+ROLLUP_TABLES = {
+    'hour': ('spin_rollup_hourly', ['period']),
+    'day': ('spin_rollup_daily', ['period']),
+    'user_day': ('spin_rollup_user_daily', ['user_id', 'period'])
+}
+ROLLUP_COLUMNS = ['total_spins', 'total_bets', 'total_wins', 'win_count', 'bonus_count', 'jackpot_count']
+
+def configure_storage(journal_mode=None, busy_timeout=None, lock_retries=None, lock_retry_backoff=None):
+    """Change the storage settings; pooled connections are closed so new ones pick them up
+    
+    journal_mode is 'WAL' (the default, for several slot processes sharing the
+    database) or a rollback journal mode such as 'DELETE'. Switching it needs
+    the database to be otherwise idle.
+    """
+    global JOURNAL_MODE, BUSY_TIMEOUT, LOCK_RETRIES, LOCK_RETRY_BACKOFF
+    
+    if journal_mode is not None:
+        JOURNAL_MODE = journal_mode.upper()
+    if busy_timeout is not None:
+        BUSY_TIMEOUT = busy_timeout
+    if lock_retries is not None:
+        LOCK_RETRIES = lock_retries
+    if lock_retry_backoff is not None:
+        LOCK_RETRY_BACKOFF = lock_retry_backoff
+    close_db_connections()
+
+def _is_lock_error(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+def _retry_locked(conn, operation, *args):
+    """Run operation(*args), retrying with backoff while the database stays locked
+    
+    Only a statement that opened its transaction (or a commit) is retried: a
+    lock error there means nothing of the transaction was applied, whereas a
+    lock error later in a transaction is left to the caller, which rolls back.
+    """
+    attempt = 0
+    while True:
+        opened_transaction = not conn.in_transaction
+        try:
+            return operation(*args)
+        except sql.OperationalError as e:
+            retryable = opened_transaction or operation == conn._commit
+            if not (retryable and _is_lock_error(e)) or attempt >= LOCK_RETRIES:
+                raise
+            if opened_transaction and conn.in_transaction:
+                conn.rollback()  # Start again from a fresh snapshot
+            time.sleep(LOCK_RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+            attempt += 1
+
+class RetryingCursor(sql.Cursor):
+    """Cursor whose statements go through _retry_locked()"""
+    
+    def execute(self, *args):
+        return _retry_locked(self.connection, super().execute, *args)
+    
+    def executemany(self, *args):
+        return _retry_locked(self.connection, super().executemany, *args)
+
+class PooledConnection(sql.Connection):
+    """sqlite3 connection kept open for reuse by its thread
+    
+    close() only rolls back anything left uncommitted, matching what a real
+    close would discard, and leaves the connection (and its statement cache)
+    open for the next get_db_connection() call. close_db_connections() closes
+    them for good and runs at exit.
+    
+    Statements and commits that hit a lock after the busy timeout are retried
+    (see _retry_locked()).
+    """
+    
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+    
+    def close_connection(self):
+        super().close()
+    
+    def cursor(self, factory=RetryingCursor):
+        return super().cursor(factory)
+    
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+    
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+    
+    def commit(self):
+        return _retry_locked(self, self._commit)
+    
+    def _commit(self):
+        super().commit()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The built-in context manager commits without going through commit()
+        if exc_type is None:
+            try:
+                self.commit()
+            except BaseException:
+                self.rollback()
+                raise
+        else:
+            self.rollback()
+        return False
+
+_local = threading.local()
+_connections = []  # (pid, connection) for every pooled connection
+_connections_lock = threading.Lock()
+_pool_generation = 0  # Bumped by close_db_connections() so threads drop closed connections
+
+def get_db_connection(readonly=False):
+    """This thread's connection to DB_PATH, opened and configured on first use
+    
+    Writable connections start their write transactions IMMEDIATE, so a writer
+    waits for the lock up front instead of failing halfway through.
+    readonly=True gives a separate read-only connection for reporting queries,
+    which never takes a write lock and never queues behind one in WAL mode.
+    """
+    key = (os.getpid(), DB_PATH, readonly)  # A forked child must not reuse its parent's connection
+    pool = getattr(_local, 'connections', None)
+    if pool is None or _local.generation != _pool_generation:
+        pool = _local.connections = {}
+        _local.generation = _pool_generation
+    
+    conn = pool.get(key)
+    if conn is None:
+        # check_same_thread is off only so close_db_connections() can close it from another thread
+        if readonly:
+            conn = sql.connect(f'file:{urllib.parse.quote(DB_PATH)}?mode=ro', uri=True, timeout=BUSY_TIMEOUT,
+                               factory=PooledConnection, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        else:
+            conn = sql.connect(DB_PATH, timeout=BUSY_TIMEOUT, isolation_level='IMMEDIATE',
+                               factory=PooledConnection, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+            journal_mode = conn.execute(f'PRAGMA journal_mode = {JOURNAL_MODE}').fetchone()[0]
+            if journal_mode.upper() == 'WAL':
+                conn.execute('PRAGMA synchronous = NORMAL')  # Durable at each checkpoint, consistent always
+        for pragma, value in CONNECTION_PRAGMAS.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        pool[key] = conn
+        with _connections_lock:
+            _connections.append((os.getpid(), conn))
     return conn
 
-def initialize_db():
+def close_db_connections():
+    """Close every pooled connection opened by this process"""
+    global _pool_generation
+    
+    with _connections_lock:
+        _pool_generation += 1
+        connections = [conn for pid, conn in _connections if pid == os.getpid()]
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close_connection()
+        except sql.Error:
+            pass
+
+atexit.register(close_db_connections)
+
+def initialize_db(schema_version=None):
+    """Create any missing tables, then upgrade the schema (see migrate_db())"""
     conn = get_db_connection()
     c = conn.cursor()
     
@@ -63,7 +244,61 @@ def initialize_db():
                     FOREIGN KEY (user_id) REFERENCES user_profiles (user_id)
                 )''')
     
+    # Spin events table (one row per spin, written in batches)
+    c.execute('''CREATE TABLE IF NOT EXISTS spin_events (
+                    event_id INTEGER PRIMARY KEY,
+                    user_id TEXT,
+                    session_id INTEGER,
+                    timestamp TEXT,
+                    reel1 TEXT,
+                    reel2 TEXT,
+                    reel3 TEXT,
+                    reel4 TEXT,
+                    reel5 TEXT,
+                    bet_amount REAL,
+                    win_amount REAL,
+                    balance_after REAL,
+                    jackpot_pool REAL,
+                    win_type TEXT,
+                    FOREIGN KEY (user_id) REFERENCES user_profiles (user_id),
+                    FOREIGN KEY (session_id) REFERENCES session_logs (session_id)
+                )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_spin_events_timestamp ON spin_events (timestamp)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_spin_events_user ON spin_events (user_id, timestamp)')
+    
+    # Every jackpot paid
+    c.execute('''CREATE TABLE IF NOT EXISTS jackpot_awards (
+                    award_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    session_id INTEGER,
+                    amount REAL,
+                    reset_to REAL,
+                    awarded_at TEXT
+                )''')
+    
+    # Spin rollups by hour, day and user-day, kept current by save_spin_events.
+    # WITHOUT ROWID stores each row in its primary key, so range scans are covered.
+    for table, keys in ROLLUP_TABLES.values():
+        key_columns = ''.join(f'{key} TEXT NOT NULL, ' for key in keys)
+        c.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+                        {key_columns}
+                        total_spins INTEGER DEFAULT 0,
+                        total_bets REAL DEFAULT 0,
+                        total_wins REAL DEFAULT 0,
+                        win_count INTEGER DEFAULT 0,
+                        bonus_count INTEGER DEFAULT 0,
+                        jackpot_count INTEGER DEFAULT 0,
+                        PRIMARY KEY ({', '.join(keys)})
+                    ) WITHOUT ROWID''')
+    
     conn.commit()
+    
+    migrate_db(conn, schema_version)
+
+    # Spins recorded before the rollup tables existed
+    c.execute('SELECT EXISTS (SELECT 1 FROM spin_rollup_hourly) OR NOT EXISTS (SELECT 1 FROM spin_events)')
+    if not c.fetchone()[0]:
+        rebuild_spin_rollups(conn)
 
     # Initialize database with default values if empty
     c.execute('SELECT COUNT(*) FROM game_data')
@@ -73,48 +308,377 @@ def initialize_db():
 
     conn.close()
 
+# Schema migrations, applied in order by migrate_db(). The database's
+# PRAGMA user_version is the number of the last one applied.
+
+def _migrate_username_index(c):
+    # get_user_profile_by_username() runs on every login
+    c.execute('CREATE INDEX IF NOT EXISTS idx_user_profiles_username ON user_profiles (username)')
+
+def _migrate_session_index(c):
+    # get_user_sessions() and get_session_stats() select one user's sessions by start time
+    c.execute('CREATE INDEX IF NOT EXISTS idx_session_logs_user ON session_logs (user_id, started_at)')
+
+def _migrate_unique_session_date(c):
+    # One summary row per day; keep the most recent where older versions wrote duplicates
+    c.execute('''DELETE FROM analytics_summary
+                 WHERE session_date IS NOT NULL
+                   AND id NOT IN (SELECT MAX(id) FROM analytics_summary GROUP BY session_date)''')
+    c.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_analytics_summary_session_date
+                 ON analytics_summary (session_date)''')
+
+def _migrate_unshard_jackpot(c):
+    # Contributions once went to per-process counters; fold any still pending into the pool
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jackpot_contributions'")
+    if c.fetchone():
+        c.execute('''UPDATE game_data
+                     SET jackpot_pool = jackpot_pool + (SELECT COALESCE(SUM(amount), 0) FROM jackpot_contributions)
+                     WHERE id = 1''')
+        c.execute('DROP TABLE jackpot_contributions')
+
+MIGRATIONS = [
+    (1, 'Index user_profiles.username', _migrate_username_index),
+    (2, 'Index session_logs by user and start time', _migrate_session_index),
+    (3, 'Unique analytics_summary.session_date', _migrate_unique_session_date),
+    (4, 'Fold sharded jackpot contributions into game_data', _migrate_unshard_jackpot)
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn=None):
+    own_connection = conn is None
+    conn = conn or get_db_connection()
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        if own_connection:
+            conn.close()
+
+def migrate_db(conn=None, target_version=None):
+    """Apply pending migrations up to target_version (default: all); returns the schema version
+    
+    Existing databases are upgraded in place. Each migration runs in its own
+    IMMEDIATE transaction together with its user_version bump, so a failed
+    migration leaves the previous version intact, and of several processes
+    starting at once exactly one applies each migration.
+    """
+    own_connection = conn is None
+    conn = conn or get_db_connection()
+    target_version = SCHEMA_VERSION if target_version is None else target_version
+    
+    try:
+        for version, description, migrate in MIGRATIONS:
+            if version > target_version:
+                break
+            if get_schema_version(conn) >= version:
+                continue
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have migrated while this one waited for the lock
+                if get_schema_version(conn) < version:
+                    migrate(conn.cursor())
+                    conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            print(f"🗃️ Database schema upgraded to version {version}: {description}")
+        return get_schema_version(conn)
+    finally:
+        if own_connection:
+            conn.close()
+
 def save_analytics_to_db(analytics_data):
-    """Save analytics summary to database"""
+    """Save today's analytics summary to database (upsert on session_date)
+    
+    Databases older than schema version 3 have no unique session_date index
+    for ON CONFLICT, so they keep the select-then-update path.
+    """
     from datetime import datetime
     
     conn = get_db_connection()
+    
+    try:
+        c = conn.cursor()
+        
+        session_date = datetime.now().strftime('%Y-%m-%d')
+        last_updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        values = (analytics_data['total_spins'], analytics_data['total_bets'],
+                  analytics_data['total_wins'], analytics_data['rtp_percentage'],
+                  analytics_data['win_rate_percentage'], analytics_data['bonus_count'],
+                  analytics_data['jackpot_count'], last_updated)
+        
+        if get_schema_version(conn) >= 3:
+            c.execute('''INSERT INTO analytics_summary 
+                         (session_date, total_spins, total_bets, total_wins,
+                          rtp_percentage, win_rate_percentage, bonus_rounds,
+                          jackpot_wins, last_updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                         ON CONFLICT (session_date) DO UPDATE SET
+                         total_spins = excluded.total_spins, total_bets = excluded.total_bets,
+                         total_wins = excluded.total_wins, rtp_percentage = excluded.rtp_percentage,
+                         win_rate_percentage = excluded.win_rate_percentage,
+                         bonus_rounds = excluded.bonus_rounds, jackpot_wins = excluded.jackpot_wins,
+                         last_updated = excluded.last_updated''',
+                      (session_date,) + values)
+        else:
+            # Check if today's record exists
+            c.execute('SELECT id FROM analytics_summary WHERE session_date = ?', (session_date,))
+            if c.fetchone():
+                c.execute('''UPDATE analytics_summary SET 
+                             total_spins = ?, total_bets = ?, total_wins = ?,
+                             rtp_percentage = ?, win_rate_percentage = ?,
+                             bonus_rounds = ?, jackpot_wins = ?, last_updated = ?
+                             WHERE session_date = ?''',
+                          values + (session_date,))
+            else:
+                c.execute('''INSERT INTO analytics_summary 
+                             (session_date, total_spins, total_bets, total_wins,
+                              rtp_percentage, win_rate_percentage, bonus_rounds,
+                              jackpot_wins, last_updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                          (session_date,) + values)
+        
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Error saving analytics summary: {e}")
+        return False
+    finally:
+        conn.close()
+
+def _rollup_period(grain, timestamp):
+    """Rollup key of a 'YYYY-MM-DD HH:MM:SS' timestamp: 'YYYY-MM-DD HH:00:00' by hour, the date by day"""
+    timestamp = str(timestamp or '')
+    if grain != 'hour':
+        return timestamp[:10]
+    return (timestamp[:13] if len(timestamp) >= 13 else timestamp[:10] + ' 00') + ':00:00'
+
+def _upsert_rollups(conn, events):
+    """Add a batch of spins to the rollup tables (call inside the batch's transaction)"""
+    totals = {grain: {} for grain in ROLLUP_TABLES}
+    for event in events:
+        bet_amount = float(event.get('bet_amount') or 0)
+        win_amount = float(event.get('win_amount') or 0)
+        win_type = event.get('win_type')
+        spin = (1, bet_amount, win_amount, int(win_amount > 0),
+                int(win_type == 'bonus_round'), int(win_type == 'jackpot'))
+        keys = {
+            'hour': (_rollup_period('hour', event.get('timestamp')),),
+            'day': (_rollup_period('day', event.get('timestamp')),),
+            'user_day': (str(event.get('user_id')), _rollup_period('day', event.get('timestamp')))
+        }
+        for grain, key in keys.items():
+            if grain == 'user_day' and event.get('user_id') is None:
+                continue
+            current = totals[grain].get(key)
+            totals[grain][key] = spin if current is None else tuple(a + b for a, b in zip(current, spin))
+    
+    for grain, (table, keys) in ROLLUP_TABLES.items():
+        columns = keys + ROLLUP_COLUMNS
+        conn.executemany(f'''INSERT INTO {table} ({', '.join(columns)})
+                             VALUES ({', '.join('?' * len(columns))})
+                             ON CONFLICT ({', '.join(keys)}) DO UPDATE SET
+                             {', '.join(f'{column} = {column} + excluded.{column}' for column in ROLLUP_COLUMNS)}''',
+                         [key + spin for key, spin in totals[grain].items()])
+
+def rebuild_spin_rollups(conn=None):
+    """Recompute every rollup table from spin_events"""
+    own_connection = conn is None
+    conn = conn or get_db_connection()
+    
+    try:
+        period = {'hour': "substr(timestamp, 1, 13) || ':00:00'", 'day': 'substr(timestamp, 1, 10)'}
+        with conn:
+            for grain, (table, keys) in ROLLUP_TABLES.items():
+                conn.execute(f'DELETE FROM {table}')
+                group = ['CAST(user_id AS TEXT)', period['day']] if grain == 'user_day' else [period[grain]]
+                where = 'WHERE user_id IS NOT NULL' if grain == 'user_day' else ''
+                conn.execute(f'''INSERT INTO {table} ({', '.join(keys + ROLLUP_COLUMNS)})
+                                 SELECT {', '.join(group)}, COUNT(*), SUM(bet_amount), SUM(win_amount),
+                                        SUM(win_amount > 0), SUM(win_type = 'bonus_round'), SUM(win_type = 'jackpot')
+                                 FROM spin_events {where} GROUP BY {', '.join(group)}''')
+        return True
+    except Exception as e:
+        print(f"❌ Error rebuilding spin rollups: {e}")
+        return False
+    finally:
+        if own_connection:
+            conn.close()
+
+def save_spin_events(events):
+    """Insert a batch of spin records (dicts keyed like SPIN_EVENT_COLUMNS) in one transaction
+    
+    The hourly, daily and per-user daily rollups are updated in the same transaction.
+    """
+    conn = get_db_connection()
+    
+    try:
+        rows = [tuple(event.get(column) for column in SPIN_EVENT_COLUMNS) for event in events]
+        with conn:
+            conn.executemany(f'''INSERT INTO spin_events ({', '.join(SPIN_EVENT_COLUMNS)})
+                                 VALUES ({', '.join('?' * len(SPIN_EVENT_COLUMNS))})''', rows)
+            _upsert_rollups(conn, events)
+        return True
+    except Exception as e:
+        print(f"❌ Error saving spin events: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_spin_analytics(user_id=None, start_time=None, end_time=None):
+    """Analytics over spin_events, optionally for one user and a [start_time, end_time) window
+    
+    Times are 'YYYY-MM-DD HH:MM:SS' strings (a date alone also works as a bound).
+    Returns the same keys as calculate_analytics().
+    """
+    conn = get_db_connection(readonly=True)
     c = conn.cursor()
     
-    session_date = datetime.now().strftime('%Y-%m-%d')
-    last_updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Check if today's record exists
-    c.execute('SELECT id FROM analytics_summary WHERE session_date = ?', (session_date,))
-    existing = c.fetchone()
-    
-    if existing:
-        # Update existing record
-        c.execute('''UPDATE analytics_summary SET 
-                     total_spins = ?, total_bets = ?, total_wins = ?,
-                     rtp_percentage = ?, win_rate_percentage = ?,
-                     bonus_rounds = ?, jackpot_wins = ?, last_updated = ?
-                     WHERE session_date = ?''',
-                  (analytics_data['total_spins'], analytics_data['total_bets'],
-                   analytics_data['total_wins'], analytics_data['rtp_percentage'],
-                   analytics_data['win_rate_percentage'], analytics_data['bonus_count'],
-                   analytics_data['jackpot_count'], last_updated, session_date))
-    else:
-        # Insert new record
-        c.execute('''INSERT INTO analytics_summary 
-                     (session_date, total_spins, total_bets, total_wins,
-                      rtp_percentage, win_rate_percentage, bonus_rounds,
-                      jackpot_wins, last_updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (session_date, analytics_data['total_spins'], analytics_data['total_bets'],
-                   analytics_data['total_wins'], analytics_data['rtp_percentage'],
-                   analytics_data['win_rate_percentage'], analytics_data['bonus_count'],
-                   analytics_data['jackpot_count'], last_updated))
+    conditions = []
+    params = []
+    if user_id is not None:
+        conditions.append('user_id = ?')
+        params.append(user_id)
+    if start_time is not None:
+        conditions.append('timestamp >= ?')
+        params.append(start_time)
+    if end_time is not None:
+        conditions.append('timestamp < ?')
+        params.append(end_time)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
     
-    conn.commit()
-    conn.close()
+    try:
+        c.execute(f'''SELECT 
+                        COUNT(*),
+                        COALESCE(SUM(bet_amount), 0),
+                        COALESCE(SUM(win_amount), 0),
+                        COALESCE(SUM(win_amount > 0), 0),
+                        COALESCE(SUM(win_type = 'bonus_round'), 0),
+                        COALESCE(SUM(win_type = 'jackpot'), 0)
+                     FROM spin_events {where}''', params)
+        
+        total_spins, total_bets, total_wins, win_count, bonus_count, jackpot_count = c.fetchone()
+        
+        rtp = (total_wins / total_bets * 100) if total_bets > 0 else 0
+        win_rate = (win_count / total_spins * 100) if total_spins > 0 else 0
+        
+        return {
+            'total_spins': total_spins,
+            'total_bets': total_bets,
+            'total_wins': total_wins,
+            'net_result': total_wins - total_bets,
+            'rtp_percentage': round(rtp, 2),
+            'win_rate_percentage': round(win_rate, 2),
+            'win_count': win_count,
+            'bonus_count': bonus_count,
+            'jackpot_count': jackpot_count,
+            'average_bet': round(total_bets / total_spins, 2) if total_spins > 0 else 0,
+            'average_win': round(total_wins / win_count, 2) if win_count > 0 else 0
+        }
+    except Exception as e:
+        print(f"❌ Error getting spin analytics: {e}")
+        return None
+    finally:
+        conn.close()
+
+def _rollup_query(grain, start_time, end_time, user_id):
+    """FROM/WHERE clause and parameters for rollup rows in [start_time, end_time)
+    
+    Bounds are rounded down to the grain, so a bound inside an hour or day
+    includes (start) or excludes (end) that whole period.
+    """
+    if grain not in ROLLUP_TABLES:
+        raise ValueError(f"Unknown rollup grain {grain!r}; expected one of {list(ROLLUP_TABLES)}")
+    if user_id is not None and grain != 'user_day':
+        raise ValueError("Per-user rollups are only kept by day (grain='user_day')")
+    
+    table = ROLLUP_TABLES[grain][0]
+    bound_grain = 'hour' if grain == 'hour' else 'day'
+    conditions = []
+    params = []
+    if user_id is not None:
+        conditions.append('user_id = ?')
+        params.append(str(user_id))
+    if start_time is not None:
+        conditions.append('period >= ?')
+        params.append(_rollup_period(bound_grain, start_time))
+    if end_time is not None:
+        conditions.append('period < ?')
+        params.append(_rollup_period(bound_grain, end_time))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return f'FROM {table} {where}', params
+
+def get_rollup_series(grain='day', start_time=None, end_time=None, user_id=None):
+    """Per-period totals from the rollup tables, oldest first
+    
+    grain is 'hour', 'day' or 'user_day' (which also takes user_id; without one
+    it returns every user's days). Each row is a dict with the period, the
+    user_id for 'user_day', and the calculate_analytics() keys.
+    """
+    conn = get_db_connection(readonly=True)
+    c = conn.cursor()
+    
+    try:
+        source, params = _rollup_query(grain, start_time, end_time, user_id)
+        keys = ROLLUP_TABLES[grain][1]
+        c.execute(f'''SELECT {', '.join(keys + ROLLUP_COLUMNS)} {source}
+                     ORDER BY period{', user_id' if grain == 'user_day' else ''}''', params)
+        
+        series = []
+        for row in c.fetchall():
+            entry = dict(zip(keys, row[:len(keys)]))
+            entry.update(_rollup_analytics(*row[len(keys):]))
+            series.append(entry)
+        return series
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"❌ Error getting rollup series: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_rollup_analytics(start_time=None, end_time=None, user_id=None):
+    """Totals over [start_time, end_time) from the rollups, without touching spin_events
+    
+    Uses hourly rollups (bounds rounded down to the hour), or per-user daily
+    rollups when user_id is given (bounds rounded down to the day).
+    Returns the same keys as calculate_analytics().
+    """
+    conn = get_db_connection(readonly=True)
+    c = conn.cursor()
+    
+    try:
+        grain = 'hour' if user_id is None else 'user_day'
+        source, params = _rollup_query(grain, start_time, end_time, user_id)
+        c.execute(f'''SELECT {', '.join(f'COALESCE(SUM({column}), 0)' for column in ROLLUP_COLUMNS)}
+                     {source}''', params)
+        return _rollup_analytics(*c.fetchone())
+    except Exception as e:
+        print(f"❌ Error getting rollup analytics: {e}")
+        return None
+    finally:
+        conn.close()
+
+def _rollup_analytics(total_spins, total_bets, total_wins, win_count, bonus_count, jackpot_count):
+    rtp = (total_wins / total_bets * 100) if total_bets > 0 else 0
+    win_rate = (win_count / total_spins * 100) if total_spins > 0 else 0
+    
+    return {
+        'total_spins': total_spins,
+        'total_bets': total_bets,
+        'total_wins': total_wins,
+        'net_result': total_wins - total_bets,
+        'rtp_percentage': round(rtp, 2),
+        'win_rate_percentage': round(win_rate, 2),
+        'win_count': win_count,
+        'bonus_count': bonus_count,
+        'jackpot_count': jackpot_count,
+        'average_bet': round(total_bets / total_spins, 2) if total_spins > 0 else 0,
+        'average_win': round(total_wins / win_count, 2) if win_count > 0 else 0
+    }
 
 def get_historical_analytics():
     """Get historical analytics from database"""
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     c = conn.cursor()
     
     c.execute('''SELECT session_date, total_spins, total_bets, total_wins,
@@ -392,7 +956,7 @@ def end_session(session_id, end_balance, session_spins, session_bets, session_wi
 
 def get_user_sessions(user_id, limit=10):
     """Get user's recent sessions"""
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     c = conn.cursor()
     
     try:
@@ -413,7 +977,7 @@ def get_user_sessions(user_id, limit=10):
 
 def get_session_stats(user_id):
     """Get aggregated session statistics for a user"""
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     c = conn.cursor()
     
     try:
@@ -454,9 +1018,186 @@ def fetch_initial_values():
     conn.close()
     return values
 
+def get_jackpot_pool():
+    """Current jackpot pool, every committed contribution included"""
+    conn = get_db_connection(readonly=True)
+    c = conn.cursor()
+    c.execute('SELECT jackpot_pool FROM game_data WHERE id = 1')
+    pool = c.fetchone()[0]
+    conn.close()
+    return pool
+
 def update_jackpot_pool(jackpot_pool):
+    """Set the pool outright
+    
+    For administration only: in play, use contribute_jackpot() and
+    award_jackpot(), which never lose another process's contributions.
+    """
     conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('UPDATE game_data SET jackpot_pool = ? WHERE id = 1', (jackpot_pool,))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    with conn:
+        conn.execute('UPDATE game_data SET jackpot_pool = ? WHERE id = 1', (jackpot_pool,))
+    conn.close()
+
+def _add_jackpot_contribution(conn, amount):
+    # One atomic increment of the single pool row, inside the caller's transaction.
+    # SQLite has one writer at a time, so spreading it over several rows gains nothing.
+    conn.execute('UPDATE game_data SET jackpot_pool = jackpot_pool + ? WHERE id = 1', (amount,))
+
+def contribute_jackpot(amount):
+    """Atomically add a contribution (or the sum of several spins') to the jackpot"""
+    conn = get_db_connection()
+    
+    try:
+        with conn:
+            _add_jackpot_contribution(conn, amount)
+        return True
+    except Exception as e:
+        print(f"❌ Error adding jackpot contribution: {e}")
+        return False
+    finally:
+        conn.close()
+
+def award_jackpot(jackpot_reset, user_id=None, session_id=None, contribution=0.0):
+    """Pay out the whole pool and reset it to jackpot_reset; returns the amount won
+    
+    One IMMEDIATE transaction adds the winning spin's contribution, reads the
+    pool, resets it and records the award in jackpot_awards.
+    Awards are serialized by the write lock, so each contribution is paid out
+    exactly once: of two simultaneous winners, the second wins what was
+    contributed after the first. Raises if the award could not be recorded.
+    """
+    from datetime import datetime
+    
+    conn = get_db_connection()
+    
+    try:
+        with conn:
+            # The increment takes the write lock before the pool is read
+            _add_jackpot_contribution(conn, contribution)
+            payout = conn.execute('SELECT jackpot_pool FROM game_data WHERE id = 1').fetchone()[0]
+            conn.execute('UPDATE game_data SET jackpot_pool = ? WHERE id = 1', (jackpot_reset,))
+            conn.execute('''INSERT INTO jackpot_awards (user_id, session_id, amount, reset_to, awarded_at)
+                            VALUES (?, ?, ?, ?, ?)''',
+                         (user_id, session_id, payout, jackpot_reset, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        return payout
+    finally:
+        conn.close()
+
+class SpinLedger:
+    """Records each spin's balance, jackpot, session and user-stat changes in one transaction
+    
+    With group_commit=1 (the default) every record_spin() commits at once.
+    A larger value buffers spins and commits them together once group_commit
+    spins are pending; a timer commits them commit_interval seconds after the
+    first was queued even if no further spin arrives, so at most that window
+    of changes is ever uncommitted. flush() and close() (also run at exit)
+    commit whatever is pending.
+    
+    Jackpot contributions go to the shared pool with contribute_jackpot()'s
+    atomic increments; a jackpot is paid through award_jackpot().
+    
+    user_id and session_id may be None (guest play); the jackpot is still recorded.
+    """
+    
+    def __init__(self, user_id=None, session_id=None, group_commit=1, commit_interval=1.0):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.group_commit = max(1, group_commit)
+        self.commit_interval = commit_interval
+        self._pending = []
+        self._lock = threading.RLock()  # The interval timer flushes from its own thread
+        self._timer = None
+        atexit.register(self.close)
+    
+    def record_spin(self, bet, win, balance_after, jackpot_contribution=0.0):
+        """Queue one spin
+        
+        Returns False if a commit was due and failed (the spins stay pending).
+        """
+        with self._lock:
+            self._pending.append((bet, win, balance_after, jackpot_contribution))
+            if len(self._pending) >= self.group_commit:
+                return self.flush()
+            if self._timer is None:
+                self._timer = threading.Timer(self.commit_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return True
+    
+    def flush(self):
+        """Commit every pending spin in a single transaction"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            return self._flush()
+    
+    def _flush(self):
+        from datetime import datetime
+        
+        if not self._pending:
+            return True
+        
+        spins = len(self._pending)
+        bets = sum(spin[0] for spin in self._pending)
+        wins = sum(spin[1] for spin in self._pending)
+        biggest_win = max(spin[1] for spin in self._pending)
+        balance = self._pending[-1][2]
+        
+        contributions = sum(spin[3] for spin in self._pending)
+        
+        conn = get_db_connection()
+        
+        try:
+            with conn:
+                if contributions:
+                    _add_jackpot_contribution(conn, contributions)
+                
+                if self.user_id is not None:
+                    conn.execute('''UPDATE user_profiles 
+                                    SET balance = ?, last_login = ?,
+                                        total_spins = total_spins + ?,
+                                        total_bets = total_bets + ?,
+                                        total_wins = total_wins + ?,
+                                        biggest_win = MAX(biggest_win, ?)
+                                    WHERE user_id = ?''',
+                                 (balance, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), spins, bets, wins,
+                                  biggest_win, self.user_id))
+                
+                if self.session_id is not None:
+                    conn.execute('''UPDATE session_logs 
+                                    SET session_spins = session_spins + ?,
+                                        session_bets = session_bets + ?,
+                                        session_wins = session_wins + ?
+                                    WHERE session_id = ?''',
+                                 (spins, bets, wins, self.session_id))
+            
+            self._pending = []
+            return True
+        except Exception as e:
+            print(f"❌ Error recording spins: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    @property
+    def pending_jackpot_contributions(self):
+        with self._lock:
+            return sum(spin[3] for spin in self._pending)
+    
+    def jackpot_pool(self):
+        """The shared pool as it will stand once this ledger's pending spins are committed"""
+        return get_jackpot_pool() + self.pending_jackpot_contributions
+    
+    def award_jackpot(self, jackpot_reset, jackpot_contribution=0.0):
+        """Commit pending spins, then pay out the pool (including the winning spin's
+        jackpot_contribution) through award_jackpot(); returns the amount won
+        
+        Record the winning spin afterwards with no jackpot contribution, since it is already in.
+        """
+        self.flush()
+        return award_jackpot(jackpot_reset, self.user_id, self.session_id, jackpot_contribution)
+    
+    def close(self):
+        self.flush()
+        atexit.unregister(self.close)
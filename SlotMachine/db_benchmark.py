@@ -0,0 +1,378 @@
+"""
+Benchmarks for the slot machine database
+stress: several processes play against one database at once, each spin
+saving a balance and contributing to the jackpot, with a share of reporting
+reads, for each process count and journal mode. Prints throughput, failed
+operations and latency percentiles, so WAL can be compared with the rollback
+journal as processes are added
+jackpot: processes contribute to the shared jackpot as fast as they can and
+now and then win it, then the books are checked: every contribution must be
+either paid out exactly once or still in the pool
+scale: grows an unmigrated (schema version 0) and a fully migrated database
+side by side, timing login, session-list and session-stats lookups at each
+size, then upgrades the unmigrated one in place and times that
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import database.db as db
+
+DEFAULT_PROCESSES = (1, 2, 4, 8)
+DEFAULT_JOURNAL_MODES = ('WAL', 'DELETE')
+DEFAULT_DURATION = 5.0  # Seconds of load per run
+DEFAULT_READ_RATIO = 0.2  # Share of operations that are reporting reads
+DEFAULT_USERS = 100
+DEFAULT_AWARD_RATE = 0.001  # Share of jackpot-benchmark operations that win the pool
+JACKPOT_RESET = 500.0
+DEFAULT_SCALE_USERS = (10_000, 100_000, 1_000_000)
+DEFAULT_SESSIONS_PER_USER = 10
+DEFAULT_LOOKUPS = 200  # Lookups timed per size on the migrated database
+DEFAULT_BASELINE_LOOKUPS = 10  # Fewer on the unmigrated one, where each is a table scan
+INSERT_BATCH = 100_000
+START_DELAY = 1.0  # Seconds for every worker to be ready before the shared start time
+
+
+def _stress_worker(db_path: str, journal_mode: str, busy_timeout: float, worker: int, start_at: float,
+                   duration: float, read_ratio: float, users: int) -> Dict[str, Any]:
+    """Run operations from start_at for duration seconds; counts and latencies in ms"""
+    db.DB_PATH = db_path
+    db.configure_storage(journal_mode=journal_mode, busy_timeout=busy_timeout)
+    rng = random.Random(worker)
+    user_ids = [f'stress_{i}' for i in range(users)]
+    counts = {'writes': 0, 'reads': 0, 'failures': 0}
+    latencies = []
+
+    db.get_db_connection()
+    db.get_db_connection(readonly=True)
+    time.sleep(max(0.0, start_at - time.time()))
+    end = time.perf_counter() + duration
+    # The db functions report their own failures on stdout; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        while True:
+            started = time.perf_counter()
+            if started >= end:
+                break
+            user_id = rng.choice(user_ids)
+            try:
+                if rng.random() < read_ratio:
+                    kind = 'reads'
+                    ok = db.get_session_stats(user_id) is not None
+                    db.get_historical_analytics()
+                else:
+                    kind = 'writes'
+                    ok = db.save_balance(user_id, rng.uniform(0, 1000)) and db.contribute_jackpot(0.01)
+            except sqlite3.Error:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            counts[kind if ok else 'failures'] += 1
+    db.close_db_connections()
+    return {**counts, 'latencies': latencies}
+
+
+def _prepare_database(db_path: str, journal_mode: str, users: int):
+    db.DB_PATH = db_path
+    db.configure_storage(journal_mode=journal_mode)
+    db.initialize_db()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(users):
+            db.save_balance(f'stress_{i}', 1000)
+            db.end_session(db.start_session(f'stress_{i}', 1000), 1000, 0, 0, 0)
+    db.close_db_connections()
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+def run_stress(processes: Sequence[int] = DEFAULT_PROCESSES, journal_modes: Sequence[str] = DEFAULT_JOURNAL_MODES,
+               duration: float = DEFAULT_DURATION, read_ratio: float = DEFAULT_READ_RATIO,
+               busy_timeout: float = db.BUSY_TIMEOUT, users: int = DEFAULT_USERS,
+               directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """One stress run per journal mode and process count, each on a fresh database"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as workdir:
+        for journal_mode in journal_modes:
+            template = os.path.join(workdir, f'template_{journal_mode.lower()}.db')
+            _prepare_database(template, journal_mode, users)
+            for count in processes:
+                db_path = os.path.join(workdir, f'stress_{journal_mode.lower()}_{count}.db')
+                shutil.copyfile(template, db_path)
+                start_at = time.time() + START_DELAY
+                with ProcessPoolExecutor(max_workers=count) as executor:
+                    futures = [executor.submit(_stress_worker, db_path, journal_mode, busy_timeout, worker,
+                                               start_at, duration, read_ratio, users)
+                               for worker in range(count)]
+                    runs = [future.result() for future in futures]
+
+                latencies = [latency for run in runs for latency in run['latencies']]
+                writes = sum(run['writes'] for run in runs)
+                reads = sum(run['reads'] for run in runs)
+                results.append({
+                    'journal_mode': journal_mode.upper(),
+                    'processes': count,
+                    'writes': writes,
+                    'reads': reads,
+                    'failures': sum(run['failures'] for run in runs),
+                    'ops_per_second': (writes + reads) / duration,
+                    'p50_ms': _percentile(latencies, 50),
+                    'p99_ms': _percentile(latencies, 99),
+                    'max_ms': max(latencies, default=0.0)
+                })
+    return results
+
+
+def format_stress_report(results: List[Dict[str, Any]], duration: float) -> str:
+    """Format stress results for the console, with throughput relative to one process"""
+    report = f"\n🏋️ DATABASE STRESS ({duration:g}s per run, {os.cpu_count()} cores) 🏋️\n"
+    report += (f"{'Mode':<8}{'Procs':>6}{'Ops/s':>10}{'Scaling':>9}{'Writes':>9}{'Reads':>8}"
+               f"{'Failed':>8}{'P50 ms':>9}{'P99 ms':>9}{'Max ms':>9}\n")
+    baseline = {}
+    for result in results:
+        mode = result['journal_mode']
+        baseline.setdefault(mode, result['ops_per_second'])
+        scaling = result['ops_per_second'] / baseline[mode] if baseline[mode] else 0.0
+        report += (f"{mode:<8}{result['processes']:>6}{result['ops_per_second']:>10,.0f}{scaling:>8.2f}x"
+                   f"{result['writes']:>9,}{result['reads']:>8,}{result['failures']:>8,}"
+                   f"{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['max_ms']:>9.1f}\n")
+    return report
+
+
+def _jackpot_worker(db_path: str, worker: int, start_at: float, duration: float,
+                    award_rate: float) -> Dict[str, Any]:
+    """Contribute 0.01 per operation, winning the pool with probability award_rate"""
+    db.DB_PATH = db_path
+    db.close_db_connections()
+    rng = random.Random(worker)
+    contributed = 0.0
+    contributions = 0
+    paid = []
+    failures = 0
+
+    db.get_db_connection()
+    time.sleep(max(0.0, start_at - time.time()))
+    end = time.perf_counter() + duration
+    with contextlib.redirect_stdout(io.StringIO()):
+        while time.perf_counter() < end:
+            try:
+                if rng.random() < award_rate:
+                    paid.append(db.award_jackpot(JACKPOT_RESET, f'bench_{worker}', contribution=0.01))
+                    contributed += 0.01
+                    contributions += 1
+                elif db.contribute_jackpot(0.01):
+                    contributed += 0.01
+                    contributions += 1
+                else:
+                    failures += 1
+            except sqlite3.Error:
+                failures += 1
+    db.close_db_connections()
+    return {'contributed': contributed, 'contributions': contributions, 'paid': paid, 'failures': failures}
+
+
+def run_jackpot(processes: Sequence[int] = DEFAULT_PROCESSES, duration: float = DEFAULT_DURATION,
+                award_rate: float = DEFAULT_AWARD_RATE, directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """One jackpot run per process count, each on a fresh database, with its books checked"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as workdir:
+        for count in processes:
+            db_path = os.path.join(workdir, f'jackpot_{count}.db')
+            db.DB_PATH = db_path
+            db.initialize_db()
+            db.update_jackpot_pool(JACKPOT_RESET)
+            db.close_db_connections()
+
+            start_at = time.time() + START_DELAY
+            with ProcessPoolExecutor(max_workers=count) as executor:
+                futures = [executor.submit(_jackpot_worker, db_path, worker, start_at, duration, award_rate)
+                           for worker in range(count)]
+                runs = [future.result() for future in futures]
+
+            db.DB_PATH = db_path
+            final_pool = db.get_jackpot_pool()
+            recorded_awards = db.get_db_connection().execute(
+                'SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM jackpot_awards').fetchone()
+            db.close_db_connections()
+
+            paid = [amount for run in runs for amount in run['paid']]
+            contributed = sum(run['contributed'] for run in runs)
+            # Each award resets the pool to JACKPOT_RESET, so that much enters the books per award
+            expected_pool = JACKPOT_RESET + contributed + JACKPOT_RESET * len(paid) - sum(paid)
+            contributions = sum(run['contributions'] for run in runs)
+            results.append({
+                'processes': count,
+                'contributions': contributions,
+                'contributions_per_second': contributions / duration,
+                'awards': len(paid),
+                'recorded_awards': recorded_awards[0],
+                'failures': sum(run['failures'] for run in runs),
+                'final_pool': final_pool,
+                'discrepancy': final_pool - expected_pool + (recorded_awards[1] - sum(paid))
+            })
+    return results
+
+
+def format_jackpot_report(results: List[Dict[str, Any]], duration: float) -> str:
+    """Format jackpot results; a discrepancy other than rounding means lost or double-paid money"""
+    report = f"\n💰 JACKPOT CONTRIBUTIONS ({duration:g}s per run, {os.cpu_count()} cores) 💰\n"
+    report += (f"{'Procs':>6}{'Contrib/s':>11}{'Contributions':>15}{'Awards':>8}{'Recorded':>10}"
+               f"{'Failed':>8}{'Final pool':>13}{'Discrepancy':>13}\n")
+    for result in results:
+        report += (f"{result['processes']:>6}{result['contributions_per_second']:>11,.0f}"
+                   f"{result['contributions']:>15,}{result['awards']:>8,}{result['recorded_awards']:>10,}"
+                   f"{result['failures']:>8,}{result['final_pool']:>13,.2f}{result['discrepancy']:>13.6f}\n")
+    return report
+
+
+def _grow_database(db_path: str, first_user: int, last_user: int, sessions_per_user: int, rng: random.Random):
+    """Add users first_user..last_user-1, each with sessions_per_user ended sessions"""
+    db.DB_PATH = db_path
+    conn = db.get_db_connection()
+    created = '2025-01-01 00:00:00'
+    for start in range(first_user, last_user, INSERT_BATCH):
+        users = range(start, min(start + INSERT_BATCH, last_user))
+        with conn:
+            conn.executemany('''INSERT INTO user_profiles (user_id, username, balance, created_at, last_login)
+                                VALUES (?, ?, 1000, ?, ?)''',
+                             ((f'user_{i}', f'player_{i}', created, created) for i in users))
+            # Sessions arrive interleaved across users, as they would in play
+            sessions = [(f'user_{rng.choice(users)}', f'2025-{1 + n % 12:02d}-{1 + n % 28:02d} '
+                         f'{n % 24:02d}:{n % 60:02d}:00') for n in range(len(users) * sessions_per_user)]
+            conn.executemany('''INSERT INTO session_logs (user_id, start_balance, end_balance, session_spins,
+                                                          session_bets, session_wins, session_duration,
+                                                          started_at, ended_at)
+                                VALUES (?, 1000, 1000, 10, 10, 10, 60, ?, ?)''',
+                             ((user_id, started, started) for user_id, started in sessions))
+    conn.close()
+
+
+def _time_lookups(db_path: str, users: int, lookups: int, rng: random.Random) -> Dict[str, float]:
+    """Mean microseconds of each lookup function for random existing users"""
+    db.DB_PATH = db_path
+    samples = [rng.randrange(users) for _ in range(lookups)]
+    timings = {}
+    for name, lookup in (('login', lambda i: db.get_user_profile_by_username(f'player_{i}')),
+                         ('sessions', lambda i: db.get_user_sessions(f'user_{i}')),
+                         ('session_stats', lambda i: db.get_session_stats(f'user_{i}'))):
+        started = time.perf_counter()
+        for i in samples:
+            lookup(i)
+        timings[name] = (time.perf_counter() - started) / len(samples) * 1e6
+    return timings
+
+
+def run_scale(user_counts: Sequence[int] = DEFAULT_SCALE_USERS, sessions_per_user: int = DEFAULT_SESSIONS_PER_USER,
+              lookups: int = DEFAULT_LOOKUPS, baseline_lookups: int = DEFAULT_BASELINE_LOOKUPS,
+              directory: Optional[str] = None) -> Dict[str, Any]:
+    """Lookup timings per size, for version 0 and the latest schema, plus the in-place upgrade time"""
+    results = {'sizes': [], 'migration_seconds': None}
+    with tempfile.TemporaryDirectory(dir=directory) as workdir:
+        paths = {'v0': os.path.join(workdir, 'scale_v0.db'), 'latest': os.path.join(workdir, 'scale_latest.db')}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, db_path in paths.items():
+                db.DB_PATH = db_path
+                db.initialize_db(schema_version=0 if name == 'v0' else None)
+
+        grown = 0
+        for users in sorted(user_counts):
+            for name, db_path in paths.items():
+                _grow_database(db_path, grown, users, sessions_per_user, random.Random(users))
+            grown = users
+            size = {'users': users, 'sessions': users * sessions_per_user,
+                    'latest': _time_lookups(paths['latest'], users, lookups, random.Random(1))}
+            if baseline_lookups:
+                size['v0'] = _time_lookups(paths['v0'], users, baseline_lookups, random.Random(1))
+            results['sizes'].append(size)
+
+        db.DB_PATH = paths['v0']
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.migrate_db()
+        results['migration_seconds'] = time.perf_counter() - started
+        results['migrated'] = _time_lookups(paths['v0'], grown, lookups, random.Random(1))
+        db.close_db_connections()
+    return results
+
+
+def format_scale_report(results: Dict[str, Any]) -> str:
+    """Format scale results: mean lookup microseconds per size and schema"""
+    report = "\n📈 LOOKUPS BY DATABASE SIZE (mean µs per call) 📈\n"
+    report += (f"{'Users':>11}{'Sessions':>13}  {'Schema':<8}{'Login':>13}{'Sessions':>13}"
+               f"{'Stats':>13}\n")
+    for size in results['sizes']:
+        for schema in ('v0', 'latest'):
+            if schema not in size:
+                continue
+            timings = size[schema]
+            label = 'v0' if schema == 'v0' else f'v{db.SCHEMA_VERSION}'
+            report += (f"{size['users']:>11,}{size['sessions']:>13,}  {label:<8}{timings['login']:>13,.1f}"
+                       f"{timings['sessions']:>13,.1f}{timings['session_stats']:>13,.1f}\n")
+    if results['migration_seconds'] is not None:
+        timings = results['migrated']
+        report += (f"\nIn-place upgrade of the largest v0 database: {results['migration_seconds']:.1f}s; "
+                   f"afterwards login {timings['login']:,.1f} µs, sessions {timings['sessions']:,.1f} µs, "
+                   f"stats {timings['session_stats']:,.1f} µs\n")
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks for the slot machine database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stress = subparsers.add_parser("stress", help="Concurrent processes against one database")
+    stress.add_argument("--processes", type=int, nargs="+", default=list(DEFAULT_PROCESSES))
+    stress.add_argument("--journal-modes", nargs="+", default=list(DEFAULT_JOURNAL_MODES),
+                        help="Journal modes to compare (WAL, DELETE, TRUNCATE, ...)")
+    stress.add_argument("--seconds", type=float, default=DEFAULT_DURATION, help="Load duration per run")
+    stress.add_argument("--read-ratio", type=float, default=DEFAULT_READ_RATIO)
+    stress.add_argument("--busy-timeout", type=float, default=db.BUSY_TIMEOUT, help="SQLite busy timeout in seconds")
+    stress.add_argument("--users", type=int, default=DEFAULT_USERS)
+    stress.add_argument("--dir", default=None, help="Directory for the scratch databases (default: system temp)")
+
+    jackpot = subparsers.add_parser("jackpot", help="Concurrent jackpot contributions and awards")
+    jackpot.add_argument("--processes", type=int, nargs="+", default=list(DEFAULT_PROCESSES))
+    jackpot.add_argument("--seconds", type=float, default=DEFAULT_DURATION, help="Load duration per run")
+    jackpot.add_argument("--award-rate", type=float, default=DEFAULT_AWARD_RATE)
+    jackpot.add_argument("--dir", default=None, help="Directory for the scratch databases (default: system temp)")
+
+    scale = subparsers.add_parser("scale", help="Lookup latency as users and sessions grow, before and after "
+                                                "the schema migrations")
+    scale.add_argument("--users", type=int, nargs="+", default=list(DEFAULT_SCALE_USERS))
+    scale.add_argument("--sessions-per-user", type=int, default=DEFAULT_SESSIONS_PER_USER)
+    scale.add_argument("--lookups", type=int, default=DEFAULT_LOOKUPS)
+    scale.add_argument("--baseline-lookups", type=int, default=DEFAULT_BASELINE_LOOKUPS,
+                       help="Lookups on the unmigrated database (0 skips timing it)")
+    scale.add_argument("--dir", default=None, help="Directory for the scratch databases (default: system temp)")
+    args = parser.parse_args(argv)
+
+    if args.command == "scale":
+        print(format_scale_report(run_scale(args.users, args.sessions_per_user, args.lookups,
+                                            args.baseline_lookups, args.dir)))
+        return 0
+
+    if args.command == "jackpot":
+        print(format_jackpot_report(run_jackpot(args.processes, args.seconds, args.award_rate, args.dir),
+                                    args.seconds))
+        return 0
+
+    results = run_stress(args.processes, args.journal_modes, args.seconds, args.read_ratio,
+                         args.busy_timeout, args.users, args.dir)
+    print(format_stress_report(results, args.seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
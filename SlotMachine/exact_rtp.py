@@ -0,0 +1,250 @@
+"""
+Exact RTP engine for the slot machine
+Enumerates every five-reel outcome and applies the real check_win rules,
+including multipliers, bonus rounds and the jackpot trigger
+"""
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from batch_engine import REEL_COUNT, JACKPOT_SYMBOL, BatchWinEvaluator, BatchWinResult, SeedLike
+from config_manager import ConfigManager
+
+
+@dataclass
+class ExactRTPResult:
+    """Exact return figures for one configuration, bet and jackpot pool"""
+    bet: float
+    jackpot_pool: float
+    expected_win: float
+    rtp_percentage: float
+    base_rtp: float
+    bonus_rtp: float
+    jackpot_rtp: float
+    hit_frequency: float  # Spins that pay anything, bonus rounds included, as the simulators count them
+    bonus_frequency: float
+    jackpot_frequency: float
+    expected_bonus_round_win: float
+    outcome_count: int
+    combination_contributions: Dict[str, float] = field(default_factory=dict)
+
+
+class ExactRTPEngine:
+    """Computes true RTP by enumerating all k^5 reel outcomes"""
+
+    def __init__(self, config_data: Dict[str, Any], jackpot_symbol: str = JACKPOT_SYMBOL):
+        self.config = config_data
+        self.evaluator = BatchWinEvaluator.from_config(config_data, jackpot_symbol)
+        self.symbol_table = self.evaluator.symbol_table
+
+        k = len(self.symbol_table)
+        shape = (k,) * REEL_COUNT
+
+        # Row-major enumeration so outcome i has codes np.unravel_index(i, shape)
+        self.outcomes = np.indices(shape, dtype=np.uint8).reshape(REEL_COUNT, -1).T
+        probabilities = self.symbol_table.probabilities
+        joint = probabilities
+        for _ in range(REEL_COUNT - 1):
+            joint = np.multiply.outer(joint, probabilities)
+        self.probabilities = joint.ravel()
+
+    @property
+    def bonus_spins(self) -> int:
+        return self.config.get('bonus_settings', {}).get('bonus_spins', 3)
+
+    @property
+    def default_jackpot_pool(self) -> float:
+        return self.config['game_settings'].get('initial_jackpot_pool', 0)
+
+    def evaluate_outcomes(self, jackpot_pool: Optional[float] = None) -> BatchWinResult:
+        """check_win results for every outcome, aligned with self.probabilities"""
+        if jackpot_pool is None:
+            jackpot_pool = self.default_jackpot_pool
+        return self.evaluator.evaluate(self.outcomes, jackpot_pool)
+
+    def expected_bonus_round_win(self, results: Optional[BatchWinResult] = None) -> float:
+        """Expected total paid by a bonus round of free spins
+
+        Free spins call check_win(reels, 0, 0): only paytable lines pay, a jackpot
+        pays the zero pool and a nested bonus trigger pays nothing.
+        """
+        if results is None:
+            results = self.evaluate_outcomes(0)
+        line_win = np.dot(self.probabilities, np.where(results.line_hit, results.payout, 0.0))
+        return float(self.bonus_spins * line_win)
+
+    def bonus_round_hit_probability(self, results: Optional[BatchWinResult] = None) -> float:
+        """Probability that a bonus round pays anything, i.e. any of its free spins hits a line"""
+        if results is None:
+            results = self.evaluate_outcomes(0)
+        free_spin_hit = float(self.probabilities[results.line_hit & (results.payout > 0)].sum())
+        return 1.0 - (1.0 - free_spin_hit) ** self.bonus_spins
+
+    def calculate(self, bet: float = 1.0, jackpot_pool: Optional[float] = None) -> ExactRTPResult:
+        """Exact RTP for a bet size; check_win pays fixed amounts, so RTP depends on the bet"""
+        if bet <= 0:
+            raise ValueError(f"Bet must be positive, got {bet}")
+        if jackpot_pool is None:
+            jackpot_pool = self.default_jackpot_pool
+
+        results = self.evaluate_outcomes(jackpot_pool)
+        p = self.probabilities
+
+        line_win = float(np.dot(p, np.where(results.line_hit, results.payout, 0.0)))
+        jackpot_win = float(np.dot(p, np.where(results.jackpot, results.payout, 0.0)))
+        bonus_frequency = float(p[results.bonus].sum())
+        bonus_round_win = self.expected_bonus_round_win(results)
+        bonus_win = bonus_frequency * bonus_round_win
+        # A bonus trigger pays nothing itself; it is a hit when its round pays
+        hit_frequency = float(p[results.payout > 0].sum()) \
+            + bonus_frequency * self.bonus_round_hit_probability(results)
+        expected_win = line_win + jackpot_win + bonus_win
+
+        return ExactRTPResult(
+            bet=bet,
+            jackpot_pool=jackpot_pool,
+            expected_win=expected_win,
+            rtp_percentage=expected_win / bet * 100,
+            base_rtp=line_win / bet * 100,
+            bonus_rtp=bonus_win / bet * 100,
+            jackpot_rtp=jackpot_win / bet * 100,
+            hit_frequency=hit_frequency,
+            bonus_frequency=bonus_frequency,
+            jackpot_frequency=float(p[results.jackpot].sum()),
+            expected_bonus_round_win=bonus_round_win,
+            outcome_count=len(p),
+            combination_contributions=self._combination_contributions(results, bet)
+        )
+
+    def _combination_contributions(self, results: BatchWinResult, bet: float) -> Dict[str, float]:
+        """RTP percentage contributed by each paytable combination, multipliers included"""
+        k = len(self.symbol_table)
+        head = np.ravel_multi_index(
+            (self.outcomes[:, 0], self.outcomes[:, 1], self.outcomes[:, 2]), (k, k, k))
+        weighted = np.where(results.line_hit, results.payout, 0.0) * self.probabilities
+        per_head = np.bincount(head, weights=weighted, minlength=k ** 3)
+
+        symbols = self.symbol_table.symbols
+        contributions = {combination: 0.0 for combination in self.evaluator.paytable}
+        for index in np.flatnonzero(self.evaluator.line_hit.ravel()):
+            a, b, c = np.unravel_index(index, (k, k, k))
+            contributions[symbols[a] + symbols[b] + symbols[c]] += per_head[index] / bet * 100
+        return contributions
+
+
+class OutcomeTableSampler:
+    """High-throughput spin mode: one draw per spin from the precomputed outcome table
+
+    Every outcome's probability and check_win result is computed once per config.
+    Outcomes with identical results are merged into a handful of result classes,
+    so a spin is a single search in a tiny cumulative table instead of five reel
+    picks plus an evaluation. spin_slot_machine/check_win remain the reference.
+    """
+
+    FLAG_LINE = 1
+    FLAG_BONUS = 2
+    FLAG_JACKPOT = 4
+
+    def __init__(self, engine: ExactRTPEngine, jackpot_pool: Optional[float] = None,
+                 seed: SeedLike = None):
+        self.engine = engine
+        self.jackpot_pool = engine.default_jackpot_pool if jackpot_pool is None else jackpot_pool
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+        results = engine.evaluate_outcomes(self.jackpot_pool)
+
+        # Compact per-outcome arrays
+        self.outcome_probabilities = engine.probabilities
+        self.outcome_payout = results.payout
+        self.outcome_multiplier = results.multiplier.astype(np.uint8)
+        self.outcome_flags = (results.line_hit * self.FLAG_LINE
+                              + results.bonus * self.FLAG_BONUS
+                              + results.jackpot * self.FLAG_JACKPOT).astype(np.uint8)
+
+        # Merge outcomes that check_win cannot tell apart
+        _, payout_ids = np.unique(self.outcome_payout, return_inverse=True)
+        keys = (payout_ids.ravel().astype(np.int64) << 16) | (self.outcome_multiplier.astype(np.int64) << 8) \
+            | self.outcome_flags
+        class_keys, first_outcome, outcome_class = np.unique(keys, return_index=True, return_inverse=True)
+        self.outcome_class = outcome_class.ravel()
+        self.class_payout = self.outcome_payout[first_outcome]
+        self.class_multiplier = self.outcome_multiplier[first_outcome].astype(np.int64)
+        self.class_flags = self.outcome_flags[first_outcome]
+        self.class_probabilities = np.bincount(
+            self.outcome_class, weights=self.outcome_probabilities, minlength=len(class_keys))
+
+        self._class_cumulative = self._cumulative(self.class_probabilities)
+        self._outcome_cumulative = None  # Built on first draw_outcomes call
+
+    @staticmethod
+    def _cumulative(probabilities: np.ndarray) -> np.ndarray:
+        cumulative = np.cumsum(probabilities)
+        cumulative /= cumulative[-1]
+        cumulative[-1] = 1.0
+        return cumulative
+
+    def draw_classes(self, n: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Draw n result-class indices"""
+        rng = rng or self.rng
+        return np.searchsorted(self._class_cumulative, rng.random(n), side='right')
+
+    def spin_results(self, n: int, rng: Optional[np.random.Generator] = None) -> BatchWinResult:
+        """Results of n spins, distributed exactly as spin_batch + evaluate"""
+        classes = self.draw_classes(n, rng)
+        flags = self.class_flags[classes]
+        return BatchWinResult(
+            payout=self.class_payout[classes],
+            multiplier=self.class_multiplier[classes],
+            bonus=(flags & self.FLAG_BONUS) != 0,
+            jackpot=(flags & self.FLAG_JACKPOT) != 0,
+            line_hit=(flags & self.FLAG_LINE) != 0
+        )
+
+    def draw_outcomes(self, n: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Draw n full outcome indices, when the actual reels are needed"""
+        rng = rng or self.rng
+        if self._outcome_cumulative is None:
+            self._outcome_cumulative = self._cumulative(self.outcome_probabilities)
+        return np.searchsorted(self._outcome_cumulative, rng.random(n), side='right')
+
+    def outcome_reels(self, outcomes: np.ndarray) -> np.ndarray:
+        """Convert outcome indices into an (n, 5) array of symbol codes"""
+        return self.engine.outcomes[outcomes]
+
+
+def create_exact_rtp_engine(config_file: str = "config.json") -> ExactRTPEngine:
+    """Create an exact RTP engine for a configuration file"""
+    config_manager = ConfigManager(config_file)
+    config_manager.load_config()
+
+    return ExactRTPEngine(config_manager.config_data)
+
+
+def format_exact_rtp_report(result: ExactRTPResult) -> str:
+    """Format an exact RTP result for the console"""
+    report = f"""
+📐 EXACT RTP (full enumeration of {result.outcome_count:,} outcomes) 📐
+• Bet: ${result.bet:g} | Jackpot pool: ${result.jackpot_pool:g}
+• Exact RTP: {result.rtp_percentage:.4f}%
+  - Paytable lines: {result.base_rtp:.4f}%
+  - Bonus rounds: {result.bonus_rtp:.4f}%
+  - Jackpot: {result.jackpot_rtp:.4f}%
+• Hit Frequency: {result.hit_frequency * 100:.3f}%
+• Bonus Frequency: {result.bonus_frequency * 100:.3f}%
+• Jackpot Frequency: {result.jackpot_frequency * 100:.6f}%
+• Expected Bonus Round Win: ${result.expected_bonus_round_win:.4f}
+
+🏆 COMBINATION CONTRIBUTIONS:
+"""
+    for combination, contribution in result.combination_contributions.items():
+        report += f"  {combination}: +{contribution:.4f}% RTP\n"
+    return report
+
+
+if __name__ == "__main__":
+    for config_file in sys.argv[1:] or ["config.json"]:
+        engine = create_exact_rtp_engine(config_file)
+        print(format_exact_rtp_report(engine.calculate()))
@@ -0,0 +1,190 @@
+"""
+Parallel analytics over many spin logs
+Splits CSV logs into line-aligned byte ranges and parses them across a process
+pool, then merges the partial SpinAggregates into calculate_analytics()'s result
+plus a breakdown per file, for fleets of slot processes each with its own log
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from spin_analytics import SEGMENT_SUFFIX, SpinAggregates, segment_directory
+from spin_logger import SPIN_LOG_FILE
+
+DEFAULT_CHUNK_BYTES = 64 << 20  # CSV bytes parsed per task
+BINARY_LOG_SUFFIX = '.spins'
+
+# (filename, kind, header, start, end); kind is 'csv', 'gzip' or 'binary'
+Task = Tuple[str, str, List[str], int, int]
+
+
+def expand_log_paths(patterns: Iterable[str]) -> List[str]:
+    """Log files named by paths, globs or directories, without duplicates
+
+    A directory stands for its slot_analytics.csv and that log's rotated segments.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                log = os.path.join(match, SPIN_LOG_FILE)
+                paths.extend(sorted(glob.glob(os.path.join(segment_directory(log), f'*{SEGMENT_SUFFIX}'))))
+                if os.path.isfile(log):
+                    paths.append(log)
+            elif os.path.isfile(match):
+                paths.append(match)
+    return list(dict.fromkeys(os.path.normpath(path) for path in paths))
+
+
+def _csv_tasks(filename: str, chunk_bytes: int) -> List[Task]:
+    """Line-aligned byte ranges covering the complete rows of a CSV log"""
+    with open(filename, 'rb') as f:
+        header_line = f.readline()
+        if not header_line.endswith(b'\n'):
+            return []
+        header = next(csv.reader([header_line.decode('utf-8')]))
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+
+        # A row still being written at the end of the file is left out
+        f.seek(max(start, size - 4096))
+        tail = f.read()
+        end = size - len(tail) + tail.rfind(b'\n') + 1 if b'\n' in tail else start
+
+        tasks = []
+        while start < end:
+            boundary = min(start + chunk_bytes, end)
+            if boundary < end:
+                f.seek(boundary)
+                f.readline()
+                boundary = min(f.tell(), end)
+            tasks.append((filename, 'csv', header, start, boundary))
+            start = boundary
+    return tasks
+
+
+def plan_tasks(filenames: Sequence[str], chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[Task]:
+    tasks = []
+    for filename in filenames:
+        if filename.endswith(BINARY_LOG_SUFFIX):
+            tasks.append((filename, 'binary', [], 0, 0))
+        elif filename.endswith('.gz'):
+            tasks.append((filename, 'gzip', [], 0, 0))  # Not seekable; one task per segment
+        else:
+            tasks.extend(_csv_tasks(filename, chunk_bytes))
+    return tasks
+
+
+def _task_size(task: Task) -> int:
+    filename, kind, _, start, end = task
+    return end - start if kind == 'csv' else os.path.getsize(filename)
+
+
+def _run_task(task: Task) -> Tuple[str, SpinAggregates]:
+    filename, kind, header, start, end = task
+    aggregates = SpinAggregates()
+
+    if kind == 'binary':
+        from binary_spin_log import BinarySpinLog
+
+        log = BinarySpinLog(filename)
+        try:
+            aggregates = log.aggregate()
+        finally:
+            log.close()
+    elif kind == 'gzip':
+        with gzip.open(filename, 'rt', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                aggregates.add_row(row)
+    else:
+        with open(filename, 'rb') as f:
+            f.seek(start)
+            text = f.read(end - start).decode('utf-8')
+        for row in csv.DictReader(io.StringIO(text, newline=''), fieldnames=header):
+            aggregates.add_row(row)
+
+    return filename, aggregates
+
+
+def aggregate_logs(filenames: Sequence[str], workers: Optional[int] = None,
+                   chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Tuple[SpinAggregates, Dict[str, SpinAggregates]]:
+    """Totals over every log and per log, parsed across a process pool"""
+    # Largest tasks first keeps the pool busy to the end
+    tasks = sorted(plan_tasks(filenames, chunk_bytes), key=_task_size, reverse=True)
+    per_file = {filename: SpinAggregates() for filename in filenames}
+    if tasks:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            for filename, partial in executor.map(_run_task, tasks, chunksize=1):
+                per_file[filename].merge(partial)
+
+    total = SpinAggregates()
+    for aggregates in per_file.values():
+        total.merge(aggregates)
+    return total, per_file
+
+
+def calculate_fleet_analytics(patterns: Iterable[str], workers: Optional[int] = None,
+                              chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Optional[Dict[str, Any]]:
+    """calculate_analytics() over many logs, plus a 'files' entry with each log's own analytics
+
+    Accepts CSV logs, gzipped segments, binary .spins logs, globs of any of
+    these, and directories holding a slot_analytics.csv. None if nothing matched.
+    """
+    filenames = expand_log_paths(patterns)
+    if not filenames:
+        return None
+
+    total, per_file = aggregate_logs(filenames, workers, chunk_bytes)
+    analytics = total.to_analytics()
+    analytics['files'] = {filename: aggregates.to_analytics() for filename, aggregates in per_file.items()}
+    return analytics
+
+
+def format_fleet_report(analytics: Dict[str, Any], elapsed: float) -> str:
+    """Format fleet analytics for the console"""
+    files = analytics['files']
+    report = f"""
+🛰️ FLEET ANALYTICS: {len(files):,} logs in {elapsed:.2f}s 🛰️
+• Total Spins: {analytics['total_spins']:,}
+• Total Bets: ${analytics['total_bets']:,.2f} | Total Wins: ${analytics['total_wins']:,.2f}
+• Net Result: ${analytics['net_result']:+,.2f}
+• RTP: {analytics['rtp_percentage']:.2f}% | Win Rate: {analytics['win_rate_percentage']:.2f}%
+• Bonus Rounds: {analytics['bonus_count']:,} | Jackpots: {analytics['jackpot_count']:,}
+
+📁 PER FILE:
+"""
+    for filename, file_analytics in files.items():
+        report += (f"  {filename}: {file_analytics['total_spins']:,} spins, "
+                   f"RTP {file_analytics['rtp_percentage']:.2f}%, net ${file_analytics['net_result']:+,.2f}\n")
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Parallel analytics over many spin logs")
+    parser.add_argument("logs", nargs="+",
+                        help="Log files, globs (quote them, e.g. 'hosts/*/slot_analytics.csv') or directories")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_BYTES >> 20, help="CSV megabytes per task")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    analytics = calculate_fleet_analytics(args.logs, args.workers, args.chunk_mb << 20)
+    if analytics is None:
+        print("❌ No spin logs matched")
+        return 1
+    print(format_fleet_report(analytics, time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""
+Exact payout distributions for the slot machine
+Builds the full single-spin win distribution (losses, multipliers, bonus rounds
+and the jackpot included) from the exact outcome enumeration, then convolves it
+with FFTs into the net result of an N-spin session
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from batch_engine import JACKPOT_SYMBOL
+from config_manager import ConfigManager
+from exact_rtp import ExactRTPEngine
+
+LATTICE_DECIMALS = 4  # Finest payout step used to put wins on an integer grid
+TAIL_EPSILON = 1e-12  # Upper-tail mass dropped after each convolution
+DIRECT_CONVOLVE_SIZE = 64  # Shorter operands are convolved directly, not by FFT
+DEFAULT_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+DEFAULT_RISK_LEVELS = (0.95, 0.99)
+
+
+def lattice_unit(values: Sequence[float]) -> float:
+    """Largest step that puts every value on an integer grid
+
+    Values with more than LATTICE_DECIMALS decimals (a jackpot pool grown by
+    fractional contributions, say) are rounded to that precision.
+    """
+    values = np.abs(np.asarray(values, dtype=np.float64))
+    values = values[values > 0]
+    if not len(values):
+        return 1.0
+
+    for decimals in range(LATTICE_DECIMALS + 1):
+        scaled = values * 10 ** decimals
+        steps = np.round(scaled)
+        if decimals == LATTICE_DECIMALS or np.allclose(scaled, steps, rtol=0, atol=1e-6):
+            return int(np.gcd.reduce(steps.astype(np.int64))) / 10 ** decimals
+
+
+def _trim_tail(pmf: np.ndarray, tail_epsilon: float) -> np.ndarray:
+    """Drop the upper tail holding less than tail_epsilon of the mass"""
+    tail = np.cumsum(pmf[::-1])[::-1]
+    keep = np.flatnonzero(tail >= tail_epsilon)
+    return pmf[:keep[-1] + 1] if len(keep) else pmf[:1]
+
+
+def convolve(a: np.ndarray, b: np.ndarray, tail_epsilon: float = TAIL_EPSILON) -> np.ndarray:
+    """Distribution of the sum of two independent grid variables"""
+    if min(len(a), len(b)) <= DIRECT_CONVOLVE_SIZE:
+        return _trim_tail(np.convolve(a, b), tail_epsilon)
+
+    size = len(a) + len(b) - 1
+    fft_size = 1 << (size - 1).bit_length()
+    result = np.fft.irfft(np.fft.rfft(a, fft_size) * np.fft.rfft(b, fft_size), fft_size)[:size]
+    np.clip(result, 0.0, None, out=result)  # Round-off leaves tiny negative values
+    return _trim_tail(result, tail_epsilon)
+
+
+def convolution_power(pmf: np.ndarray, n: int, tail_epsilon: float = TAIL_EPSILON) -> np.ndarray:
+    """Distribution of the sum of n independent draws, by repeated squaring"""
+    if n < 0:
+        raise ValueError(f"Convolution power must be non-negative, got {n}")
+
+    result = np.ones(1)
+    base = pmf
+    while n:
+        if n & 1:
+            result = convolve(result, base, tail_epsilon)
+        n >>= 1
+        if n:
+            base = convolve(base, base, tail_epsilon)
+    return result
+
+
+@dataclass
+class PayoutDistribution:
+    """Distribution of a total win on a grid: P(win == i * unit) = probabilities[i]"""
+    unit: float
+    probabilities: np.ndarray
+
+    @property
+    def values(self) -> np.ndarray:
+        return np.arange(len(self.probabilities)) * self.unit
+
+    @property
+    def total_probability(self) -> float:
+        """Mass kept; below 1 by whatever upper tail was trimmed"""
+        return float(self.probabilities.sum())
+
+    @property
+    def mean(self) -> float:
+        return float(np.dot(self.probabilities, self.values))
+
+    @property
+    def variance(self) -> float:
+        return float(np.dot(self.probabilities, np.square(self.values - self.mean)))
+
+    @property
+    def standard_deviation(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    def quantile(self, q: float) -> float:
+        """Smallest win w with P(win <= w) >= q"""
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantile must be in [0, 1], got {q}")
+        cumulative = np.cumsum(self.probabilities)
+        index = min(int(np.searchsorted(cumulative, q * cumulative[-1], side='left')), len(cumulative) - 1)
+        return index * self.unit
+
+    def probability_above(self, amount: float) -> float:
+        """P(win > amount)"""
+        first = int(np.floor(amount / self.unit + 1e-9)) + 1
+        return float(self.probabilities[max(first, 0):].sum())
+
+    def probability_at_least(self, amount: float) -> float:
+        """P(win >= amount)"""
+        first = int(np.ceil(amount / self.unit - 1e-9))
+        return float(self.probabilities[max(first, 0):].sum())
+
+    def lower_tail_mean(self, q: float) -> float:
+        """Mean of the lowest q fraction of outcomes (q in (0, 1])"""
+        cumulative = np.cumsum(self.probabilities)
+        index = min(int(np.searchsorted(cumulative, q, side='left')), len(cumulative) - 1)
+        below = cumulative[index - 1] if index else 0.0
+        partial = np.dot(self.probabilities[:index], self.values[:index]) + (q - below) * index * self.unit
+        return float(partial / q)
+
+
+@dataclass
+class SessionForecast:
+    """Net result of an N-spin session at a fixed bet, computed exactly"""
+    spins: int
+    bet: float
+    jackpot_pool: float
+    total_bet: float
+    expected_net: float
+    net_standard_deviation: float
+    single_spin_standard_deviation: float
+    probability_up: float
+    probability_break_even_or_better: float
+    percentiles: Dict[float, float] = field(default_factory=dict)       # percentile -> net
+    value_at_risk: Dict[float, float] = field(default_factory=dict)     # level -> loss
+    expected_shortfall: Dict[float, float] = field(default_factory=dict)  # level -> mean loss beyond VaR
+    truncated_mass: float = 0.0
+
+
+class PayoutDistributionEngine:
+    """Exact win distributions from the enumerated outcome table
+
+    Free spins use check_win(reels, 0, 0), so a bonus round pays the sum of
+    bonus_spins independent line wins; that sum is folded into the single-spin
+    distribution with the bonus trigger's probability. Wins are fixed amounts,
+    so the win distribution does not depend on the bet; the bet only shifts
+    the net result.
+    """
+
+    def __init__(self, config_data: Dict[str, Any], jackpot_symbol: str = JACKPOT_SYMBOL,
+                 exact_engine: Optional[ExactRTPEngine] = None):
+        self.exact_engine = exact_engine or ExactRTPEngine(config_data, jackpot_symbol)
+        self._single_spin_cache: Dict[float, PayoutDistribution] = {}
+
+    def single_spin(self, jackpot_pool: Optional[float] = None) -> PayoutDistribution:
+        """Distribution of the total paid by one spin, bonus round included"""
+        engine = self.exact_engine
+        if jackpot_pool is None:
+            jackpot_pool = engine.default_jackpot_pool
+        if jackpot_pool in self._single_spin_cache:
+            return self._single_spin_cache[jackpot_pool]
+
+        p = engine.probabilities
+        results = engine.evaluate_outcomes(jackpot_pool)
+        free = engine.evaluate_outcomes(0)
+        unit = lattice_unit(np.concatenate([np.unique(results.payout), np.unique(free.payout)]))
+
+        def grid(payout: np.ndarray, weights: np.ndarray) -> np.ndarray:
+            return np.bincount(np.round(payout / unit).astype(np.int64), weights=weights)
+
+        paid = grid(np.where(results.bonus, 0.0, results.payout), np.where(results.bonus, 0.0, p))
+        bonus_probability = float(p[results.bonus].sum())
+        if bonus_probability > 0:
+            free_spin = grid(free.payout, p)
+            bonus_round = convolution_power(free_spin, engine.bonus_spins, tail_epsilon=0.0)
+            size = max(len(paid), len(bonus_round))
+            paid = np.pad(paid, (0, size - len(paid))) + bonus_probability * np.pad(
+                bonus_round, (0, size - len(bonus_round)))
+
+        distribution = PayoutDistribution(unit=unit, probabilities=paid)
+        self._single_spin_cache[jackpot_pool] = distribution
+        return distribution
+
+    def session(self, spins: int, jackpot_pool: Optional[float] = None,
+                tail_epsilon: float = TAIL_EPSILON) -> PayoutDistribution:
+        """Distribution of the total won over `spins` independent spins"""
+        single = self.single_spin(jackpot_pool)
+        return PayoutDistribution(unit=single.unit,
+                                  probabilities=convolution_power(single.probabilities, spins, tail_epsilon))
+
+    def forecast(self, spins: int, bet: float = 1.0, jackpot_pool: Optional[float] = None,
+                 percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                 risk_levels: Sequence[float] = DEFAULT_RISK_LEVELS) -> SessionForecast:
+        """Percentiles, probability of being up and tail risk after `spins` spins"""
+        if spins <= 0:
+            raise ValueError(f"Spin count must be positive, got {spins}")
+        if bet <= 0:
+            raise ValueError(f"Bet must be positive, got {bet}")
+        if jackpot_pool is None:
+            jackpot_pool = self.exact_engine.default_jackpot_pool
+
+        single = self.single_spin(jackpot_pool)
+        total = self.session(spins, jackpot_pool)
+        total_bet = spins * bet
+
+        return SessionForecast(
+            spins=spins,
+            bet=bet,
+            jackpot_pool=jackpot_pool,
+            total_bet=total_bet,
+            expected_net=spins * single.mean - total_bet,
+            net_standard_deviation=np.sqrt(spins) * single.standard_deviation,
+            single_spin_standard_deviation=single.standard_deviation,
+            probability_up=total.probability_above(total_bet),
+            probability_break_even_or_better=total.probability_at_least(total_bet),
+            percentiles={q: total.quantile(q / 100) - total_bet for q in percentiles},
+            value_at_risk={level: total_bet - total.quantile(1 - level) for level in risk_levels},
+            expected_shortfall={level: total_bet - total.lower_tail_mean(1 - level) for level in risk_levels},
+            truncated_mass=max(0.0, 1.0 - total.total_probability)
+        )
+
+
+def create_payout_distribution_engine(config_file: str = "config.json") -> PayoutDistributionEngine:
+    """Create a payout distribution engine for a configuration file"""
+    config_manager = ConfigManager(config_file)
+    config_manager.load_config()
+
+    return PayoutDistributionEngine(config_manager.config_data)
+
+
+def format_session_forecast_report(forecast: SessionForecast) -> str:
+    """Format a session forecast for the console"""
+    report = f"""
+📉 SESSION OUTLOOK: {forecast.spins:,} spins at ${forecast.bet:g} (exact) 📈
+• Total Bet: ${forecast.total_bet:,.2f} | Jackpot pool: ${forecast.jackpot_pool:g}
+• Expected Net: ${forecast.expected_net:+,.2f} (std dev ${forecast.net_standard_deviation:,.2f}, \
+${forecast.single_spin_standard_deviation:.2f} per spin)
+• Probability Up: {forecast.probability_up * 100:.2f}%
+• Probability Even or Up: {forecast.probability_break_even_or_better * 100:.2f}%
+"""
+    for level, loss in forecast.value_at_risk.items():
+        report += (f"• {level * 100:g}% Value at Risk: ${loss:,.2f} "
+                   f"(expected shortfall ${forecast.expected_shortfall[level]:,.2f})\n")
+
+    report += "\n📊 NET RESULT PERCENTILES:\n"
+    for q, net in forecast.percentiles.items():
+        report += f"  P{q:g}: ${net:+,.2f}\n"
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Exact session outcome distributions of slot configurations")
+    parser.add_argument("configs", nargs="*", default=["config.json"], help="Configuration files to analyze")
+    parser.add_argument("--spins", type=int, nargs="+", default=[100, 1000], help="Session lengths in spins")
+    parser.add_argument("--bet", type=float, default=1.0, help="Bet per spin")
+    parser.add_argument("--jackpot-pool", type=float, default=None, help="Jackpot pool paid on a jackpot")
+    args = parser.parse_args(argv)
+
+    for config_file in args.configs:
+        engine = create_payout_distribution_engine(config_file)
+        print(f"\n🎰 {config_file}")
+        for spins in args.spins:
+            print(format_session_forecast_report(engine.forecast(spins, args.bet, args.jackpot_pool)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
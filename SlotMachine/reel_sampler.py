@@ -0,0 +1,77 @@
+"""
+Precompiled reel sampling for the slot machine
+Builds an alias table once per loaded configuration so every reel draw is O(1)
+"""
+
+import random
+from typing import Dict, List, Optional
+
+
+class ReelSampler:
+    """Alias-table sampler over the configured symbol weights (Vose's method)"""
+
+    def __init__(self, symbol_weights: Dict[str, float], rng: Optional[random.Random] = None):
+        total_weight = sum(symbol_weights.values()) if symbol_weights else 0
+        if total_weight <= 0 or any(weight < 0 for weight in symbol_weights.values()):
+            raise ValueError("Symbol weights must be non-negative and sum > 0")
+
+        self.symbols = list(symbol_weights.keys())
+        self.weights = list(symbol_weights.values())
+        self.size = len(self.symbols)
+
+        # Bound once; the module-level generator still honours random.seed()
+        self._random = rng.random if rng is not None else random.random
+
+        self._build_alias_table(total_weight)
+
+    def _build_alias_table(self, total_weight: float):
+        """Split every column into its own symbol and at most one alias"""
+        n = self.size
+        scaled = [weight * n / total_weight for weight in self.weights]
+        prob = [0.0] * n
+        alias = list(range(n))
+
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            prob[low] = scaled[low]
+            alias[low] = high
+            scaled[high] = (scaled[high] + scaled[low]) - 1.0
+            if scaled[high] < 1.0:
+                small.append(high)
+            else:
+                large.append(high)
+
+        # Whatever is left is full up to floating point error
+        for i in small + large:
+            prob[i] = 1.0
+
+        self._prob = prob
+        self._alias_symbols = [self.symbols[i] for i in alias]
+
+    def draw(self) -> str:
+        """Draw one symbol using a single uniform variate"""
+        u = self._random() * self.size
+        i = int(u)
+        if u - i < self._prob[i]:
+            return self.symbols[i]
+        return self._alias_symbols[i]
+
+    def draw_many(self, n: int) -> List[str]:
+        """Draw n independent symbols"""
+        rand = self._random
+        size = self.size
+        prob = self._prob
+        symbols = self.symbols
+        alias_symbols = self._alias_symbols
+
+        result = []
+        append = result.append
+        for _ in range(n):
+            u = rand() * size
+            i = int(u)
+            append(symbols[i] if u - i < prob[i] else alias_symbols[i])
+        return result
@@ -3,8 +3,8 @@ RTP (Return to Player) and House Edge calculation and adjustment utilities
 """
 
 import math
-from typing import Dict, List, Tuple
-from config_manager import ConfigManager
+from typing import Dict, List, Optional, Tuple
+from config_manager import ConfigManager, get_special_symbols
 
 class RTPCalculator:
     """Calculate and adjust RTP based on game configuration"""
@@ -12,6 +12,8 @@ class RTPCalculator:
     def __init__(self, config_manager: ConfigManager):
         self.config_manager = config_manager
         self.config = config_manager.config_data
+        self._exact_engine = None
+        self._distribution_engine = None
     
     def calculate_symbol_probabilities(self) -> Dict[str, float]:
         """Calculate probability of each symbol appearing"""
@@ -24,15 +26,31 @@ class RTPCalculator:
         
         return probabilities
     
+    def split_combination(self, combination: str) -> List[str]:
+        """Split a paytable key into configured symbols (e.g. '7️⃣' spans several characters)"""
+        symbols_by_length = sorted(self.config['symbols']['weights'], key=len, reverse=True)
+        
+        symbols = []
+        position = 0
+        while position < len(combination):
+            for symbol in symbols_by_length:
+                if combination.startswith(symbol, position):
+                    symbols.append(symbol)
+                    position += len(symbol)
+                    break
+            else:
+                return []  # Unknown symbol
+        
+        return symbols
+    
     def calculate_combination_probability(self, combination: str) -> float:
         """Calculate probability of a specific 3-symbol combination"""
-        if len(combination) < 3:
-            return 0.0
-        
         probabilities = self.calculate_symbol_probabilities()
         
         # Extract first 3 symbols from combination
-        symbols = [combination[i] for i in range(3)]
+        symbols = self.split_combination(combination)[:3]
+        if len(symbols) < 3:
+            return 0.0
         
         total_prob = 1.0
         for symbol in symbols:
@@ -65,7 +83,7 @@ class RTPCalculator:
     def _calculate_multiplier_bonus(self) -> float:
         """Calculate expected return from multiplier symbols"""
         probabilities = self.calculate_symbol_probabilities()
-        multipliers = self.config['symbols']['special_symbols']['multipliers']
+        multipliers = get_special_symbols(self.config)['multipliers']
         
         multiplier_bonus = 0.0
         for multiplier in multipliers:
@@ -92,10 +110,10 @@ class RTPCalculator:
     
     def _calculate_bonus_contribution(self) -> float:
         """Calculate expected return from bonus rounds"""
-        bonus_settings = self.config['bonus_settings']
+        bonus_settings = self.config.get('bonus_settings', {})
         probabilities = self.calculate_symbol_probabilities()
         
-        bonus_symbol = self.config['symbols']['special_symbols']['bonus']
+        bonus_symbol = get_special_symbols(self.config)['bonus']
         if bonus_symbol not in probabilities:
             return 0.0
         
@@ -104,7 +122,7 @@ class RTPCalculator:
         prob_bonus = 1 - prob_no_bonus
         
         # Expected return from bonus round
-        bonus_spins = bonus_settings['bonus_spins']
+        bonus_spins = bonus_settings.get('bonus_spins', 3)
         bonus_multiplier = bonus_settings.get('bonus_multiplier', 1.0)
         avg_base_win = self._calculate_average_base_win()
         
@@ -112,6 +130,32 @@ class RTPCalculator:
         
         return expected_bonus_return
     
+    def calculate_exact_rtp(self, bet: float = 1.0, jackpot_pool: Optional[float] = None):
+        """Exact RTP of the real check_win rules by full outcome enumeration (requires NumPy)"""
+        from exact_rtp import ExactRTPEngine
+        
+        if self._exact_engine is None:
+            self._exact_engine = ExactRTPEngine(self.config)
+        
+        return self._exact_engine.calculate(bet, jackpot_pool)
+    
+    def calculate_payout_distribution(self, jackpot_pool: Optional[float] = None):
+        """Exact single-spin payout distribution, bonus rounds included (requires NumPy)"""
+        from exact_rtp import ExactRTPEngine
+        from payout_distribution import PayoutDistributionEngine
+        
+        if self._distribution_engine is None:
+            if self._exact_engine is None:
+                self._exact_engine = ExactRTPEngine(self.config)
+            self._distribution_engine = PayoutDistributionEngine(self.config, exact_engine=self._exact_engine)
+        
+        return self._distribution_engine.single_spin(jackpot_pool)
+    
+    def calculate_session_forecast(self, spins: int, bet: float = 1.0, jackpot_pool: Optional[float] = None):
+        """Exact net-result percentiles, chance of being up and tail risk after N spins (requires NumPy)"""
+        self.calculate_payout_distribution(jackpot_pool)
+        return self._distribution_engine.forecast(spins, bet, jackpot_pool)
+    
     def calculate_house_edge(self) -> float:
         """Calculate house edge percentage"""
         rtp = self.calculate_theoretical_rtp()
@@ -135,25 +179,34 @@ class RTPCalculator:
         return adjusted_paytable
     
     def analyze_variance(self) -> Dict[str, float]:
-        """Calculate game variance metrics"""
-        paytable = self.config['paytable']
-        probabilities = self.calculate_symbol_probabilities()
-        
-        # Calculate variance
-        payouts = []
-        probs = []
-        
-        for combination, payout in paytable.items():
-            prob = self.calculate_combination_probability(combination)
-            payouts.append(payout)
-            probs.append(prob)
-        
-        # Expected value
-        expected_value = sum(p * prob for p, prob in zip(payouts, probs))
-        
-        # Variance calculation
-        variance = sum(prob * (payout - expected_value) ** 2 
-                      for payout, prob in zip(payouts, probs))
+        """Calculate game variance metrics
+        
+        Uses the exact per-spin payout distribution (losses, multipliers, bonus
+        rounds and jackpot included) when NumPy is available, otherwise only the
+        paytable lines.
+        """
+        try:
+            distribution = self.calculate_payout_distribution()
+            expected_value = distribution.mean
+            variance = distribution.variance
+        except ImportError:
+            paytable = self.config['paytable']
+            
+            # Calculate variance
+            payouts = []
+            probs = []
+            
+            for combination, payout in paytable.items():
+                prob = self.calculate_combination_probability(combination)
+                payouts.append(payout)
+                probs.append(prob)
+            
+            # Expected value
+            expected_value = sum(p * prob for p, prob in zip(payouts, probs))
+            
+            # Variance calculation
+            variance = sum(prob * (payout - expected_value) ** 2 
+                          for payout, prob in zip(payouts, probs))
         
         standard_deviation = math.sqrt(variance)
         
@@ -224,12 +277,19 @@ class RTPCalculator:
         elif variance_analysis['variance_level'] == "High":
             report += "  • Consider balancing with more frequent smaller wins\n"
         
+        # Exact figures when NumPy is available
+        try:
+            from exact_rtp import format_exact_rtp_report
+            from payout_distribution import format_session_forecast_report
+            report += format_exact_rtp_report(self.calculate_exact_rtp())
+            report += format_session_forecast_report(self.calculate_session_forecast(100))
+        except ImportError:
+            pass
+        
         return report
 
 def create_rtp_calculator(config_file: str = "config.json") -> RTPCalculator:
     """Create RTP calculator with loaded configuration"""
-    from config_manager import ConfigManager
-    
     config_manager = ConfigManager(config_file)
     config_manager.load_config()
     
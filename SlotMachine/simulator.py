@@ -0,0 +1,623 @@
+"""
+Headless Monte Carlo simulator for slot machine configurations
+Runs millions to billions of spins across a process pool, each task with its
+own reproducible RNG stream, and merges the results into empirical RTP, hit,
+bonus and jackpot rates with confidence intervals
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from batch_engine import REEL_COUNT, LINE_LENGTH, BatchSpinEngine, BatchWinEvaluator, BatchWinResult, SymbolTable
+from config_manager import ConfigManager
+from exact_rtp import ExactRTPEngine, ExactRTPResult, OutcomeTableSampler
+
+DEFAULT_BATCH_SIZE = 1_000_000
+DEFAULT_TASK_SIZE = 20_000_000  # Spins per pool task; fixes the RNG stream layout
+DEFAULT_MIN_SPINS = 10_000_000  # First round of a precision-targeted run
+DEFAULT_MAX_SPINS = 100_000_000_000
+ENGINE_MODES = ("reels", "table")
+
+
+@dataclass
+class RunningStats:
+    """Mergeable running mean and sum of squared deviations (Welford/Chan)"""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add_batch(self, values: np.ndarray):
+        """Fold a whole batch in without keeping any per-value history"""
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(np.square(values - batch_mean).sum())
+        self.merge(RunningStats(n, batch_mean, batch_m2))
+
+    def merge(self, other: 'RunningStats'):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def standard_error(self) -> float:
+        return math.sqrt(self.variance / self.count) if self.count > 0 else float('inf')
+
+
+@dataclass
+class SimulationStats:
+    """Aggregated outcome of a simulation run; merge() combines partial runs"""
+    bet: float
+    spins: int = 0
+    win_count: int = 0
+    line_hit_count: int = 0
+    bonus_count: int = 0
+    jackpot_count: int = 0
+    total_win: float = 0.0
+    win_stats: RunningStats = field(default_factory=RunningStats)
+
+    def merge(self, other: 'SimulationStats'):
+        self.spins += other.spins
+        self.win_count += other.win_count
+        self.line_hit_count += other.line_hit_count
+        self.bonus_count += other.bonus_count
+        self.jackpot_count += other.jackpot_count
+        self.total_win += other.total_win
+        self.win_stats.merge(other.win_stats)
+
+    @property
+    def total_bet(self) -> float:
+        return self.spins * self.bet
+
+    @property
+    def rtp_percentage(self) -> float:
+        return self.win_stats.mean / self.bet * 100 if self.spins else 0.0
+
+    @property
+    def rtp_standard_error(self) -> float:
+        """Standard error of the RTP estimate, in percentage points"""
+        return self.win_stats.standard_error / self.bet * 100
+
+    def rtp_confidence_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        half_width = z * self.rtp_standard_error
+        return self.rtp_percentage - half_width, self.rtp_percentage + half_width
+
+    @staticmethod
+    def _rate(count: int, spins: int) -> float:
+        return count / spins if spins else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self._rate(self.win_count, self.spins)
+
+    @property
+    def bonus_rate(self) -> float:
+        return self._rate(self.bonus_count, self.spins)
+
+    @property
+    def jackpot_rate(self) -> float:
+        return self._rate(self.jackpot_count, self.spins)
+
+    def rate_confidence_interval(self, count: int, z: float = 1.96) -> Tuple[float, float]:
+        """Wilson score interval for a count out of self.spins"""
+        if self.spins == 0:
+            return 0.0, 1.0
+        p = count / self.spins
+        denominator = 1 + z * z / self.spins
+        centre = (p + z * z / (2 * self.spins)) / denominator
+        half_width = z * math.sqrt(p * (1 - p) / self.spins + z * z / (4 * self.spins ** 2)) / denominator
+        return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+class MonteCarloSimulator:
+    """Plays whole batches of spins, bonus rounds included, without any I/O"""
+
+    def __init__(self, config_data: Dict[str, Any], bet: float = 1.0, engine: str = "reels",
+                 jackpot_pool: Optional[float] = None):
+        if engine not in ENGINE_MODES:
+            raise ValueError(f"Unknown engine '{engine}'. Available: {list(ENGINE_MODES)}")
+        if bet <= 0:
+            raise ValueError(f"Bet must be positive, got {bet}")
+
+        self.config = config_data
+        self.bet = bet
+        self.engine = engine
+        self.jackpot_pool = (config_data['game_settings'].get('initial_jackpot_pool', 0)
+                             if jackpot_pool is None else jackpot_pool)
+        self.bonus_spins = config_data.get('bonus_settings', {}).get('bonus_spins', 3)
+
+        if engine == "table":
+            self._table = OutcomeTableSampler(ExactRTPEngine(config_data), self.jackpot_pool)
+        else:
+            self._spinner = BatchSpinEngine(config_data['symbols']['weights'])
+            self._evaluator = BatchWinEvaluator.from_config(config_data)
+
+    def spin_results(self, n: int, rng: np.random.Generator) -> BatchWinResult:
+        """check_win results for n paid spins"""
+        if self.engine == "table":
+            return self._table.spin_results(n, rng)
+        return self._evaluator.evaluate(self._spinner.spin_batch(n, rng), self.jackpot_pool)
+
+    def bonus_round_wins(self, rounds: int, rng: np.random.Generator) -> np.ndarray:
+        """Totals of `rounds` bonus rounds, played like quick_bonus_round()"""
+        if rounds == 0 or self.bonus_spins == 0:
+            return np.zeros(rounds)
+        free = self.spin_results(rounds * self.bonus_spins, rng)
+        # Free spins run check_win(reels, 0, 0): a jackpot there pays the empty pool
+        free_wins = np.where(free.jackpot, 0.0, free.payout)
+        return free_wins.reshape(rounds, self.bonus_spins).sum(axis=1)
+
+    def play_batch(self, n: int, rng: np.random.Generator) -> Tuple[np.ndarray, BatchWinResult]:
+        """Total win per spin for n spins, plus the underlying check_win results"""
+        results = self.spin_results(n, rng)
+        wins = results.payout.astype(np.float64)
+        bonus_rows = np.flatnonzero(results.bonus)
+        wins[bonus_rows] += self.bonus_round_wins(len(bonus_rows), rng)
+        return wins, results
+
+    def run(self, spins: int, rng: np.random.Generator,
+            batch_size: int = DEFAULT_BATCH_SIZE) -> SimulationStats:
+        """Simulate a fixed number of spins"""
+        stats = SimulationStats(bet=self.bet)
+        remaining = spins
+        while remaining > 0:
+            n = min(batch_size, remaining)
+            self.accumulate(stats, *self.play_batch(n, rng))
+            remaining -= n
+        return stats
+
+    @staticmethod
+    def accumulate(stats: SimulationStats, wins: np.ndarray, results: BatchWinResult):
+        stats.spins += len(wins)
+        stats.win_count += int(np.count_nonzero(wins > 0))
+        stats.line_hit_count += int(np.count_nonzero(results.line_hit))
+        stats.bonus_count += int(np.count_nonzero(results.bonus))
+        stats.jackpot_count += int(np.count_nonzero(results.jackpot))
+        stats.total_win += float(wins.sum())
+        stats.win_stats.add_batch(wins)
+
+
+@dataclass
+class ImportanceSamplingStats:
+    """Aggregates of a reweighted run; every spin carries weight p(reels) / q(reels)"""
+    bet: float
+    category_names: List[str] = field(default_factory=list)
+    spins: int = 0
+    weight_sum: float = 0.0
+    weight_square_sum: float = 0.0
+    weighted_win_count: float = 0.0
+    weighted_bonus_count: float = 0.0
+    weighted_jackpot_count: float = 0.0
+    value_stats: RunningStats = field(default_factory=RunningStats)  # weight * win per spin
+    category_sums: Optional[np.ndarray] = None
+    category_square_sums: Optional[np.ndarray] = None
+
+    def merge(self, other: 'ImportanceSamplingStats'):
+        self.category_names = self.category_names or other.category_names
+        self.spins += other.spins
+        self.weight_sum += other.weight_sum
+        self.weight_square_sum += other.weight_square_sum
+        self.weighted_win_count += other.weighted_win_count
+        self.weighted_bonus_count += other.weighted_bonus_count
+        self.weighted_jackpot_count += other.weighted_jackpot_count
+        self.value_stats.merge(other.value_stats)
+        if other.category_sums is not None:
+            if self.category_sums is None:
+                self.category_sums = np.zeros_like(other.category_sums)
+                self.category_square_sums = np.zeros_like(other.category_square_sums)
+            self.category_sums += other.category_sums
+            self.category_square_sums += other.category_square_sums
+
+    @property
+    def rtp_percentage(self) -> float:
+        return self.value_stats.mean / self.bet * 100 if self.spins else 0.0
+
+    @property
+    def rtp_standard_error(self) -> float:
+        return self.value_stats.standard_error / self.bet * 100
+
+    def rtp_confidence_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        half_width = z * self.rtp_standard_error
+        return self.rtp_percentage - half_width, self.rtp_percentage + half_width
+
+    @property
+    def effective_sample_size(self) -> float:
+        """Kish effective sample size, (sum w)^2 / sum w^2"""
+        return self.weight_sum ** 2 / self.weight_square_sum if self.weight_square_sum else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.weighted_win_count / self.spins if self.spins else 0.0
+
+    @property
+    def bonus_rate(self) -> float:
+        return self.weighted_bonus_count / self.spins if self.spins else 0.0
+
+    @property
+    def jackpot_rate(self) -> float:
+        return self.weighted_jackpot_count / self.spins if self.spins else 0.0
+
+    def contributions(self) -> Dict[str, Tuple[float, float]]:
+        """RTP percentage contributed by each outcome category, with its standard error"""
+        if self.category_sums is None or self.spins < 2:
+            return {}
+        n = self.spins
+        means = self.category_sums / n
+        variances = np.maximum(self.category_square_sums / n - means ** 2, 0.0) * n / (n - 1)
+        standard_errors = np.sqrt(variances / n)
+        return {name: (means[i] / self.bet * 100, standard_errors[i] / self.bet * 100)
+                for i, name in enumerate(self.category_names)}
+
+
+class ImportanceSamplingSimulator:
+    """Defensive mixture importance sampling over reel outcomes
+
+    With probability 1 - rare_fraction a paid spin is drawn normally. Otherwise one
+    paying outcome (a paytable line or a jackpot trigger) is picked uniformly and
+    its reels are forced, the remaining reels spun normally. Rare combinations such
+    as 🍉🍉🍉 or 🃏🃏🃏 are then seen thousands of times more often, and each spin's
+    value is multiplied by its exact likelihood ratio p / q, which the normal
+    component bounds by 1 / (1 - rare_fraction). Bonus-round free spins are drawn
+    and reweighted the same way.
+    """
+
+    def __init__(self, config_data: Dict[str, Any], bet: float = 1.0, jackpot_pool: Optional[float] = None,
+                 rare_fraction: float = 0.5):
+        if not 0 <= rare_fraction < 1:
+            raise ValueError(f"Rare fraction must be in [0, 1), got {rare_fraction}")
+
+        self.bet = bet
+        self.rare_fraction = rare_fraction
+        self.reference = MonteCarloSimulator(config_data, bet, "reels", jackpot_pool)
+        self.jackpot_pool = self.reference.jackpot_pool
+        self._spinner = self.reference._spinner
+        self._evaluator = evaluator = self.reference._evaluator
+        symbol_table = evaluator.symbol_table
+        symbols = symbol_table.symbols
+        p = symbol_table.probabilities
+        k = len(symbol_table)
+
+        # Mixture components: every reachable paying line, then every jackpot spin
+        line_heads = [index for index in np.flatnonzero(evaluator.line_hit.ravel())
+                      if p[list(np.unravel_index(index, (k,) * LINE_LENGTH))].prod() > 0]
+        jackpot_keys = [key for key in evaluator.jackpot_keys
+                        if p[list(np.unravel_index(key, (k,) * REEL_COUNT))].prod() > 0]
+        self.component_reels = np.array(
+            [np.unravel_index(index, (k,) * LINE_LENGTH) + (0,) * (REEL_COUNT - LINE_LENGTH) for index in line_heads]
+            + [np.unravel_index(key, (k,) * REEL_COUNT) for key in jackpot_keys],
+            dtype=np.uint8).reshape(-1, REEL_COUNT)
+        self.component_forced = np.array(
+            [LINE_LENGTH] * len(line_heads) + [REEL_COUNT] * len(jackpot_keys), dtype=np.intp)
+        component_share = 1.0 / len(self.component_reels) if len(self.component_reels) else 0.0
+
+        # Bonus-round free spins come from the proposal, so whether a round paid says
+        # nothing about the target; a bonus entry counts as a hit with this exact chance
+        self._bonus_round_hit = ExactRTPEngine(config_data).bonus_round_hit_probability()
+
+        # q(x) / p(x) = (1 - a) + a * share / p(forced reels) when x matches a component
+        self._head_boost = np.zeros(k ** LINE_LENGTH)
+        for index in line_heads:
+            self._head_boost[index] = component_share / p[list(np.unravel_index(index, (k,) * LINE_LENGTH))].prod()
+        self._jackpot_keys = np.array(sorted(jackpot_keys), dtype=np.int64)
+        self._jackpot_boost = np.array(
+            [component_share / p[list(np.unravel_index(key, (k,) * REEL_COUNT))].prod()
+             for key in self._jackpot_keys])
+
+        # Outcome categories: one per paytable combination, then bonus, jackpot and the rest
+        self.category_names = list(evaluator.paytable) + ["bonus", "jackpot", "other"]
+        combination_ids = {combination: i for i, combination in enumerate(evaluator.paytable)}
+        self._line_category = np.full(k ** LINE_LENGTH, len(self.category_names) - 1, dtype=np.intp)
+        for index in np.flatnonzero(evaluator.line_hit.ravel()):
+            a, b, c = np.unravel_index(index, (k,) * LINE_LENGTH)
+            self._line_category[index] = combination_ids[symbols[a] + symbols[b] + symbols[c]]
+
+    def spin_proposal(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """Draw n spins from the mixture proposal"""
+        reels = self._spinner.spin_batch(n, rng)
+        if len(self.component_reels) == 0:
+            return reels
+
+        rare_rows = np.flatnonzero(rng.random(n) < self.rare_fraction)
+        components = rng.integers(0, len(self.component_reels), len(rare_rows))
+        for forced in np.unique(self.component_forced):
+            rows = rare_rows[self.component_forced[components] == forced]
+            chosen = components[self.component_forced[components] == forced]
+            reels[rows, :forced] = self.component_reels[chosen, :forced]
+        return reels
+
+    def likelihood_ratios(self, reels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Weights p(x) / q(x) for proposal spins, plus their head-reel indices"""
+        head = self._evaluator._flat_index(reels, 0, LINE_LENGTH)
+        boost = self._head_boost[head]
+        if len(self._jackpot_keys):
+            keys = head.astype(np.int64) * len(self.symbol_table) ** (REEL_COUNT - LINE_LENGTH) \
+                + self._evaluator._flat_index(reels, LINE_LENGTH, REEL_COUNT)
+            position = np.searchsorted(self._jackpot_keys, keys).clip(0, len(self._jackpot_keys) - 1)
+            matched = self._jackpot_keys[position] == keys
+            boost[matched] += self._jackpot_boost[position[matched]]
+        return 1.0 / ((1 - self.rare_fraction) + self.rare_fraction * boost), head
+
+    @property
+    def symbol_table(self) -> SymbolTable:
+        return self._evaluator.symbol_table
+
+    def bonus_round_wins(self, rounds: int, rng: np.random.Generator) -> np.ndarray:
+        """Unbiased bonus-round totals with every free spin drawn from the proposal too"""
+        bonus_spins = self.reference.bonus_spins
+        if rounds == 0 or bonus_spins == 0:
+            return np.zeros(rounds)
+        reels = self.spin_proposal(rounds * bonus_spins, rng)
+        free = self._evaluator.evaluate(reels, 0.0)
+        weights, _ = self.likelihood_ratios(reels)
+        return (weights * free.payout).reshape(rounds, bonus_spins).sum(axis=1)
+
+    def play_batch(self, n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, BatchWinResult, np.ndarray]:
+        """Spin n reweighted spins: (weights, wins, results, categories)"""
+        reels = self.spin_proposal(n, rng)
+        results = self._evaluator.evaluate(reels, self.jackpot_pool)
+        weights, head = self.likelihood_ratios(reels)
+
+        wins = results.payout.astype(np.float64)
+        bonus_rows = np.flatnonzero(results.bonus)
+        wins[bonus_rows] += self.bonus_round_wins(len(bonus_rows), rng)
+
+        categories = np.where(results.line_hit, self._line_category[head], len(self.category_names) - 1)
+        categories[results.bonus] = self.category_names.index("bonus")
+        categories[results.jackpot] = self.category_names.index("jackpot")
+        return weights, wins, results, categories
+
+    def run(self, spins: int, rng: np.random.Generator,
+            batch_size: int = DEFAULT_BATCH_SIZE) -> ImportanceSamplingStats:
+        """Simulate a fixed number of reweighted spins"""
+        size = len(self.category_names)
+        stats = ImportanceSamplingStats(bet=self.bet, category_names=self.category_names,
+                                        category_sums=np.zeros(size), category_square_sums=np.zeros(size))
+
+        remaining = spins
+        while remaining > 0:
+            n = min(batch_size, remaining)
+            weights, wins, results, categories = self.play_batch(n, rng)
+            values = weights * wins
+
+            stats.spins += n
+            stats.weight_sum += float(weights.sum())
+            stats.weight_square_sum += float(np.square(weights).sum())
+            stats.weighted_win_count += float(weights[results.payout > 0].sum()
+                                              + weights[results.bonus].sum() * self._bonus_round_hit)
+            stats.weighted_bonus_count += float(weights[results.bonus].sum())
+            stats.weighted_jackpot_count += float(weights[results.jackpot].sum())
+            stats.value_stats.add_batch(values)
+            stats.category_sums += np.bincount(categories, weights=values, minlength=size)
+            stats.category_square_sums += np.bincount(categories, weights=np.square(values), minlength=size)
+            remaining -= n
+        return stats
+
+
+# Per-process simulator, built once by the pool initializer
+_worker_simulator: Union[None, MonteCarloSimulator, ImportanceSamplingSimulator] = None
+
+AnyStats = Union[SimulationStats, ImportanceSamplingStats]
+
+
+def _init_worker(config_data: Dict[str, Any], bet: float, engine: str, jackpot_pool: Optional[float],
+                 rare_fraction: Optional[float] = None):
+    global _worker_simulator
+    if rare_fraction is not None:
+        _worker_simulator = ImportanceSamplingSimulator(config_data, bet, jackpot_pool, rare_fraction)
+    else:
+        _worker_simulator = MonteCarloSimulator(config_data, bet, engine, jackpot_pool)
+
+
+def _empty_stats(bet: float, rare_fraction: Optional[float]) -> AnyStats:
+    return ImportanceSamplingStats(bet=bet) if rare_fraction is not None else SimulationStats(bet=bet)
+
+
+def _run_task(task: tuple) -> AnyStats:
+    spins, seed_sequence, batch_size = task
+    return _worker_simulator.run(spins, np.random.default_rng(seed_sequence), batch_size)
+
+
+def split_tasks(spins: int, seed: Union[None, int, np.random.SeedSequence],
+                task_size: int = DEFAULT_TASK_SIZE) -> List[Tuple[int, np.random.SeedSequence]]:
+    """Split a run into (spins, SeedSequence) tasks
+
+    Each task owns an independent child stream of the root seed, so results are
+    reproducible for a given seed and task size whatever the number of workers.
+    Passing the same SeedSequence again continues with fresh, unused children.
+    """
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    task_count = max(1, math.ceil(spins / task_size))
+    children = root.spawn(task_count)
+    return [(min(task_size, spins - i * task_size), child) for i, child in enumerate(children)]
+
+
+def run_parallel_simulation(config_data: Dict[str, Any], spins: int, bet: float = 1.0,
+                            engine: str = "reels", workers: Optional[int] = None,
+                            seed: Optional[int] = None, jackpot_pool: Optional[float] = None,
+                            batch_size: int = DEFAULT_BATCH_SIZE, task_size: int = DEFAULT_TASK_SIZE,
+                            rare_fraction: Optional[float] = None) -> AnyStats:
+    """Run `spins` spins of one configuration across a process pool
+
+    With a rare_fraction the spins come from ImportanceSamplingSimulator and the
+    result is an ImportanceSamplingStats instead of a SimulationStats.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [(n, child, batch_size) for n, child in split_tasks(spins, seed, task_size)]
+
+    stats = _empty_stats(bet, rare_fraction)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                             initargs=(config_data, bet, engine, jackpot_pool, rare_fraction)) as executor:
+        # map() keeps task order, so merging is deterministic too
+        for partial in executor.map(_run_task, tasks):
+            stats.merge(partial)
+    return stats
+
+
+def run_until_precision(config_data: Dict[str, Any], target_width: float, bet: float = 1.0,
+                        engine: str = "reels", workers: Optional[int] = None,
+                        seed: Optional[int] = None, jackpot_pool: Optional[float] = None,
+                        z: float = 1.96, min_spins: int = DEFAULT_MIN_SPINS,
+                        max_spins: int = DEFAULT_MAX_SPINS, batch_size: int = DEFAULT_BATCH_SIZE,
+                        task_size: int = DEFAULT_TASK_SIZE,
+                        rare_fraction: Optional[float] = None) -> AnyStats:
+    """Spin in rounds until the RTP confidence interval is at most `target_width` points wide
+
+    Only the running aggregates are kept between rounds. After each round the
+    current variance estimate projects how many more spins the target needs,
+    so low-volatility configs stop early and volatile ones keep going.
+    """
+    if target_width <= 0:
+        raise ValueError(f"Target width must be positive, got {target_width}")
+
+    workers = workers or os.cpu_count() or 1
+    root = np.random.SeedSequence(seed)
+    stats = _empty_stats(bet, rare_fraction)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config_data, bet, engine, jackpot_pool, rare_fraction)) as executor:
+        round_spins = min(min_spins, max_spins)
+        while round_spins > 0:
+            tasks = [(n, child, batch_size) for n, child in split_tasks(round_spins, root, task_size)]
+            for partial in executor.map(_run_task, tasks):
+                stats.merge(partial)
+
+            width = 2 * z * stats.rtp_standard_error
+            if width <= target_width or stats.spins >= max_spins:
+                break
+
+            # Standard error shrinks with sqrt(n); aim slightly past the projection
+            projected = stats.spins * (width / target_width) ** 2
+            round_spins = int(min(max(projected * 1.05 - stats.spins, min_spins), max_spins - stats.spins))
+
+    return stats
+
+
+def format_simulation_report(config_file: str, stats: SimulationStats, elapsed: float,
+                             exact_rtp: Optional[float] = None, z: float = 1.96) -> str:
+    """Format simulation results for the console"""
+    low, high = stats.rtp_confidence_interval(z)
+    report = f"""
+🎰 SIMULATION: {config_file}
+• Spins: {stats.spins:,} at ${stats.bet:g} ({stats.spins / max(elapsed, 1e-9):,.0f} spins/s)
+• Empirical RTP: {stats.rtp_percentage:.4f}% (CI {low:.4f}% - {high:.4f}%, width {high - low:.4f} points)
+"""
+    for label, count in (("Hit Rate", stats.win_count), ("Bonus Rate", stats.bonus_count),
+                         ("Jackpot Rate", stats.jackpot_count)):
+        rate_low, rate_high = stats.rate_confidence_interval(count, z)
+        report += (f"• {label}: {count / max(stats.spins, 1) * 100:.4f}% "
+                   f"(CI {rate_low * 100:.4f}% - {rate_high * 100:.4f}%)\n")
+
+    if exact_rtp is not None:
+        report += _format_exact_comparison(stats, exact_rtp, z)
+    return report
+
+
+def _format_exact_comparison(stats: AnyStats, exact_rtp: float, z: float) -> str:
+    if not stats.rtp_standard_error:
+        # Too few spins, or every spin returned the same amount
+        return f"• Exact RTP: {exact_rtp:.4f}% (standard errors n/a)\n"
+    deviation = (stats.rtp_percentage - exact_rtp) / stats.rtp_standard_error
+    status = "✅ consistent" if abs(deviation) <= z else "⚠️ outside CI"
+    return f"• Exact RTP: {exact_rtp:.4f}% ({deviation:+.2f} standard errors, {status})\n"
+
+
+def format_importance_sampling_report(config_file: str, stats: ImportanceSamplingStats, elapsed: float,
+                                      exact: Optional[ExactRTPResult] = None, z: float = 1.96) -> str:
+    """Format an importance-sampled run, with per-combination contributions"""
+    low, high = stats.rtp_confidence_interval(z)
+    ess = stats.effective_sample_size
+    report = f"""
+🎯 IMPORTANCE SAMPLING: {config_file}
+• Spins: {stats.spins:,} at ${stats.bet:g} ({stats.spins / max(elapsed, 1e-9):,.0f} spins/s)
+• Estimated RTP: {stats.rtp_percentage:.4f}% (CI {low:.4f}% - {high:.4f}%, width {high - low:.4f} points)
+• Effective Sample Size: {ess:,.0f} ({ess / max(stats.spins, 1) * 100:.1f}% of spins)
+• Hit Rate: {stats.hit_rate * 100:.4f}%
+• Bonus Rate: {stats.bonus_rate * 100:.4f}%
+• Jackpot Rate: {stats.jackpot_rate * 100:.6f}%
+"""
+    if exact is not None:
+        report += _format_exact_comparison(stats, exact.rtp_percentage, z)
+
+    report += "\n🏆 COMBINATION CONTRIBUTIONS:\n"
+    for name, (contribution, standard_error) in stats.contributions().items():
+        report += f"  {name}: +{contribution:.4f}% ± {z * standard_error:.4f}"
+        if exact is not None and name in exact.combination_contributions:
+            report += f" (exact {exact.combination_contributions[name]:.4f}%)"
+        report += "\n"
+    return report
+
+
+def parse_spin_count(value: str) -> int:
+    """Accept counts such as 1000000, 1e9 or 1_000_000"""
+    count = int(float(value.replace("_", "")))
+    if count <= 0:
+        raise argparse.ArgumentTypeError(f"Spin count must be positive, got {value}")
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless Monte Carlo simulation of slot configurations")
+    parser.add_argument("configs", nargs="*", default=["config.json"], help="Configuration files to simulate")
+    parser.add_argument("--spins", type=parse_spin_count, default=10_000_000, help="Spins per configuration")
+    parser.add_argument("--bet", type=float, default=1.0, help="Bet per spin")
+    parser.add_argument("--engine", choices=ENGINE_MODES, default="reels",
+                        help="reels: spin and evaluate reels; table: draw from the outcome table")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None, help="Root seed for reproducible runs")
+    parser.add_argument("--jackpot-pool", type=float, default=None, help="Jackpot pool paid on a jackpot")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Spins per vectorized batch")
+    parser.add_argument("--confidence-z", type=float, default=1.96, help="z value of the confidence intervals")
+    parser.add_argument("--target-ci-width", type=float, default=None,
+                        help="Spin until the RTP CI is this many percentage points wide (ignores --spins)")
+    parser.add_argument("--max-spins", type=parse_spin_count, default=DEFAULT_MAX_SPINS,
+                        help="Spin cap for --target-ci-width runs")
+    parser.add_argument("--importance-sampling", type=float, default=None, metavar="FRACTION",
+                        help="Force a paying line or jackpot on this fraction of spins and reweight "
+                             "(e.g. 0.5); reports per-combination contributions and effective sample size")
+    args = parser.parse_args(argv)
+
+    for config_file in args.configs:
+        config_manager = ConfigManager(config_file)
+        config_manager.load_config()
+        config_data = config_manager.config_data
+
+        start = time.perf_counter()
+        if args.target_ci_width is not None:
+            stats = run_until_precision(config_data, args.target_ci_width, args.bet, args.engine,
+                                        args.workers, args.seed, args.jackpot_pool, args.confidence_z,
+                                        max_spins=args.max_spins, batch_size=args.batch_size,
+                                        rare_fraction=args.importance_sampling)
+        else:
+            stats = run_parallel_simulation(config_data, args.spins, args.bet, args.engine, args.workers,
+                                            args.seed, args.jackpot_pool, args.batch_size,
+                                            rare_fraction=args.importance_sampling)
+        elapsed = time.perf_counter() - start
+
+        exact = ExactRTPEngine(config_data).calculate(args.bet, args.jackpot_pool)
+        if args.importance_sampling is not None:
+            print(format_importance_sampling_report(config_file, stats, elapsed, exact, args.confidence_z))
+        else:
+            print(format_simulation_report(config_file, stats, elapsed, exact.rtp_percentage, args.confidence_z))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
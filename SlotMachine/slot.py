@@ -7,9 +7,13 @@ import json
 import msvcrt  # For Windows key detection
 from datetime import datetime
 from colorama import Fore, Style, init
-from database.db import initialize_db, fetch_initial_values, update_jackpot_pool, save_analytics_to_db, get_historical_analytics, save_balance, load_balance, create_user_profile, start_session, end_session, get_user_sessions, update_user_stats, get_user_profile, get_user_profile_by_username, get_session_stats, get_db_connection
+from database.db import initialize_db, fetch_initial_values, update_jackpot_pool, save_analytics_to_db, get_historical_analytics, save_balance, load_balance, create_user_profile, start_session, end_session, get_user_sessions, update_user_stats, get_user_profile, get_user_profile_by_username, get_session_stats, get_db_connection, DB_PATH, SpinLedger
 from config_manager import load_game_config, get_config_manager
 from rtp_calculator import create_rtp_calculator
+from reel_sampler import ReelSampler
+from spin_logger import DatabaseSpinLogWriter, SpinSampler, build_spin_record, flush_spin_log, get_spin_log_writer
+from spin_analytics import calculate_spin_analytics
+from spin_sketches import format_sketch_report, get_sketch_writer
 
 init(autoreset=True)
 
@@ -17,6 +21,18 @@ init(autoreset=True)
 game_config = load_game_config()
 config_manager = get_config_manager()
 rtp_calculator = create_rtp_calculator()
+reel_sampler = ReelSampler(game_config.symbol_weights)
+spin_sampler = SpinSampler(game_config.log_sample_every, game_config.log_big_win_multiplier)
+# Rotated into slot_analytics_segments/ daily or at 64 MiB, whichever comes first
+spin_log_writer = get_spin_log_writer('slot_analytics.csv', rotate_bytes=64 << 20, rotate_daily=True)
+spin_event_writer = get_spin_log_writer(DB_PATH, DatabaseSpinLogWriter)  # spin_events table
+spin_sketch_writer = get_sketch_writer('slot_analytics.sketch.json')  # Bet/win/net/session percentiles
+try:
+    # Compact binary copy of the spin log for large-scale analytics (requires NumPy)
+    from binary_spin_log import get_binary_spin_log_writer
+    binary_spin_log_writer = get_binary_spin_log_writer('slot_analytics.spins', list(game_config.symbol_weights))
+except ImportError:
+    binary_spin_log_writer = None
 
 # Configure logging (reduced verbosity for better flow)
 logging.basicConfig(
@@ -44,80 +60,33 @@ auto_target_high = 0
 auto_target_low = 0
 auto_spin_count = 0
 
-def log_spin_data(reels, bet, win_result, balance, jackpot_pool):
+def log_spin_data(reels, bet, win_result, balance, jackpot_pool, user_id=None, session_id=None):
     """Simplified logging - only big wins for better performance"""
     if isinstance(win_result, int) and win_result > bet * 10:  # Only log big wins
         logging.info(f"Big win: ${win_result} on bet ${bet}")
     
-    # Simplified CSV logging
-    csv_filename = 'slot_analytics.csv'
-    file_exists = os.path.isfile(csv_filename)
+    # Queued to the background writers; the log files stay open between spins
+    record = build_spin_record(reels, bet, win_result, balance, jackpot_pool, jackpot_symbol, user_id, session_id)
+    spin_event_writer.write(record)
+    spin_sketch_writer.write(dict(record, sample_weight=1))  # Sees every spin; the sampler reweights `record`
     
-    with open(csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['timestamp', 'bet_amount', 'win_amount', 'balance_after']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerow({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'bet_amount': bet,
-            'win_amount': win_result if isinstance(win_result, int) else 0,
-            'balance_after': balance
-        })
+    # The files only get a sample of ordinary spins, weighted to keep totals unbiased
+    if spin_sampler.sample(record):
+        spin_log_writer.write(record)
+        if binary_spin_log_writer is not None:
+            binary_spin_log_writer.write(record)
 
 def calculate_analytics():
-    """Calculate RTP and other analytics from CSV data"""
-    csv_filename = 'slot_analytics.csv'
+    """Calculate RTP and other analytics from CSV data
     
-    if not os.path.isfile(csv_filename):
-        return None
-    
-    total_bets = 0
-    total_wins = 0
-    total_spins = 0
-    win_count = 0
-    bonus_count = 0
-    jackpot_count = 0
+    Totals are checkpointed next to the CSV, so only rows logged since the
+    previous call are parsed.
+    """
+    csv_filename = 'slot_analytics.csv'
+    flush_spin_log(csv_filename)
     
     try:
-        with open(csv_filename, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            
-            for row in reader:
-                total_spins += 1
-                total_bets += float(row['bet_amount'])
-                win_amount = float(row['win_amount'])
-                total_wins += win_amount
-                
-                if win_amount > 0:
-                    win_count += 1
-                
-                if row['win_type'] == 'bonus_round':
-                    bonus_count += 1
-                elif row['win_type'] == 'jackpot':
-                    jackpot_count += 1
-        
-        # Calculate RTP (Return to Player)
-        rtp = (total_wins / total_bets * 100) if total_bets > 0 else 0
-        win_rate = (win_count / total_spins * 100) if total_spins > 0 else 0
-        avg_bet = total_bets / total_spins if total_spins > 0 else 0
-        avg_win = total_wins / win_count if win_count > 0 else 0
-        
-        return {
-            'total_spins': total_spins,
-            'total_bets': total_bets,
-            'total_wins': total_wins,
-            'net_result': total_wins - total_bets,
-            'rtp_percentage': round(rtp, 2),
-            'win_rate_percentage': round(win_rate, 2),
-            'win_count': win_count,
-            'bonus_count': bonus_count,
-            'jackpot_count': jackpot_count,
-            'average_bet': round(avg_bet, 2),
-            'average_win': round(avg_win, 2)
-        }
+        return calculate_spin_analytics(csv_filename)
     
     except Exception as e:
         logging.error(f"Error calculating analytics: {e}")
@@ -153,6 +122,9 @@ def display_analytics():
     print(Fore.WHITE + f"💵 Average Bet: ${analytics['average_bet']:.2f}")
     print(Fore.WHITE + f"🏅 Average Win: ${analytics['average_win']:.2f}")
     
+    spin_sketch_writer.flush()
+    print(Fore.WHITE + format_sketch_report(spin_sketch_writer.sketches), end='')
+    
     # RTP Analysis
     print(Fore.MAGENTA + "\n--- RTP ANALYSIS ---")
     if analytics['rtp_percentage'] > 95:
@@ -248,10 +220,11 @@ def show_difficulty_menu():
             config_manager.apply_difficulty_preset(selected_difficulty)
             
             # Update global variables
-            global game_config, paytable, rtp_calculator
+            global game_config, paytable, rtp_calculator, reel_sampler
             game_config = config_manager.game_config
             paytable = game_config.paytable
             rtp_calculator = create_rtp_calculator()
+            reel_sampler = ReelSampler(game_config.symbol_weights)
             
             print(Fore.GREEN + f"✅ Applied '{selected_difficulty}' difficulty!")
             
@@ -289,12 +262,15 @@ def export_config():
 
 def spin_reel():
     """Spin a single reel using configuration-based symbol weights"""
-    symbols = list(game_config.symbol_weights.keys())
-    weights = list(game_config.symbol_weights.values())
-    return random.choices(symbols, weights=weights)[0]
+    return reel_sampler.draw()
 
 def spin_slot_machine():
-    return [spin_reel(), spin_reel(), spin_reel(), spin_reel(), spin_reel()]  # 5-reel system
+    return reel_sampler.draw_many(5)  # 5-reel system
+
+def spin_slot_machine_batch(n):
+    """Spin n rounds at once as an (n, 5) uint8 array of symbol codes (requires NumPy)"""
+    from batch_engine import BatchSpinEngine
+    return BatchSpinEngine(game_config.symbol_weights).spin_batch(n)
 
 def quick_spin_animation():
     """Fast but visually appealing animation"""
@@ -365,6 +341,10 @@ def quick_spin_animation():
     
     return final_reels
 
+def is_jackpot(reels):
+    """Whether check_win pays these reels the jackpot pool"""
+    return ''.join(reels[:3]) not in paytable and ''.join(reels) == jackpot_symbol
+
 def check_win(reels, bet, jackpot_pool):
     combination = ''.join(reels[:3])
     
@@ -375,11 +355,8 @@ def check_win(reels, bet, jackpot_pool):
     
     if combination in paytable:
         return paytable[combination] * multiplier
-    elif ''.join(reels) == jackpot_symbol:
-        jackpot_winnings = jackpot_pool
-        jackpot_pool = 500  # Jackpot resets
-        update_jackpot_pool(jackpot_pool)
-        return jackpot_winnings
+    elif is_jackpot(reels):
+        return jackpot_pool  # In play, the pool is paid out through the spin ledger
     elif bonus_symbol in reels:
         return "bonus"
     return 0
@@ -765,6 +742,7 @@ def slot_machine():
         balance = user_profile['balance']
         current_user_id = user_profile['user_id']
         session_id = start_session(current_user_id, balance)
+        session_started = time.time()
         
         print(Fore.GREEN + Style.BRIGHT + "\n" + "="*50)
         print(Fore.GREEN + Style.BRIGHT + f"\tWelcome back, {user_profile['username']}!")
@@ -781,6 +759,9 @@ def slot_machine():
         print(Fore.GREEN + Style.BRIGHT + "="*50 + "\n")
         print(Fore.GREEN + Style.BRIGHT + f"\tYour starting balance: ${balance}")
     
+    # Balance, jackpot and session counters are committed per spin in one transaction
+    spin_ledger = SpinLedger(current_user_id, session_id)
+    
     print(Fore.CYAN + f"\tCurrent RTP Target: {game_config.target_rtp}%")
     print(Fore.CYAN + f"\tHouse Edge: {game_config.house_edge}%\n")
     
@@ -822,8 +803,9 @@ def slot_machine():
                     continue
             
             balance -= bet
-            jackpot_pool += bet * game_config.jackpot_contribution_rate
-            update_jackpot_pool(jackpot_pool)
+            jackpot_contribution = bet * game_config.jackpot_contribution_rate
+            # The pool is shared with every other player; show its current value
+            jackpot_pool = spin_ledger.jackpot_pool() + jackpot_contribution
             
             # Update session statistics
             session_spins += 1
@@ -833,17 +815,18 @@ def slot_machine():
             reels = quick_spin_animation()
             
             win_result = check_win(reels, bet, jackpot_pool)
+            if is_jackpot(reels):
+                # Pays the true shared pool, including this spin's contribution, exactly once
+                win_result = spin_ledger.award_jackpot(game_config.jackpot_reset, jackpot_contribution)
+                jackpot_pool = win_result
+                jackpot_contribution = 0.0
             display_slot_machine(reels, jackpot_pool, win_result, bet)
             
             # Log the spin data
-            log_spin_data(reels, bet, win_result, balance, jackpot_pool)
-            
-            # Save balance to user profile if logged in
-            if user_profile:
-                save_balance(current_user_id, balance)
+            log_spin_data(reels, bet, win_result, balance, jackpot_pool, current_user_id, session_id)
             
             win_amount = 0
-            if isinstance(win_result, int) and win_result > 0:
+            if isinstance(win_result, (int, float)) and win_result > 0:  # Jackpots pay the float pool
                 win_amount = win_result
                 balance += win_result
                 session_wins += win_result
@@ -855,6 +838,7 @@ def slot_machine():
                 
             elif win_result == "bonus":
                 bonus_win = quick_bonus_round()
+                win_amount = bonus_win
                 balance += bonus_win
                 session_wins += bonus_win
                 
@@ -866,6 +850,8 @@ def slot_machine():
             else:
                 print(Fore.RED + "\nBetter luck next time!")
             
+            spin_ledger.record_spin(bet, win_amount, balance, jackpot_contribution)
+            
             print(Fore.CYAN + f"Balance: ${balance}")
             
             # Quick continue - no forced menu
@@ -877,14 +863,14 @@ def slot_machine():
                     # Start intelligent auto-play mode
                     AUTO_PLAY_MODE = True
                     auto_start_balance = balance
-                    auto_target_high = auto_start_balance * 1.2  # 20% profit target
-                    auto_target_low = auto_start_balance * 0.6   # 40% loss limit
+                    auto_target_high = auto_start_balance * (1 + game_config.auto_take_profit)  # Profit target
+                    auto_target_low = auto_start_balance * (1 - game_config.auto_stop_loss)    # Loss limit
                     auto_spin_count = 0
                     
                     print(Fore.GREEN + Style.BRIGHT + f"🚀 AUTO-PLAY MODE ACTIVATED! 🚀")
                     print(Fore.CYAN + f"💰 Starting Balance: ${auto_start_balance:.2f}")
-                    print(Fore.GREEN + f"🎯 Target (Stop at): ${auto_target_high:.2f} (+20%)")
-                    print(Fore.RED + f"🛑 Limit (Stop at): ${auto_target_low:.2f} (-40%)")
+                    print(Fore.GREEN + f"🎯 Target (Stop at): ${auto_target_high:.2f} (+{game_config.auto_take_profit:.0%})")
+                    print(Fore.RED + f"🛑 Limit (Stop at): ${auto_target_low:.2f} (-{game_config.auto_stop_loss:.0%})")
                     print(Fore.YELLOW + f"💸 Current Bet: ${bet}")
                     print(Fore.MAGENTA + "Press 'q' anytime to stop auto-play\n")
                     
@@ -945,6 +931,7 @@ def slot_machine():
             print(Fore.RED + "Please enter a valid number.")
     
     # Game ending - save data and update user profile
+    spin_ledger.close()
     final_analytics = calculate_analytics()
     if final_analytics:
         save_analytics_to_db(final_analytics)
@@ -952,11 +939,9 @@ def slot_machine():
     
     # Update user profile and end session if logged in
     if user_profile and session_id:
-        # Update user statistics
-        update_user_stats(current_user_id, session_spins, session_bets, session_wins, biggest_win_this_session)
-        
-        # End the session
+        # End the session (user statistics are kept current by the spin ledger)
         end_session(session_id, balance, session_spins, session_bets, session_wins)
+        spin_sketch_writer.add_session_duration(time.time() - session_started)
         
         # Final save of balance
         save_balance(current_user_id, balance)
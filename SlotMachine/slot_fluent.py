@@ -6,9 +6,11 @@ import csv
 import json
 from datetime import datetime
 from colorama import Fore, Style, init
-from database.db import initialize_db, fetch_initial_values, update_jackpot_pool, save_analytics_to_db, get_historical_analytics, save_balance, load_balance, create_user_profile, start_session, end_session, get_user_sessions, update_user_stats, get_user_profile, get_user_profile_by_username, get_session_stats, get_db_connection
+from database.db import initialize_db, fetch_initial_values, update_jackpot_pool, contribute_jackpot, award_jackpot, get_jackpot_pool, save_analytics_to_db, get_historical_analytics, save_balance, load_balance, create_user_profile, start_session, end_session, get_user_sessions, update_user_stats, get_user_profile, get_user_profile_by_username, get_session_stats, get_db_connection
 from config_manager import load_game_config, get_config_manager
 from rtp_calculator import create_rtp_calculator
+from reel_sampler import ReelSampler
+from spin_logger import SpinSampler, build_spin_record, get_spin_log_writer
 import msvcrt  # For Windows key detection
 
 init(autoreset=True)
@@ -17,6 +19,9 @@ init(autoreset=True)
 game_config = load_game_config()
 config_manager = get_config_manager()
 rtp_calculator = create_rtp_calculator()
+reel_sampler = ReelSampler(game_config.symbol_weights)
+spin_sampler = SpinSampler(game_config.log_sample_every, game_config.log_big_win_multiplier)
+spin_log_writer = get_spin_log_writer('slot_analytics.csv')
 
 # Configure logging (reduced verbosity)
 logging.basicConfig(
@@ -46,15 +51,18 @@ def log_spin_data(reels, bet, win_result, balance, jackpot_pool):
     """Simplified logging - only critical data"""
     if isinstance(win_result, int) and win_result > bet * 10:  # Only log big wins
         logging.info(f"Big win: ${win_result} on bet ${bet}")
+    
+    # Sampled spin log: big wins, bonus rounds and jackpots always, 1 in sample_every of the rest
+    record = build_spin_record(reels, bet, win_result, balance, jackpot_pool, jackpot_symbol)
+    if spin_sampler.sample(record):
+        spin_log_writer.write(record)
 
 def spin_reel():
     """Spin a single reel using configuration-based symbol weights"""
-    symbols = list(game_config.symbol_weights.keys())
-    weights = list(game_config.symbol_weights.values())
-    return random.choices(symbols, weights=weights)[0]
+    return reel_sampler.draw()
 
 def spin_slot_machine():
-    return [spin_reel(), spin_reel(), spin_reel(), spin_reel(), spin_reel()]
+    return reel_sampler.draw_many(5)
 
 def quick_spin_animation():
     """Fast, minimal animation for better flow"""
@@ -69,6 +77,10 @@ def quick_spin_animation():
     print()
     return spin_slot_machine()
 
+def is_jackpot(reels):
+    """Whether check_win pays these reels the jackpot pool"""
+    return ''.join(reels[:3]) not in paytable and ''.join(reels) == jackpot_symbol
+
 def check_win(reels, bet, jackpot_pool):
     combination = ''.join(reels[:3])
     
@@ -79,11 +91,8 @@ def check_win(reels, bet, jackpot_pool):
     
     if combination in paytable:
         return paytable[combination] * multiplier
-    elif ''.join(reels) == jackpot_symbol:
-        jackpot_winnings = jackpot_pool
-        jackpot_pool = 500
-        update_jackpot_pool(jackpot_pool)
-        return jackpot_winnings
+    elif is_jackpot(reels):
+        return jackpot_pool  # In play, the pool is paid out by award_jackpot()
     elif bonus_symbol in reels:
         return "bonus"
     return 0
@@ -112,7 +121,7 @@ def display_game_result(reels, win_result, balance, jackpot_pool, bet):
     print(Fore.YELLOW + f"💰 Jackpot: ${jackpot_pool:.2f}")
     print(Fore.CYAN + f"🎰 [ {' | '.join(reels)} ]")
     
-    if isinstance(win_result, int) and win_result > 0:
+    if isinstance(win_result, (int, float)) and win_result > 0:
         profit = win_result - bet
         print(Fore.GREEN + f"✅ WIN: ${win_result} (Profit: +${profit})")
     elif win_result == "bonus":
@@ -222,9 +231,11 @@ def auto_play_session(balance, bet, user_profile, current_user_id, session_id, j
         
         reels = spin_slot_machine()
         win_result = check_win(reels, bet, jackpot_pool)
+        if is_jackpot(reels):
+            win_result = award_jackpot(game_config.jackpot_reset)
         
         win_amount = 0
-        if isinstance(win_result, int) and win_result > 0:
+        if isinstance(win_result, (int, float)) and win_result > 0:
             win_amount = win_result
             balance += win_result
             session_wins += win_result
@@ -321,8 +332,10 @@ def slot_machine():
                     
                     reels = spin_slot_machine()
                     win_result = check_win(reels, last_bet, jackpot_pool)
+                    if is_jackpot(reels):
+                        win_result = award_jackpot(game_config.jackpot_reset)
                     
-                    if isinstance(win_result, int) and win_result > 0:
+                    if isinstance(win_result, (int, float)) and win_result > 0:
                         balance += win_result
                         session_wins += win_result
                         print(f"Spin {i+1}: WIN ${win_result} → Balance: ${balance}")
@@ -357,8 +370,8 @@ def slot_machine():
             
             last_bet = bet
             balance -= bet
-            jackpot_pool += bet * game_config.jackpot_contribution_rate
-            update_jackpot_pool(jackpot_pool)
+            contribute_jackpot(bet * game_config.jackpot_contribution_rate)
+            jackpot_pool = get_jackpot_pool()
             
             session_spins += 1
             session_bets += bet
@@ -366,10 +379,13 @@ def slot_machine():
             # Quick spin
             reels = quick_spin_animation()
             win_result = check_win(reels, bet, jackpot_pool)
+            if is_jackpot(reels):
+                # Pays the true shared pool exactly once and resets it
+                win_result = award_jackpot(game_config.jackpot_reset)
             
             # Process results
             win_amount = 0
-            if isinstance(win_result, int) and win_result > 0:
+            if isinstance(win_result, (int, float)) and win_result > 0:
                 win_amount = win_result
                 balance += win_result
                 session_wins += win_result
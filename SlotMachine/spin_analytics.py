@@ -0,0 +1,354 @@
+"""
+Incremental analytics over the spin log
+Keeps a checkpoint next to slot_analytics.csv holding the byte offset already
+consumed and the running totals, so each analytics call only parses the rows
+appended since the previous one. Rotated, compressed log segments carry their
+own summaries, so lifetime and time-range analytics stay cheap as history grows
+"""
+
+import csv
+import glob
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from spin_logger import SPIN_LOG_FILE
+
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+CHECKPOINT_VERSION = 1
+FINGERPRINT_BYTES = 256  # Bytes before the offset that must still match on resume
+READ_CHUNK_SIZE = 8 << 20
+SEGMENT_SUFFIX = '.csv.gz'
+SUMMARY_SUFFIX = '.summary.json'
+
+
+@dataclass
+class SpinAggregates:
+    """Running totals behind calculate_analytics()
+
+    Rows of a sampled log count sample_weight times (missing means 1), so the
+    totals are unbiased estimates of those over every spin.
+    """
+    total_spins: int = 0
+    total_bets: float = 0.0
+    total_wins: float = 0.0
+    win_count: int = 0
+    bonus_count: int = 0
+    jackpot_count: int = 0
+    skipped_rows: int = 0  # Rows without a numeric bet and win (old short-format rows)
+
+    def add_row(self, row: Dict[str, Any]):
+        try:
+            bet_amount = float(row['bet_amount'])
+            win_amount = float(row['win_amount'])
+            weight = float(row.get('sample_weight') or 1)
+        except (KeyError, TypeError, ValueError):
+            self.skipped_rows += 1
+            return
+        if weight.is_integer():
+            weight = int(weight)
+
+        self.total_spins += weight
+        self.total_bets += bet_amount * weight
+        self.total_wins += win_amount * weight
+        if win_amount > 0:
+            self.win_count += weight
+
+        win_type = row.get('win_type')
+        if win_type == 'bonus_round':
+            self.bonus_count += weight
+        elif win_type == 'jackpot':
+            self.jackpot_count += weight
+
+    def merge(self, other: 'SpinAggregates'):
+        self.total_spins += other.total_spins
+        self.total_bets += other.total_bets
+        self.total_wins += other.total_wins
+        self.win_count += other.win_count
+        self.bonus_count += other.bonus_count
+        self.jackpot_count += other.jackpot_count
+        self.skipped_rows += other.skipped_rows
+
+    def to_analytics(self) -> Dict[str, Any]:
+        """The dictionary calculate_analytics() returns"""
+        rtp = (self.total_wins / self.total_bets * 100) if self.total_bets > 0 else 0
+        win_rate = (self.win_count / self.total_spins * 100) if self.total_spins > 0 else 0
+        avg_bet = self.total_bets / self.total_spins if self.total_spins > 0 else 0
+        avg_win = self.total_wins / self.win_count if self.win_count > 0 else 0
+
+        return {
+            'total_spins': self.total_spins,
+            'total_bets': self.total_bets,
+            'total_wins': self.total_wins,
+            'net_result': self.total_wins - self.total_bets,
+            'rtp_percentage': round(rtp, 2),
+            'win_rate_percentage': round(win_rate, 2),
+            'win_count': self.win_count,
+            'bonus_count': self.bonus_count,
+            'jackpot_count': self.jackpot_count,
+            'average_bet': round(avg_bet, 2),
+            'average_win': round(avg_win, 2)
+        }
+
+
+@dataclass
+class AnalyticsCheckpoint:
+    """How far into the log the aggregates reach"""
+    offset: int = 0
+    header: List[str] = field(default_factory=list)
+    fingerprint: str = ''  # Hash of the bytes just before offset, to detect a replaced log
+    aggregates: SpinAggregates = field(default_factory=SpinAggregates)
+
+    @classmethod
+    def load(cls, checkpoint_file: str) -> 'AnalyticsCheckpoint':
+        """Read a checkpoint; a missing or unreadable one starts from scratch"""
+        try:
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != CHECKPOINT_VERSION:
+                return cls()
+            return cls(offset=data['offset'], header=data['header'], fingerprint=data['fingerprint'],
+                       aggregates=SpinAggregates(**data['aggregates']))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring analytics checkpoint {checkpoint_file}: {e}")
+            return cls()
+
+    def save(self, checkpoint_file: str):
+        """Write atomically, so a crash never leaves a half-written checkpoint"""
+        data = {
+            'version': CHECKPOINT_VERSION,
+            'offset': self.offset,
+            'header': self.header,
+            'fingerprint': self.fingerprint,
+            'aggregates': asdict(self.aggregates)
+        }
+        temp_file = checkpoint_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_file, checkpoint_file)
+
+
+def checkpoint_path(csv_filename: str) -> str:
+    return csv_filename + CHECKPOINT_SUFFIX
+
+
+def _fingerprint(f, offset: int) -> str:
+    start = max(0, offset - FINGERPRINT_BYTES)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+def update_checkpoint(csv_filename: str, checkpoint: AnalyticsCheckpoint) -> bool:
+    """Fold rows appended since checkpoint.offset into it; True if anything was read
+
+    Only complete lines are consumed, so a row still being written is picked up
+    by the next call. A log that shrank or whose bytes before the offset changed
+    (rotated or replaced) is re-read from the start.
+    """
+    with open(csv_filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if checkpoint.offset and (size < checkpoint.offset
+                                  or _fingerprint(f, checkpoint.offset) != checkpoint.fingerprint):
+            logging.warning(f"{csv_filename} changed since the last analytics checkpoint, re-reading it")
+            checkpoint.offset = 0
+            checkpoint.header = []
+            checkpoint.aggregates = SpinAggregates()
+
+        if size == checkpoint.offset:
+            return False
+
+        f.seek(checkpoint.offset)
+        if not checkpoint.header:
+            header_line = f.readline()
+            if not header_line.endswith(b'\n'):
+                return False
+            checkpoint.header = next(csv.reader([header_line.decode('utf-8')]))
+            checkpoint.offset = f.tell()
+
+        consumed = checkpoint.offset
+        remainder = b''
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = remainder + chunk
+            end = data.rfind(b'\n') + 1
+            remainder = data[end:]
+            if end:
+                text = data[:end].decode('utf-8')
+                for row in csv.DictReader(io.StringIO(text, newline=''), fieldnames=checkpoint.header):
+                    checkpoint.aggregates.add_row(row)
+                consumed += end
+
+        checkpoint.offset = consumed
+        checkpoint.fingerprint = _fingerprint(f, consumed)
+        return True
+
+
+@dataclass
+class SegmentSummary:
+    """Totals and time span of one rotated log segment"""
+    segment_file: str
+    first_timestamp: Optional[str] = None
+    last_timestamp: Optional[str] = None
+    aggregates: SpinAggregates = field(default_factory=SpinAggregates)
+
+    @classmethod
+    def load(cls, summary_file: str) -> 'SegmentSummary':
+        with open(summary_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(segment_file=os.path.join(os.path.dirname(summary_file), data['segment_file']),
+                   first_timestamp=data['first_timestamp'], last_timestamp=data['last_timestamp'],
+                   aggregates=SpinAggregates(**data['aggregates']))
+
+    def save(self, summary_file: str):
+        data = {
+            'segment_file': os.path.basename(self.segment_file),
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'aggregates': asdict(self.aggregates)
+        }
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def inside(self, start_time: Optional[str], end_time: Optional[str]) -> bool:
+        """True if every row lies in [start_time, end_time)"""
+        if self.first_timestamp is None:
+            return True
+        return ((start_time is None or self.first_timestamp >= start_time)
+                and (end_time is None or self.last_timestamp < end_time))
+
+    def outside(self, start_time: Optional[str], end_time: Optional[str]) -> bool:
+        """True if no row lies in [start_time, end_time)"""
+        if self.first_timestamp is None:
+            return True
+        return ((start_time is not None and self.last_timestamp < start_time)
+                or (end_time is not None and self.first_timestamp >= end_time))
+
+
+def segment_directory(csv_filename: str = SPIN_LOG_FILE) -> str:
+    """Where rotated segments of a log live: slot_analytics.csv -> slot_analytics_segments/"""
+    return os.path.splitext(csv_filename)[0] + '_segments'
+
+
+def summarize_rows(rows: Iterable[Dict[str, Any]], start_time: Optional[str] = None,
+                   end_time: Optional[str] = None) -> Tuple[SpinAggregates, Optional[str], Optional[str]]:
+    """Totals and first/last timestamps of the rows in [start_time, end_time)"""
+    aggregates = SpinAggregates()
+    first = last = None
+    for row in rows:
+        timestamp = row.get('timestamp') or ''
+        if (start_time is not None and timestamp < start_time) or (end_time is not None and timestamp >= end_time):
+            continue
+        counted = aggregates.total_spins
+        aggregates.add_row(row)
+        if aggregates.total_spins > counted:
+            first = timestamp if first is None else min(first, timestamp)
+            last = timestamp if last is None else max(last, timestamp)
+    return aggregates, first, last
+
+
+def rotate_spin_log(csv_filename: str = SPIN_LOG_FILE) -> Optional[SegmentSummary]:
+    """Move the log into a gzip segment with a summary sidecar; None if it has no rows
+
+    The caller must have closed its handle on the log. The segment and summary are
+    written under temporary names and renamed into place before the log is removed.
+    """
+    if not os.path.isfile(csv_filename):
+        return None
+    with open(csv_filename, 'r', encoding='utf-8', newline='') as f:
+        aggregates, first, last = summarize_rows(csv.DictReader(f))
+    if aggregates.total_spins == 0 and aggregates.skipped_rows == 0:
+        return None
+
+    directory = segment_directory(csv_filename)
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(csv_filename))[0]
+    label = (first or '0000-00-00 00:00:00').replace('-', '').replace(':', '').replace(' ', '-')
+    number = len(glob.glob(os.path.join(directory, f'{stem}-{label}-*{SEGMENT_SUFFIX}')))
+    segment_file = os.path.join(directory, f'{stem}-{label}-{number}{SEGMENT_SUFFIX}')
+    summary = SegmentSummary(segment_file, first, last, aggregates)
+
+    with open(csv_filename, 'rb') as source, gzip.open(segment_file + '.tmp', 'wb') as target:
+        shutil.copyfileobj(source, target)
+    summary.save(segment_file + SUMMARY_SUFFIX + '.tmp')
+    os.replace(segment_file + '.tmp', segment_file)
+    os.replace(segment_file + SUMMARY_SUFFIX + '.tmp', segment_file + SUMMARY_SUFFIX)
+    os.remove(csv_filename)
+
+    # The new log starts empty; its checkpoint starts over with it
+    if os.path.isfile(checkpoint_path(csv_filename)):
+        os.remove(checkpoint_path(csv_filename))
+    return summary
+
+
+def load_segment_summaries(csv_filename: str = SPIN_LOG_FILE) -> List[SegmentSummary]:
+    """Summaries of every rotated segment of a log, oldest first"""
+    summaries = []
+    for summary_file in glob.glob(os.path.join(segment_directory(csv_filename), f'*{SEGMENT_SUFFIX}{SUMMARY_SUFFIX}')):
+        try:
+            summaries.append(SegmentSummary.load(summary_file))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring segment summary {summary_file}: {e}")
+    return sorted(summaries, key=lambda summary: (summary.first_timestamp or '', summary.segment_file))
+
+
+def calculate_spin_analytics(csv_filename: str = SPIN_LOG_FILE,
+                             checkpoint_file: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Lifetime analytics of a spin log, parsing only rows added since the last call
+
+    Rotated segments contribute their stored summaries without being opened.
+    """
+    segments = load_segment_summaries(csv_filename)
+    if not os.path.isfile(csv_filename) and not segments:
+        return None
+
+    aggregates = SpinAggregates()
+    for summary in segments:
+        aggregates.merge(summary.aggregates)
+
+    if os.path.isfile(csv_filename):
+        checkpoint_file = checkpoint_file or checkpoint_path(csv_filename)
+        checkpoint = AnalyticsCheckpoint.load(checkpoint_file)
+        if update_checkpoint(csv_filename, checkpoint):
+            try:
+                checkpoint.save(checkpoint_file)
+            except OSError as e:
+                logging.warning(f"Could not save analytics checkpoint {checkpoint_file}: {e}")
+        aggregates.merge(checkpoint.aggregates)
+
+    return aggregates.to_analytics()
+
+
+def calculate_range_analytics(start_time: Optional[str] = None, end_time: Optional[str] = None,
+                              csv_filename: str = SPIN_LOG_FILE) -> Dict[str, Any]:
+    """Analytics of the spins logged in [start_time, end_time)
+
+    Times are 'YYYY-MM-DD HH:MM:SS' strings; a date alone works as a bound too.
+    Segments entirely inside the window use their summaries, segments entirely
+    outside are skipped, and only segments straddling a bound are decompressed.
+    """
+    aggregates = SpinAggregates()
+    for summary in load_segment_summaries(csv_filename):
+        if summary.outside(start_time, end_time):
+            continue
+        if summary.inside(start_time, end_time):
+            aggregates.merge(summary.aggregates)
+            continue
+        with gzip.open(summary.segment_file, 'rt', encoding='utf-8', newline='') as f:
+            aggregates.merge(summarize_rows(csv.DictReader(f), start_time, end_time)[0])
+
+    # The active log is bounded by the rotation policy
+    if os.path.isfile(csv_filename):
+        with open(csv_filename, 'r', encoding='utf-8', newline='') as f:
+            aggregates.merge(summarize_rows(csv.DictReader(f), start_time, end_time)[0])
+
+    return aggregates.to_analytics()
@@ -0,0 +1,335 @@
+"""
+Buffered spin logging for the slot machine
+Keeps one append handle on the analytics CSV and hands rows to a background
+thread, which writes them in batches on a size or time policy instead of
+opening and closing the file on every spin. The CSV can optionally be rotated
+into compressed segments by size or by day
+"""
+
+import atexit
+import csv
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from batch_engine import JACKPOT_SYMBOL
+from database.db import save_spin_events
+
+SPIN_LOG_FILE = 'slot_analytics.csv'
+SPIN_LOG_FIELDS = ['timestamp', 'reel1', 'reel2', 'reel3', 'reel4', 'reel5', 'bet_amount', 'win_amount',
+                   'net_result', 'balance_after', 'jackpot_pool', 'win_type', 'sample_weight', 'user_id',
+                   'session_id']
+DEFAULT_FLUSH_RECORDS = 256    # Write once this many rows are waiting...
+DEFAULT_FLUSH_INTERVAL = 1.0   # ...or once the oldest has waited this many seconds
+DEFAULT_QUEUE_SIZE = 100_000   # Spinning blocks briefly if the writer falls this far behind
+DEFAULT_FLUSH_TIMEOUT = 30.0   # Longest flush() waits for the writer thread
+FLUSH_POLL_INTERVAL = 0.1      # How often a waiting flush() checks the thread is still alive
+MAX_SAMPLE_WEIGHT = 65535      # Weights are 16-bit in the binary log
+
+_STOP = object()
+
+
+def build_spin_record(reels: Sequence[str], bet: float, win_result, balance: float, jackpot_pool: float,
+                      jackpot_symbol: str = JACKPOT_SYMBOL, user_id=None, session_id=None) -> Dict[str, Any]:
+    """One analytics row; `balance` is the balance after the bet was taken, as in slot_machine()"""
+    win_amount = win_result if isinstance(win_result, (int, float)) else 0
+    if win_result == "bonus":
+        win_type = 'bonus_round'
+    elif win_amount > 0 and ''.join(reels) == jackpot_symbol:
+        win_type = 'jackpot'
+    elif win_amount > 0:
+        win_type = 'win'
+    else:
+        win_type = 'loss'
+
+    now = time.time()
+    record = {
+        'timestamp': datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S'),
+        'unix_time': now,  # Not a CSV column; used by the binary log
+        'bet_amount': bet,
+        'win_amount': win_amount,
+        'net_result': win_amount - bet,
+        'balance_after': balance + win_amount,
+        'jackpot_pool': jackpot_pool,
+        'win_type': win_type,
+        'user_id': user_id,        # Empty for guests; tells players apart in a shared log
+        'session_id': session_id
+    }
+    for i, symbol in enumerate(reels[:5], 1):
+        record[f'reel{i}'] = symbol
+    return record
+
+
+class SpinSampler:
+    """Decides which spins reach the logs, and with what weight
+
+    Wins above big_win_multiplier times the bet, bonus rounds and jackpots are
+    always kept with weight 1. Other spins are kept with probability
+    1/sample_every and weight sample_every, so weighted totals are unbiased
+    estimates of the totals over every spin.
+    """
+
+    def __init__(self, sample_every: int = 1, big_win_multiplier: float = 10.0, seed=None):
+        if not 1 <= sample_every <= MAX_SAMPLE_WEIGHT:
+            raise ValueError(f"sample_every must be between 1 and {MAX_SAMPLE_WEIGHT}, got {sample_every}")
+        self.sample_every = int(sample_every)
+        self.big_win_multiplier = big_win_multiplier
+        self._random = random.Random(seed)
+
+    def weight(self, record: Dict[str, Any]) -> int:
+        """Weight to log the spin with, or 0 to skip it"""
+        if record['win_type'] in ('bonus_round', 'jackpot'):
+            return 1
+        if record['win_amount'] > record['bet_amount'] * self.big_win_multiplier:
+            return 1
+        if self.sample_every == 1 or self._random.randrange(self.sample_every) == 0:
+            return self.sample_every
+        return 0
+
+    def sample(self, record: Dict[str, Any]) -> bool:
+        """Set record['sample_weight']; False if the spin should not be logged"""
+        record['sample_weight'] = self.weight(record)
+        return record['sample_weight'] > 0
+
+
+class SpinLogWriter:
+    """Background CSV writer with a single long-lived file handle
+
+    write() only enqueues the row. The writer thread appends queued rows and
+    flushes the file once flush_records rows are pending or flush_interval
+    seconds have passed. flush() waits until everything queued so far is on
+    disk, and close() (also registered with atexit) drains the queue first.
+
+    With rotate_bytes or rotate_daily set, a batch that would start once the
+    file has reached rotate_bytes, or on a later day than the file's rows, first
+    moves the file into a compressed segment (see spin_analytics.rotate_spin_log).
+    """
+
+    def __init__(self, filename: str = SPIN_LOG_FILE, fieldnames: Sequence[str] = SPIN_LOG_FIELDS,
+                 flush_records: int = DEFAULT_FLUSH_RECORDS, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, rotate_bytes: Optional[int] = None,
+                 rotate_daily: bool = False):
+        self.filename = filename
+        self.fieldnames = list(fieldnames)
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_daily = rotate_daily
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._disabled = False  # Set by _open() if the log cannot be written safely
+        self._lock = threading.Lock()
+        self._open()
+
+        self._thread = threading.Thread(target=self._run, name=f"SpinLogWriter({filename})", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def disabled(self) -> bool:
+        return self._disabled
+
+    def write(self, record: Dict[str, Any]):
+        """Queue one row for writing; rows for a disabled log are dropped"""
+        if self._closed:
+            raise ValueError(f"Spin log writer for {self.filename} is closed")
+        if self._disabled:
+            return
+        self._queue.put(record)
+
+    def flush(self, timeout: Optional[float] = DEFAULT_FLUSH_TIMEOUT) -> bool:
+        """Block until every row queued so far is written
+
+        Returns False if timeout seconds pass first (None waits for as long as
+        the writer thread lives) or if the thread has died. Once close() has
+        begun, waits for it to finish draining the queue instead.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        with self._lock:
+            # Under the lock, so the request is queued before any close() stop marker
+            if not self._closed:
+                if not self._thread.is_alive():
+                    return False
+                try:
+                    self._queue.put(done, timeout=timeout)
+                except queue.Full:
+                    return False
+        if self._closed:
+            self._thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            return not self._thread.is_alive()
+
+        while not done.wait(FLUSH_POLL_INTERVAL if deadline is None else
+                            min(FLUSH_POLL_INTERVAL, max(0.0, deadline - time.monotonic()))):
+            if not self._thread.is_alive():
+                return done.is_set()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        return True
+
+    def close(self):
+        """Write everything still queued and close the file"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._close()
+        atexit.unregister(self.close)
+
+    def _open(self):
+        """Open the log file, writing the header if it is new"""
+        write_header = not os.path.isfile(self.filename) or os.path.getsize(self.filename) == 0
+        if not write_header and self._stored_header() != self.fieldnames:
+            # Rows under another header (an older column set) go to their own segment;
+            # appending under that header would misalign every column
+            if not self._rotate_file():
+                # Play goes on without this log rather than failing or corrupting it
+                logging.warning(f"Spin log {self.filename} has an older header and could not be rotated; "
+                                f"spin logging to it is disabled")
+                self._disabled = True
+                self._file = None
+                return
+            if os.path.isfile(self.filename):
+                os.remove(self.filename)  # Nothing but a header, so nothing was rotated
+            write_header = True
+        # Day of the newest row; an existing file is dated by its last write
+        self._segment_day = None if write_header else datetime.fromtimestamp(
+            os.path.getmtime(self.filename)).strftime('%Y-%m-%d')
+        self._file = open(self.filename, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if write_header:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def _run(self):
+        pending: List[Dict[str, Any]] = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, dict):
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(pending) < self.flush_records:
+                    continue
+
+            # Size limit, time limit, flush request or shutdown
+            self._write_rows(pending)
+            pending = []
+            deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
+    def _write_rows(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        try:
+            self._write_batch(rows)
+        except Exception as e:
+            logging.error(f"Error writing spin log {self.filename}: {e}")
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        """Write one batch and make it visible to readers"""
+        start = 0
+        for end in range(1, len(rows) + 1):
+            day = str(rows[start].get('timestamp', ''))[:10] or None
+            # A batch spanning midnight is split so each day starts its own segment
+            if end < len(rows) and not (self.rotate_daily and str(rows[end].get('timestamp', ''))[:10] != day):
+                continue
+            if self._should_rotate(day):
+                self._rotate()
+            self._writer.writerows(rows[start:end])
+            self._segment_day = day or self._segment_day
+            start = end
+        self._file.flush()
+
+    def _should_rotate(self, batch_day: Optional[str]) -> bool:
+        if self.rotate_bytes is not None and self._file.tell() >= self.rotate_bytes:
+            return True
+        return (self.rotate_daily and batch_day is not None and self._segment_day is not None
+                and batch_day > self._segment_day)
+
+    def _stored_header(self) -> List[str]:
+        with open(self.filename, 'r', encoding='utf-8', newline='') as f:
+            return next(csv.reader(f), [])
+
+    def _rotate(self):
+        self._close()
+        self._rotate_file()
+        self._open()
+
+    def _rotate_file(self) -> bool:
+        from spin_analytics import rotate_spin_log  # spin_analytics imports this module
+
+        try:
+            rotate_spin_log(self.filename)
+            return True
+        except OSError as e:
+            logging.error(f"Could not rotate spin log {self.filename}: {e}")
+            return False
+
+
+class DatabaseSpinLogWriter(SpinLogWriter):
+    """SpinLogWriter that inserts rows into the spin_events table
+
+    Each flush is a single executemany in one transaction, so the database sees
+    one commit per batch instead of one per spin. `filename` is the database path.
+    """
+
+    def _open(self):
+        pass  # save_spin_events opens its own connection in the writer thread
+
+    def _close(self):
+        pass
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        if not save_spin_events(rows):
+            raise RuntimeError(f"{len(rows)} spin events were not saved")
+
+
+_writers: Dict[str, SpinLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_spin_log_writer(filename: str = SPIN_LOG_FILE, writer_class: Type[SpinLogWriter] = SpinLogWriter,
+                        **kwargs) -> SpinLogWriter:
+    """Shared writer for a log file, created on first use"""
+    key = os.path.abspath(filename)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None or writer.closed:
+            writer = _writers[key] = writer_class(filename, **kwargs)
+        return writer
+
+
+def flush_spin_log(filename: str = SPIN_LOG_FILE):
+    """Make queued rows visible to readers of the log file, if a writer is open"""
+    writer = _writers.get(os.path.abspath(filename))
+    if writer is not None:
+        writer.flush()
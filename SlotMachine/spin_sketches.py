@@ -0,0 +1,291 @@
+"""
+Streaming quantile sketches for the slot machine
+Log-bucketed histograms with a fixed relative error: a value lands in bucket
+ceil(log(v) / log(gamma)), so any reported quantile is within
+relative_accuracy of a true one. Sketches merge by adding bucket counts, so
+sketches from separate sessions or processes combine exactly, and their size
+grows with the logarithm of the value range rather than with the spin count
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from spin_logger import SPIN_LOG_FILE, SpinLogWriter, get_spin_log_writer
+
+SPIN_SKETCH_FILE = 'slot_analytics.sketch.json'
+SKETCH_VERSION = 1
+DEFAULT_RELATIVE_ACCURACY = 0.01
+MIN_INDEXABLE_VALUE = 1e-9  # Smaller magnitudes are counted as zero
+DEFAULT_SAVE_INTERVAL = 10.0  # Seconds between sketch file writes while logging
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch for values of either sign"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"Relative accuracy must be in (0, 1), got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        # Counts are floats so sampled spins can be added with their sample weight
+        self.positive: Dict[int, float] = {}
+        self.negative: Dict[int, float] = {}  # Keyed by the bucket of -value
+        self.zero_count = 0.0
+        self.count = 0.0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        """Representative of a bucket: within relative_accuracy of everything in it"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: float = 1.0):
+        value = float(value)
+        if value > MIN_INDEXABLE_VALUE:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + count
+        elif value < -MIN_INDEXABLE_VALUE:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + count
+        else:
+            self.zero_count += count
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_many(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'QuantileSketch'):
+        """Add another sketch's counts; both must use the same relative accuracy"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(f"Cannot merge sketches with relative accuracy {self.relative_accuracy} "
+                             f"and {other.relative_accuracy}")
+        for key, count in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + count
+        for key, count in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0 <= q <= 1); None for an empty sketch"""
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantile must be in [0, 1], got {q}")
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(self.min, -self._value(key))
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self.max, self._value(key))
+        return self.max
+
+    def percentiles(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[float, Optional[float]]:
+        return {p: self.quantile(p / 100) for p in percentiles}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'positive': {str(key): count for key, count in self.positive.items()},
+            'negative': {str(key): count for key, count in self.negative.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.positive = {int(key): count for key, count in data['positive'].items()}
+        sketch.negative = {int(key): count for key, count in data['negative'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.total = data['total']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+@dataclass
+class SpinSketches:
+    """Sketches of bet size, paid win size, net result per spin and session duration"""
+    bet: QuantileSketch = field(default_factory=QuantileSketch)
+    win: QuantileSketch = field(default_factory=QuantileSketch)   # Winning spins only
+    net: QuantileSketch = field(default_factory=QuantileSketch)
+    session_duration: QuantileSketch = field(default_factory=QuantileSketch)  # Seconds
+
+    def sketches(self) -> Dict[str, QuantileSketch]:
+        return {'bet': self.bet, 'win': self.win, 'net': self.net, 'session_duration': self.session_duration}
+
+    def add_spin(self, record: Dict[str, Any]) -> bool:
+        """Add one spin-log row, counted sample_weight times (default 1)
+
+        False if it has no numeric bet and win.
+        """
+        try:
+            bet_amount = float(record['bet_amount'])
+            win_amount = float(record['win_amount'])
+            weight = float(record.get('sample_weight') or 1)
+        except (KeyError, TypeError, ValueError):
+            return False
+        self.bet.add(bet_amount, weight)
+        if win_amount > 0:
+            self.win.add(win_amount, weight)
+        self.net.add(win_amount - bet_amount, weight)
+        return True
+
+    def add_session(self, duration: float):
+        self.session_duration.add(duration)
+
+    def merge(self, other: 'SpinSketches'):
+        for name, sketch in self.sketches().items():
+            sketch.merge(other.sketches()[name])
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Dict[str, Any]]:
+        """Count, mean and percentiles of each sketch"""
+        return {name: {'count': sketch.count, 'mean': sketch.mean, **{f'p{p:g}': value for p, value in
+                                                                     sketch.percentiles(percentiles).items()}}
+                for name, sketch in self.sketches().items()}
+
+    @classmethod
+    def load(cls, filename: str = SPIN_SKETCH_FILE) -> 'SpinSketches':
+        """Read a sketch file; a missing one gives empty sketches"""
+        if not os.path.isfile(filename):
+            return cls()
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != SKETCH_VERSION:
+            raise ValueError(f"Unsupported sketch file version in {filename}: {data.get('version')}")
+        return cls(**{name: QuantileSketch.from_dict(sketch) for name, sketch in data['sketches'].items()})
+
+    def save(self, filename: str = SPIN_SKETCH_FILE):
+        """Write atomically, so a crash never leaves a half-written file"""
+        data = {'version': SKETCH_VERSION,
+                'sketches': {name: sketch.to_dict() for name, sketch in self.sketches().items()}}
+        temp_file = filename + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_file, filename)
+
+
+class SketchSpinLogWriter(SpinLogWriter):
+    """SpinLogWriter that folds rows into SpinSketches persisted at `filename`
+
+    The sketches live in the writer thread and are saved at most every
+    save_interval seconds and on close. Session durations go through the same
+    queue, so add_session_duration() never blocks on the file.
+    """
+
+    def __init__(self, filename: str = SPIN_SKETCH_FILE, save_interval: float = DEFAULT_SAVE_INTERVAL, **kwargs):
+        self.save_interval = save_interval
+        super().__init__(filename, **kwargs)
+
+    def add_session_duration(self, seconds: float):
+        self.write({'session_duration': seconds})
+
+    def _open(self):
+        self.sketches = SpinSketches.load(self.filename)
+        self._last_save = time.monotonic()
+
+    def _close(self):
+        self.sketches.save(self.filename)
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            if 'session_duration' in row:
+                self.sketches.add_session(row['session_duration'])
+            else:
+                self.sketches.add_spin(row)
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.sketches.save(self.filename)
+            self._last_save = time.monotonic()
+
+
+def get_sketch_writer(filename: str = SPIN_SKETCH_FILE) -> SketchSpinLogWriter:
+    """Shared sketch writer for a sketch file, created on first use"""
+    return get_spin_log_writer(filename, SketchSpinLogWriter)
+
+
+def merge_sketch_files(filenames: Sequence[str]) -> SpinSketches:
+    """Combine sketch files from several sessions or processes"""
+    merged = SpinSketches()
+    for filename in filenames:
+        merged.merge(SpinSketches.load(filename))
+    return merged
+
+
+def sketch_csv_log(csv_filename: str = SPIN_LOG_FILE) -> SpinSketches:
+    """Sketches of every full-format row of a CSV spin log, weighted like the analytics"""
+    sketches = SpinSketches()
+    with open(csv_filename, 'r', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            sketches.add_spin(row)
+    return sketches
+
+
+def format_sketch_report(sketches: SpinSketches, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> str:
+    """Format sketch percentiles for the console"""
+    labels = {'bet': '💵 Bet', 'win': '🏅 Win (paying spins)', 'net': '📈 Net per spin',
+              'session_duration': '⏱️ Session length (s)'}
+    report = "\n📐 DISTRIBUTION (±{:g}% relative):\n".format(sketches.bet.relative_accuracy * 100)
+    for name, stats in sketches.summary(percentiles).items():
+        if not stats['count']:
+            continue
+        values = ' | '.join(f"P{p:g}: {stats[f'p{p:g}']:,.2f}" for p in percentiles)
+        report += f"  {labels[name]}: {values} (n={stats['count']:,.0f})\n"
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge and report spin quantile sketches")
+    parser.add_argument("sketches", nargs="*", default=[SPIN_SKETCH_FILE], help="Sketch files to merge")
+    parser.add_argument("--from-csv", metavar="CSV", default=None,
+                        help="Build the sketches from a CSV spin log instead")
+    parser.add_argument("--output", default=None, help="Save the merged sketches to this file")
+    parser.add_argument("--percentiles", type=float, nargs="+", default=list(DEFAULT_PERCENTILES))
+    args = parser.parse_args(argv)
+
+    sketches = sketch_csv_log(args.from_csv) if args.from_csv else merge_sketch_files(args.sketches)
+    if args.output:
+        sketches.save(args.output)
+    print(format_sketch_report(sketches, args.percentiles))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
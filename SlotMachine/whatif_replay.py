@@ -0,0 +1,379 @@
+"""
+What-if replay of logged spins for the slot machine
+Re-evaluates the recorded reels and bets of a spin log under candidate
+configurations with the vectorized check_win rules, reporting the RTP and the
+player balance trajectory each paytable and multiplier set would have produced
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from batch_engine import CHUNK_SIZE, JACKPOT_SYMBOL, REEL_COUNT, BatchWinEvaluator, SymbolTable
+from config_manager import ConfigManager, get_special_symbols
+from exact_rtp import ExactRTPEngine
+from fleet_analytics import expand_log_paths
+from spin_analytics import SEGMENT_SUFFIX, segment_directory
+from spin_logger import SPIN_LOG_FILE
+
+BINARY_LOG_SUFFIX = '.spins'
+
+
+@dataclass
+class HistoryChunk:
+    """A run of logged spins as arrays; codes index into `symbols`"""
+    symbols: List[str]
+    codes: np.ndarray          # (n, 5) uint8
+    bet_amount: np.ndarray
+    win_amount: np.ndarray     # As logged; bonus triggers log 0
+    balance_after: np.ndarray
+    jackpot_pool: np.ndarray
+    sample_weight: np.ndarray  # Spins each logged row stands for
+    players: np.ndarray        # Index into `player_keys` of the row's player
+    player_keys: List[str]     # User id, 'session:<id>' or '' where the log does not say
+
+
+def _iter_binary_history(filename: str, chunk_size: int) -> Iterator[HistoryChunk]:
+    from binary_spin_log import BinarySpinLog
+
+    log = BinarySpinLog(filename)
+    try:
+        for start in range(0, len(log), chunk_size):
+            records = log.records[start:start + chunk_size]
+            yield HistoryChunk(log.symbols, log.reel_codes(records), np.array(records['bet_amount']),
+                               np.array(records['win_amount']), np.array(records['balance_after']),
+                               np.array(records['jackpot_pool']), log.weights(records).astype(np.float64),
+                               np.zeros(len(records), dtype=np.int64), [''])  # No player columns
+    finally:
+        log.close()
+
+
+def _iter_csv_history(filename: str, chunk_size: int) -> Iterator[HistoryChunk]:
+    symbols: List[str] = []
+    codes: Dict[str, int] = {}
+    player_keys: List[str] = []
+    player_codes: Dict[str, int] = {}
+    rows: List[Tuple] = []
+    reels: List[List[int]] = []
+    players: List[int] = []
+
+    def chunk() -> HistoryChunk:
+        values = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return HistoryChunk(list(symbols), np.array(reels, dtype=np.uint8).reshape(-1, REEL_COUNT),
+                            values[:, 0], values[:, 1], values[:, 2], values[:, 3], values[:, 4],
+                            np.array(players, dtype=np.int64), list(player_keys))
+
+    opener = gzip.open if filename.endswith('.gz') else open
+    with opener(filename, 'rt', encoding='utf-8', newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            try:
+                spin = [row[f'reel{i}'] for i in range(1, REEL_COUNT + 1)]
+                values = (float(row['bet_amount']), float(row['win_amount']),
+                          float(row['balance_after']), float(row['jackpot_pool']),
+                          float(row.get('sample_weight') or 1))
+            except (KeyError, TypeError, ValueError):
+                continue  # Old short-format rows carry no reels
+            if None in spin:
+                continue
+            for symbol in spin:
+                if symbol not in codes:
+                    codes[symbol] = len(symbols)
+                    symbols.append(symbol)
+            reels.append([codes[symbol] for symbol in spin])
+            rows.append(values)
+            player = _player_key(row)
+            if player not in player_codes:
+                player_codes[player] = len(player_keys)
+                player_keys.append(player)
+            players.append(player_codes[player])
+            if len(rows) == chunk_size:
+                yield chunk()
+                rows, reels, players = [], [], []
+    if rows:
+        yield chunk()
+
+
+def _player_key(row: Dict[str, Any]) -> str:
+    """Whose balance a CSV row belongs to: the user, else the session, else unknown ('')"""
+    if row.get('user_id'):
+        return row['user_id']
+    if row.get('session_id'):
+        return f"session:{row['session_id']}"
+    return ''
+
+
+def history_files(log_paths: Sequence[str]) -> List[str]:
+    """Files to replay, oldest first, named by paths, globs or directories
+
+    A live CSV log is preceded by its rotated segments, and a directory stands
+    for its slot_analytics.csv and that log's segments.
+    """
+    files = []
+    for path in expand_log_paths(log_paths):
+        if path.endswith('.csv'):
+            segments = glob.glob(os.path.join(segment_directory(path), f'*{SEGMENT_SUFFIX}'))
+            files.extend(os.path.normpath(segment) for segment in sorted(segments))
+        files.append(path)
+    return list(dict.fromkeys(files))
+
+
+def iter_history(log_files: Union[str, Sequence[str]] = SPIN_LOG_FILE,
+                 chunk_size: int = CHUNK_SIZE) -> Iterator[HistoryChunk]:
+    """Logged spins in chunks, file by file in history_files() order
+
+    Each file is a binary log (.spins) or a CSV log (optionally gzipped).
+    Player codes are shared across files, so a player keeps one code throughout.
+    """
+    if isinstance(log_files, str):
+        log_files = [log_files]
+    filenames = history_files(log_files)
+    if not filenames:
+        raise FileNotFoundError(f"No spin logs found at {', '.join(log_files)}")
+
+    player_keys: List[str] = []
+    player_codes: Dict[str, int] = {}
+    for filename in filenames:
+        if filename.endswith(BINARY_LOG_SUFFIX):
+            chunks = _iter_binary_history(filename, chunk_size)
+        else:
+            chunks = _iter_csv_history(filename, chunk_size)
+        for chunk in chunks:
+            for key in chunk.player_keys:
+                if key not in player_codes:
+                    player_codes[key] = len(player_keys)
+                    player_keys.append(key)
+            translation = np.array([player_codes[key] for key in chunk.player_keys], dtype=np.int64)
+            chunk.players = translation[chunk.players]
+            chunk.player_keys = list(player_keys)
+            yield chunk
+
+
+class ReplayEvaluator:
+    """check_win under one configuration, for spins coded by a log's symbol table
+
+    Logged symbols the configuration does not know are added with zero weight,
+    so they evaluate like check_win would (they match no paytable line).
+    Bonus rounds are not replayable, since their free spins are not logged;
+    a bonus trigger is credited the configuration's exact expected bonus round win.
+    """
+
+    def __init__(self, config_data: Dict[str, Any], jackpot_symbol: str = JACKPOT_SYMBOL):
+        self.config = config_data
+        self.jackpot_symbol = jackpot_symbol
+        self.expected_bonus_round_win = ExactRTPEngine(config_data, jackpot_symbol).expected_bonus_round_win()
+        self._evaluators: Dict[Tuple[str, ...], Tuple[BatchWinEvaluator, np.ndarray]] = {}
+
+    def _evaluator(self, symbols: Sequence[str]) -> Tuple[BatchWinEvaluator, np.ndarray]:
+        key = tuple(symbols)
+        if key not in self._evaluators:
+            weights = dict(self.config['symbols']['weights'])
+            for symbol in symbols:
+                weights.setdefault(symbol, 0)
+            table = SymbolTable(weights)
+            evaluator = BatchWinEvaluator(table, self.config['paytable'], get_special_symbols(self.config),
+                                          self.jackpot_symbol)
+            translation = np.array([table.codes[symbol] for symbol in symbols], dtype=np.uint8)
+            self._evaluators[key] = (evaluator, translation)
+        return self._evaluators[key]
+
+    def evaluate(self, chunk: HistoryChunk) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(win per spin, bonus trigger mask, jackpot mask); jackpots pay the logged pool"""
+        evaluator, translation = self._evaluator(chunk.symbols)
+        results = evaluator.evaluate(translation[chunk.codes])
+        win = np.where(results.jackpot, chunk.jackpot_pool, results.payout)
+        win[results.bonus] = self.expected_bonus_round_win
+        return win, results.bonus, results.jackpot
+
+
+@dataclass
+class ReplayResult:
+    """What one configuration would have paid over the replayed history"""
+    config_name: str
+    spins: int = 0
+    total_bet: float = 0.0
+    total_win: float = 0.0
+    winning_spins: int = 0
+    bonus_rounds: int = 0
+    jackpots: int = 0
+    # Balance trajectories: each player's logged balance_after plus that player's
+    # cumulative win difference against the baseline replay
+    final_balances: Dict[str, float] = field(default_factory=dict)  # By player key
+    lowest_balance: Optional[float] = None
+    spins_below_zero: int = 0
+    combination_wins: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def rtp_percentage(self) -> float:
+        return self.total_win / self.total_bet * 100 if self.total_bet > 0 else 0.0
+
+    @property
+    def hit_frequency(self) -> float:
+        return self.winning_spins / self.spins if self.spins else 0.0
+
+
+@dataclass
+class ReplayReport:
+    """Logged figures next to the baseline and candidate replays"""
+    log_file: str
+    spins: int
+    total_bet: float
+    logged_win: float
+    baseline: ReplayResult
+    candidates: List[ReplayResult]
+    # Rows the log does not attribute to a player are replayed as one player's
+    # balance, which is only an approximation if several players wrote them
+    unattributed_spins: int = 0
+
+    @property
+    def logged_rtp_percentage(self) -> float:
+        return self.logged_win / self.total_bet * 100 if self.total_bet > 0 else 0.0
+
+
+def replay(log_file: Union[str, Sequence[str]], candidate_configs: Dict[str, Dict[str, Any]],
+           baseline_config: Dict[str, Any], chunk_size: int = CHUNK_SIZE, jackpot_symbol: str = JACKPOT_SYMBOL) -> ReplayReport:
+    """Replay spin logs under a baseline and any number of candidate configurations in one pass
+
+    log_file is one path or several, each a file, glob or directory (see
+    history_files()); rotated segments are replayed before their live log.
+
+    The baseline (normally the live config) is replayed with the same bonus
+    treatment as the candidates, so the differences isolate the config change.
+    Rows of a sampled log count sample_weight times. Balance differences
+    accumulate per player (user, else session), so players sharing a log are
+    not charged each other's differences.
+    """
+    baseline_evaluator = ReplayEvaluator(baseline_config, jackpot_symbol)
+    evaluators = {name: ReplayEvaluator(config, jackpot_symbol) for name, config in candidate_configs.items()}
+    baseline = ReplayResult('baseline')
+    candidates = {name: ReplayResult(name) for name in candidate_configs}
+    balance_shift = {name: np.zeros(0) for name in candidate_configs}  # Per player code
+    logged_win = 0.0
+    unattributed_spins = 0
+
+    for chunk in iter_history(log_file, chunk_size):
+        logged_win += float(np.dot(chunk.win_amount, chunk.sample_weight))
+        if '' in chunk.player_keys:
+            unattributed = chunk.players == chunk.player_keys.index('')
+            unattributed_spins += int(chunk.sample_weight[unattributed].sum())
+        base_win, base_bonus, base_jackpot = baseline_evaluator.evaluate(chunk)
+        _accumulate(baseline, chunk, base_win, base_bonus, base_jackpot, chunk.balance_after)
+
+        for name, evaluator in evaluators.items():
+            win, bonus, jackpot = evaluator.evaluate(chunk)
+            shift, balance_shift[name] = _player_cumsum((win - base_win) * chunk.sample_weight, chunk.players,
+                                                        balance_shift[name], len(chunk.player_keys))
+            _accumulate(candidates[name], chunk, win, bonus, jackpot, chunk.balance_after + shift)
+
+    log_name = log_file if isinstance(log_file, str) else ', '.join(log_file)
+    return ReplayReport(log_file=log_name, spins=baseline.spins, total_bet=baseline.total_bet,
+                        logged_win=logged_win, baseline=baseline, candidates=list(candidates.values()),
+                        unattributed_spins=unattributed_spins)
+
+
+def _player_cumsum(values: np.ndarray, players: np.ndarray, totals: np.ndarray,
+                   player_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Running sum of values within each player, continuing from totals; (sums, new totals)"""
+    totals = np.pad(totals, (0, player_count - len(totals)))
+    order = np.argsort(players, kind='stable')
+    grouped_players = players[order]
+    sums = np.cumsum(values[order])
+    starts = np.flatnonzero(np.r_[True, grouped_players[1:] != grouped_players[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+    # Restart the sum at each player's first row, from that player's earlier total
+    offsets = totals[grouped_players[starts]] - (sums[starts] - values[order][starts])
+    sums += np.repeat(offsets, ends - starts + 1)
+    totals[grouped_players[ends]] = sums[ends]
+    result = np.empty_like(sums)
+    result[order] = sums
+    return result, totals
+
+
+def _accumulate(result: ReplayResult, chunk: HistoryChunk, win: np.ndarray, bonus: np.ndarray,
+                jackpot: np.ndarray, balance: np.ndarray):
+    weights = chunk.sample_weight
+    result.spins += int(weights.sum())
+    result.total_bet += float(np.dot(chunk.bet_amount, weights))
+    result.total_win += float(np.dot(win, weights))
+    result.winning_spins += int(weights[win > 0].sum())
+    result.bonus_rounds += int(weights[bonus].sum())
+    result.jackpots += int(weights[jackpot].sum())
+    if len(balance):
+        # Each player's last row in the chunk
+        players, last = np.unique(chunk.players[::-1], return_index=True)
+        for player, index in zip(players, len(balance) - 1 - last):
+            result.final_balances[chunk.player_keys[player]] = float(balance[index])
+        lowest = float(balance.min())
+        result.lowest_balance = lowest if result.lowest_balance is None else min(result.lowest_balance, lowest)
+        result.spins_below_zero += int(np.count_nonzero(balance < 0))
+
+    # Line wins per paytable combination, from the first three reels
+    line = ~bonus & ~jackpot & (win > 0)
+    if line.any():
+        heads, inverse = np.unique(chunk.codes[line, :3], axis=0, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=(win * weights)[line])
+        for head, total in zip(heads, totals):
+            combination = ''.join(chunk.symbols[code] for code in head)
+            result.combination_wins[combination] = result.combination_wins.get(combination, 0.0) + float(total)
+
+
+def load_config_data(config_file: str) -> Dict[str, Any]:
+    config_manager = ConfigManager(config_file)
+    config_manager.load_config()
+    return config_manager.config_data
+
+
+def format_replay_report(report: ReplayReport) -> str:
+    """Format a replay report for the console"""
+    text = f"""
+⏪ WHAT-IF REPLAY of {report.spins:,} logged spins ({report.log_file}) ⏪
+• Total Bet: ${report.total_bet:,.2f}
+• Logged RTP: {report.logged_rtp_percentage:.2f}% (bonus round wins are not logged)
+• Baseline replay RTP: {report.baseline.rtp_percentage:.2f}% \
+(hit frequency {report.baseline.hit_frequency * 100:.2f}%)
+"""
+    if report.unattributed_spins:
+        text += (f"• {report.unattributed_spins:,} spins carry no user or session, so their balances are "
+                 f"replayed as a single player's (an approximation if several players wrote them)\n")
+    for result in report.candidates:
+        delta = result.rtp_percentage - report.baseline.rtp_percentage
+        text += f"""
+🎰 {result.config_name}
+• Replay RTP: {result.rtp_percentage:.2f}% ({delta:+.2f} pts vs baseline)
+• Total Win: ${result.total_win:,.2f} ({result.total_win - report.baseline.total_win:+,.2f})
+• Hit Frequency: {result.hit_frequency * 100:.2f}% | Bonus Rounds: {result.bonus_rounds:,} | \
+Jackpots: {result.jackpots:,}
+"""
+        if result.final_balances:
+            text += (f"• Balances of {len(result.final_balances):,} players: final total "
+                     f"${sum(result.final_balances.values()):,.2f}, lowest ${result.lowest_balance:,.2f}, "
+                     f"{result.spins_below_zero:,} spins below zero\n")
+        top = sorted(result.combination_wins.items(), key=lambda item: -item[1])[:5]
+        for combination, total in top:
+            text += f"  {combination}: ${total:,.2f}\n"
+    return text
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay logged spins under candidate configurations")
+    parser.add_argument("candidates", nargs="+", help="Candidate configuration files")
+    parser.add_argument("--log", nargs="+", default=[SPIN_LOG_FILE],
+                        help="Spin logs to replay: binary .spins logs (fastest), CSV logs (optionally .gz) "
+                             "with their rotated segments, globs or directories")
+    parser.add_argument("--baseline", default="config.json", help="Configuration the log was recorded under")
+    args = parser.parse_args(argv)
+
+    report = replay(args.log, {config_file: load_config_data(config_file) for config_file in args.candidates},
+                    load_config_data(args.baseline))
+    print(format_replay_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())